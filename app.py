@@ -10,6 +10,174 @@ import base64
 import os
 import sys
 import subprocess
+import queue
+import itertools
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+BACKEND_URL = "http://localhost:8000"
+
+# Connection each worker thread is using, so another thread can abort it
+_connections = {}
+
+class _TrackingPool(HTTPConnectionPool):
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        _connections[threading.get_ident()] = conn
+        return conn
+
+class _TrackingHTTPSPool(HTTPSConnectionPool):
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        _connections[threading.get_ident()] = conn
+        return conn
+
+class _CancellableAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections can be shut down from another thread,
+    even while a request is still waiting for the response headers.
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TrackingPool, "https": _TrackingHTTPSPool}
+    
+    @staticmethod
+    def abort(thread_id):
+        conn = _connections.get(thread_id)
+        sock = getattr(conn, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+class BackendWorker:
+    """
+    Runs backend requests off the Tk main thread.
+    
+    Requests share one pooled HTTP session and are grouped into channels
+    (one per action). Submitting a new request on a channel supersedes the
+    previous one: its result is dropped and its connection is shut down, so
+    the backend sees the disconnect and stops working on it.
+    Results are queued and handed back on the Tk thread by a root.after
+    pump running once per frame, so the UI never blocks on the backend.
+    """
+    FRAME_MS = 16  # ~60fps
+    
+    def __init__(self, root, max_workers=4, timeout=(3.05, 120)):
+        self.root = root
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = _CancellableAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backend")
+        self.results = queue.Queue()
+        self.generations = {}
+        self.running = {}  # channel -> (generation, worker thread id)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.root.after(self.FRAME_MS, self._pump)
+    
+    def submit(self, channel, method, path, on_done, on_error, on_chunk=None, **kwargs):
+        """
+        Start a request on a channel, cancelling whatever was running there.
+        
+        Args:
+            channel: Name of the action, e.g. "solve"
+            method: HTTP method
+            path: Backend path, e.g. "/api/chat"
+            on_done: Called on the Tk thread with the parsed JSON result
+            on_error: Called on the Tk thread with an error message
+            on_chunk: Called on the Tk thread with each streamed text chunk
+            **kwargs: Passed through to requests (json=..., timeout=...)
+        """
+        with self._lock:
+            generation = next(self._counter)
+            self.generations[channel] = generation
+            self._abort(channel)
+        kwargs.setdefault("timeout", self.timeout)
+        self.executor.submit(self._run, channel, generation, method, path,
+                             on_done, on_error, on_chunk, kwargs)
+    
+    def cancel(self, channel):
+        with self._lock:
+            self.generations[channel] = next(self._counter)
+            self._abort(channel)
+    
+    def _abort(self, channel):
+        # Caller holds self._lock, so the request cannot finish meanwhile
+        running = self.running.pop(channel, None)
+        if running is not None:
+            _CancellableAdapter.abort(running[1])
+    
+    def is_current(self, channel, generation):
+        return self.generations.get(channel) == generation
+    
+    def _run(self, channel, generation, method, path, on_done, on_error, on_chunk, kwargs):
+        thread_id = threading.get_ident()
+        with self._lock:
+            if not self.is_current(channel, generation):
+                return
+            _connections.pop(thread_id, None)
+            self.running[channel] = (generation, thread_id)
+        try:
+            with self.session.request(method, BACKEND_URL + path, stream=True, **kwargs) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if "ndjson" in content_type or "event-stream" in content_type:
+                    result = self._read_stream(response, channel, generation, on_chunk)
+                else:
+                    result = response.json()
+            if result is not None:
+                self.results.put((channel, generation, on_done, result))
+        except Exception as e:
+            self.results.put((channel, generation, on_error, str(e)))
+        finally:
+            with self._lock:
+                if self.running.get(channel) == (generation, thread_id):
+                    del self.running[channel]
+    
+    def _read_stream(self, response, channel, generation, on_chunk):
+        last = {}
+        for line in response.iter_lines(decode_unicode=True):
+            if not self.is_current(channel, generation):
+                return None
+            if not line:
+                continue
+            if line.startswith("data:"):
+                line = line[5:].strip()
+            try:
+                last = json.loads(line)
+            except ValueError:
+                continue
+            chunk = last.get("response") or last.get("text") or last.get("token")
+            if chunk and on_chunk:
+                self.results.put((channel, generation, on_chunk, chunk))
+        return last
+    
+    def _pump(self):
+        # Deliver everything queued since the last frame on the Tk thread
+        while True:
+            try:
+                channel, generation, callback, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_current(channel, generation):
+                callback(value)
+        if not self._closed:
+            self.root.after(self.FRAME_MS, self._pump)
+    
+    def close(self):
+        self._closed = True
+        with self._lock:
+            for channel in list(self.running):
+                self._abort(channel)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
 
 class AIAssistantApp:
     def __init__(self, root):
@@ -56,6 +224,9 @@ class AIAssistantApp:
         self.status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN)
         self.status_bar.grid(row=1, column=0, sticky=(tk.W, tk.E))
         
+        # Backend requests run on worker threads so the window never freezes
+        self.worker = BackendWorker(root)
+        
         # Start backend server in a separate thread
         self.start_backend_server()
         
@@ -129,76 +300,75 @@ class AIAssistantApp:
         threading.Thread(target=run_server, daemon=True).start()
         
     def capture_screen(self):
-        try:
-            response = requests.post("http://localhost:8000/analyze-screen")
-            if response.status_code == 200:
-                result = response.json()
-                self.screen_result.delete(1.0, tk.END)
-                self.screen_result.insert(tk.END, result.get("text", "No text found"))
-                self.status_var.set("Screen captured successfully")
-            else:
-                self.status_var.set("Error capturing screen")
-        except Exception as e:
-            self.status_var.set(f"Error: {str(e)}")
+        self.status_var.set("Capturing screen...")
+        self.screen_result.delete(1.0, tk.END)
+        self.worker.submit(
+            "screen", "POST", "/analyze-screen",
+            on_done=lambda result: self.show_result(
+                self.screen_result, result.get("text", "No text found"), "Screen captured successfully"),
+            on_error=lambda error: self.status_var.set(f"Error capturing screen: {error}"),
+            on_chunk=lambda chunk: self.append_result(self.screen_result, chunk)
+        )
             
     def solve_problem(self):
-        try:
-            problem = self.problem_input.get(1.0, tk.END).strip()
-            if not problem:
-                self.status_var.set("Please enter a problem")
-                return
-                
-            response = requests.post(
-                "http://localhost:8000/solve-problem",
-                json={"problem": problem}
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                self.problem_result.delete(1.0, tk.END)
-                self.problem_result.insert(tk.END, result.get("solution", "No solution found"))
-                self.status_var.set("Problem solved successfully")
-            else:
-                self.status_var.set("Error solving problem")
-        except Exception as e:
-            self.status_var.set(f"Error: {str(e)}")
+        problem = self.problem_input.get(1.0, tk.END).strip()
+        if not problem:
+            self.status_var.set("Please enter a problem")
+            return
+        
+        self.status_var.set("Solving...")
+        self.problem_result.delete(1.0, tk.END)
+        self.worker.submit(
+            "solve", "POST", "/solve-problem",
+            on_done=lambda result: self.show_result(
+                self.problem_result, result.get("solution", "No solution found"), "Problem solved successfully"),
+            on_error=lambda error: self.status_var.set(f"Error solving problem: {error}"),
+            on_chunk=lambda chunk: self.append_result(self.problem_result, chunk),
+            json={"problem": problem}
+        )
             
     def write_essay(self):
-        try:
-            topic = self.topic_input.get().strip()
-            length = self.length_input.get().strip()
-            
-            if not topic:
-                self.status_var.set("Please enter a topic")
-                return
-                
-            try:
-                length = int(length)
-            except ValueError:
-                self.status_var.set("Please enter a valid length")
-                return
-                
-            response = requests.post(
-                "http://localhost:8000/write-essay",
-                json={
-                    "topic": topic,
-                    "length": length
-                }
-            )
+        topic = self.topic_input.get().strip()
+        length = self.length_input.get().strip()
+        
+        if not topic:
+            self.status_var.set("Please enter a topic")
+            return
             
-            if response.status_code == 200:
-                result = response.json()
-                self.essay_result.delete(1.0, tk.END)
-                self.essay_result.insert(tk.END, result.get("essay", "No essay generated"))
-                self.status_var.set("Essay written successfully")
-            else:
-                self.status_var.set("Error writing essay")
-        except Exception as e:
-            self.status_var.set(f"Error: {str(e)}")
+        try:
+            length = int(length)
+        except ValueError:
+            self.status_var.set("Please enter a valid length")
+            return
+        
+        self.status_var.set("Writing essay...")
+        self.essay_result.delete(1.0, tk.END)
+        self.worker.submit(
+            "essay", "POST", "/write-essay",
+            on_done=lambda result: self.show_result(
+                self.essay_result, result.get("essay", "No essay generated"), "Essay written successfully"),
+            on_error=lambda error: self.status_var.set(f"Error writing essay: {error}"),
+            on_chunk=lambda chunk: self.append_result(self.essay_result, chunk),
+            json={
+                "topic": topic,
+                "length": length
+            }
+        )
+    
+    def append_result(self, widget, text):
+        widget.insert(tk.END, text)
+        widget.see(tk.END)
+    
+    def show_result(self, widget, text, status):
+        # Streamed answers are already on screen; only fill in plain responses
+        if not widget.get(1.0, tk.END).strip():
+            widget.insert(tk.END, text)
+        self.status_var.set(status)
 
 def main():
     root = tk.Tk()
     app = AIAssistantApp(root)
+    root.protocol("WM_DELETE_WINDOW", lambda: (app.worker.close(), root.destroy()))
     
     # Position window in bottom-right corner
     screen_width = root.winfo_screenwidth()
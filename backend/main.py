@@ -1,17 +1,126 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from utils.ai_model import GemmaAssistant
+from utils.intent_router import IntentRouter
+from utils.shared_store import SharedStore
+from utils.sessions import SessionStore
+from utils.coordination import BackendMonitor, LeaderLock
+from utils.generation import (
+    CancelToken, GenerationCancelled, GenerationProfile, GenerationTimeout, get_profile
+)
+from utils.cancellation import guarded, run_until_disconnect
+from utils.ocr_cache import OCRCache
+from utils.essay_writer import EssayWriter
+from utils.screen_recognizer import ScreenRecognizer
+from utils.batch_ocr import BatchOCR, split_document, MAX_PAGES
+from utils.solve_pipeline import SolvePipeline
+from utils.jobs import Job, JobQueue
+from utils.retrieval import Retriever, VectorIndex
+from utils.summarizer import MapReduceSummarizer
+from utils.status_hub import StatusHub
+from utils.ws_gateway import GatewayRequest, WebSocketGateway
+from utils.profiling import PROFILING_ENABLED, ProfilingMiddleware, profile_path, profiled
+from utils.rate_limit import RateLimiter, RateLimitMiddleware
+from utils.responses import FastJSONResponse, dumps, parse_fields, select_fields
+from utils.schemas import (
+    APIResponse, ChatResponse, DeleteSessionResponse, EssayResponse, ErrorResponse, JobList, JobStatus,
+    ModelStatus, NotesDocument, NotesList, NotesSearchResponse, OCRBatchResponse, OCRResponse, OCRStatus,
+    QueueStatus, ScreenRegionResponse, SolveResponse, StatusEvent, StatusResponse, StreamSummary
+)
+from typing import Any, Awaitable, Callable, Optional, Tuple, Union
+from functools import partial
+import asyncio
 import base64
-from io import BytesIO
-from PIL import Image
-import pytesseract
+import hashlib
+import os
+import re
+import time
+
+# Cached state lives in SQLite so every worker process shares it
+store = SharedStore()
+# Chat sessions too, so any worker can continue a conversation
+gemma = GemmaAssistant(sessions=SessionStore(store=store))
+intent_router = IntentRouter(store=store)
+monitor = BackendMonitor(gemma, store, LeaderLock())
+ocr_cache = OCRCache(
+    max_bytes=int(os.environ.get("VESWO_OCR_CACHE_BYTES", str(32 * 1024 * 1024))),
+    store=store if os.environ.get("VESWO_OCR_CACHE_PERSIST", "0") == "1" else None,
+    ttl=float(os.environ.get("VESWO_OCR_CACHE_TTL", str(24 * 3600)))
+)
+# Screen reads follow the focused window unless the user pins a region
+essay_writer = EssayWriter()
+recognizer = ScreenRecognizer(ocr_cache=ocr_cache, store=store)
+batch_ocr = BatchOCR(recognizer)
+solve_pipeline = SolvePipeline(intent_router)
+rate_limiter = RateLimiter.from_env()
+# Student notes, embedded once so chat can quote only the relevant chunks
+notes = Retriever(gemma.embed, VectorIndex())
+# Long OCR output is condensed chunk by chunk before it reaches a chat prompt
+summarizer = MapReduceSummarizer(gemma.chat, store)
+
+def status_snapshot() -> dict:
+    return StatusEvent(
+        gemma_ready=gemma.lifecycle.ready,
+        model=ModelStatus(**gemma.lifecycle.status()),
+        ocr=OCRStatus(ready=recognizer.ocr_engine_name is not None, engine=recognizer.ocr_engine_name),
+        queue=QueueStatus(generations=gemma.router.outstanding(), ocr_pages=batch_ocr.pending,
+                          jobs=jobs.active())
+    ).model_dump(exclude_none=True)
+
+# Clients subscribe to status changes instead of polling /api/status
+status_hub = StatusHub(status_snapshot)
+# Essays, batch solves and multi-page OCR can run as persistent background jobs
+jobs = JobQueue(on_change=status_hub.notify)
+
+# Runs blocking work under a cancel token: runner(cancel, func, *args, **kwargs)
+Runner = Callable[..., Awaitable[Any]]
+
+CHAT_CACHE_TTL = float(os.environ.get("VESWO_CHAT_CACHE_TTL", "3600"))
+# Tokens of an attached document that go into the chat prompt verbatim
+DOCUMENT_TOKENS = int(os.environ.get("VESWO_DOCUMENT_TOKENS", "1500"))
+# Most note excerpts a chat prompt or notes search may ask for
+MAX_NOTES = 20
+# /api/ocr uses tesseract's default page segmentation, unlike screen captures
+OCR_API_CONFIG = {"lang": "eng", "config": ""}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Only the worker holding the leader lock warms the model and probes Ollama
+    monitor.start()
+    status_hub.start()
+    jobs.start()
+    # Load the OCR engine in the background; the hub reports when it is ready
+    asyncio.get_running_loop().run_in_executor(None, load_ocr_engine)
+    yield
+    await status_hub.stop()
+    monitor.stop()
+    jobs.stop()
+    batch_ocr.shutdown()
+    solve_pipeline.shutdown()
+    summarizer.shutdown()
+    recognizer.close()
+
+def load_ocr_engine():
+    try:
+        recognizer.ocr_engine
+    except Exception as e:
+        print(f"OCR engine failed to load: {str(e)}")
+    status_hub.notify()
 
 app = FastAPI(
     title="veswo-bot API",
     description="AI-powered study assistant with Gemma AI (via Ollama) for chat, math, essay, code, and OCR",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
+# Added before CORS so that 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -20,49 +129,670 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-gemma = GemmaAssistant()
+if PROFILING_ENABLED:
+    # Outermost, so a profile covers the whole request
+    app.add_middleware(ProfilingMiddleware)
 
-@app.get("/api/status")
-def status():
-    try:
-        # Test if Gemma is working
-        test_response = gemma.chat("Hello")
-        return {
-            "status": "ready",
-            "gemma_ready": True,
-            "message": "Backend is ready and Gemma AI is working"
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "gemma_ready": False,
-            "error": str(e)
-        }
+def respond(request: Request, model: APIResponse) -> FastJSONResponse:
+    """
+    Render a response model, trimmed to the `?fields=` the client asked for.
+    """
+    return FastJSONResponse(model, fields=parse_fields(request.query_params.get("fields")))
+
+@app.get("/api/status", response_model=StatusResponse)
+def status(request: Request):
+    # Reports the model lifecycle instead of running a generation per poll
+    model = ModelStatus(**gemma.lifecycle.status(),
+                        cascade=gemma.cascade.stats() if gemma.cascade is not None else None)
+    if gemma.lifecycle.ready:
+        return respond(request, StatusResponse(
+            status="ready",
+            gemma_ready=True,
+            model=model,
+            message="Backend is ready and Gemma AI is loaded"
+        ))
+    return respond(request, StatusResponse(
+        status="error" if model.state == gemma.lifecycle.ERROR else "loading",
+        gemma_ready=False,
+        model=model,
+        error=model.last_error or f"Model is {model.state}"
+    ))
+
+@app.get("/api/profiles/{profile_id}")
+def get_profile_file(profile_id: str):
+    """
+    Download a request profile (speedscope JSON) named by a response's
+    X-Profile-Id header. Open it at https://www.speedscope.app.
+    """
+    if not PROFILING_ENABLED or not re.fullmatch(r"[0-9a-f]{16}", profile_id):
+        return Response(status_code=404)
+    path = profile_path(profile_id)
+    if not os.path.exists(path):
+        return Response(status_code=404)
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.speedscope.json")
+
+@app.post("/api/warm", response_model=ModelStatus)
+def warm(request: Request):
+    """
+    Load the models now (e.g. before a class starts) and pin them in memory.
+    """
+    model = ModelStatus(**gemma.warm_up())
+    status_hub.notify()
+    return respond(request, model)
+
+@app.get("/api/status/stream")
+async def status_stream(request: Request):
+    """
+    Server-Sent Events stream of StatusEvent payloads: the current status
+    on connect, then one event whenever model, OCR or queue state changes.
+    """
+    return StreamingResponse(
+        status_hub.events(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-@app.post("/api/chat")
+@app.post("/api/chat", response_model=Union[ChatResponse, ErrorResponse])
 async def chat(request: Request):
+    data = await request.json()
+    return respond(request, await answer_chat(data, partial(run_until_disconnect, request)))
+
+async def answer_chat(data: dict, run: Runner,
+                      on_token: Optional[Callable[[str], None]] = None) -> APIResponse:
+    """
+    Answer a chat request locally or with Gemma.
+
+    Args:
+        data: The request body
+        run: Runs blocking work under a cancel token (HTTP or WebSocket flavour)
+        on_token: Optional callback receiving generated text as it streams
+    """
+    prompt = data.get("prompt") or data.get("message") or ""
+    session_id = data.get("session_id")
+    document = data.get("document") or ""
+    # "escalate": true skips the small model's draft; sessions stay on the large model
+    cascade = not session_id and bool(data.get("escalate") or data.get("cascade", gemma.cascade_default))
+    # Arithmetic and simple equations are answered locally without the LLM
+    local = None if document.strip() else intent_router.answer(prompt)
+    if local:
+        gemma.remember(session_id, prompt, local.response)
+        return ChatResponse(response=local.response, method=local.method, session_id=session_id)
+
+    try:
+        profile = get_profile(data.get("profile") or intent_router.suggest_profile(prompt),
+                              data.get("options"))
+    except ValueError as e:
+        return ErrorResponse(error=str(e))
+    # "notes": true, or the number of excerpts to include
+    k = data["notes"] if type(data.get("notes")) is int else 4
+    if data.get("notes") is not None and not 1 <= k <= MAX_NOTES:
+        return ErrorResponse(error=f"notes must be true or a number from 1 to {MAX_NOTES}.")
+    chunks = None
+    if document.strip():
+        # Long documents are condensed in parallel chunks; the chat reply is the reduce step
+        summary_profile = get_profile("summarize")
+        summary_cancel = summary_profile.cancel_token()
+        try:
+            with jobs.interactive():
+                condensed = await run(summary_cancel, summarizer.condense, document, prompt or None,
+                                      DOCUMENT_TOKENS, profile=summary_profile, cancel=summary_cancel)
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            return ErrorResponse(error=f"Reading the document failed: {str(e)}")
+        chunks = condensed["chunks"] or None
+        heading = "Notes from a long document" if chunks else "Document"
+        prompt = f"{heading}:\n{condensed['text']}\n\n{prompt or 'Summarize the document.'}"
+    cancel = profile.cancel_token()
+    sources = None
+    if data.get("notes"):
+        try:
+            prompt, sources = await run(cancel, notes.augment, prompt, k, cancel=cancel)
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            return ErrorResponse(error=f"Notes search failed: {str(e)}")
+    # Background jobs pause (or are requeued) while a user waits on a reply
+    with jobs.interactive():
+        model = escalation = None
+        if session_id:
+            response = await run(cancel, gemma.chat, prompt, session_id=session_id, profile=profile,
+                                 cancel=cancel, on_token=on_token)
+        elif cascade:
+            result = await run(cancel, cached_cascade_chat, prompt, profile, cancel, on_token,
+                               bool(data.get("escalate")))
+            response, model, escalation = result["response"], result["model"], result.get("reason")
+        else:
+            response = await run(cancel, cached_chat, prompt, profile, cancel, on_token)
+    return ChatResponse(
+        response=response,
+        method="gemma",
+        model=model,
+        escalation=escalation,
+        document_chunks=chunks,
+        profile=profile.name,
+        session_id=session_id,
+        truncated=cancel.expired or None,
+        sources=[dict(source, text=None) for source in sources] if sources else None
+    )
+
+def cached_chat(prompt: str, profile: GenerationProfile, cancel: CancelToken,
+                on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Stateless chat with responses shared across workers for CHAT_CACHE_TTL seconds.
+    """
+    key = chat_cache_key(gemma.router.select_model(prompt), prompt, profile)
+    cached = store.get("chat", key)
+    if cached is not None:
+        return cached
+    response = gemma.chat(prompt, profile=profile, cancel=cancel, on_token=on_token)
+    if not cancel.expired:  # Never cache an answer cut off by the deadline
+        store.set("chat", key, response, ttl=CHAT_CACHE_TTL)
+    return response
+
+def cached_cascade_chat(prompt: str, profile: GenerationProfile, cancel: CancelToken,
+                        on_token: Optional[Callable[[str], None]] = None, escalate: bool = False) -> dict:
+    """
+    Stateless chat through the model cascade, cached like cached_chat.
+    """
+    key = chat_cache_key("cascade:large" if escalate else "cascade", prompt, profile)
+    cached = store.get("chat", key)
+    if cached is not None:
+        return cached
+    result = gemma.cascade_chat(prompt, profile=profile, cancel=cancel, on_token=on_token,
+                                escalate=escalate)
+    if not cancel.expired:
+        store.set("chat", key, result, ttl=CHAT_CACHE_TTL)
+    return result
+
+def chat_cache_key(model: str, prompt: str, profile: GenerationProfile) -> str:
+    options = profile.ollama_options(prompt)
+    return hashlib.sha256(f"{model}\0{sorted(options.items())}\0{prompt}".encode()).hexdigest()
+
+@app.post("/api/essay", response_model=Union[EssayResponse, ErrorResponse])
+async def essay(request: Request):
+    data = await request.json()
+    try:
+        prompt, profile = essay_request(data)
+    except ValueError as e:
+        return respond(request, ErrorResponse(error=str(e)))
+    cancel = profile.cancel_token()
+    return respond(request, await run_until_disconnect(request, cancel, write_essay, data, prompt,
+                                                       profile, cancel))
+
+def write_essay(data: dict, prompt: str, profile: GenerationProfile, cancel: CancelToken) -> EssayResponse:
+    """
+    Write an essay in one generation, or section by section through the
+    model cascade when it is enabled ("cascade", or OLLAMA_CASCADE=1).
+    """
+    if gemma.cascade is None or not data.get("cascade", gemma.cascade_default):
+        essay = gemma.chat(prompt, profile=profile, cancel=cancel)
+        return EssayResponse(essay=essay, method="gemma", profile=profile.name,
+                             truncated=cancel.expired or None)
+    essay_type = data.get("essay_type", "analytical")
+    templates = essay_writer.structure_templates
+    result = gemma.cascade.essay(data["topic"], templates.get(essay_type, templates["analytical"]),
+                                 int(data.get("length") or 500), profile, cancel,
+                                 tone=data.get("tone", "formal"), essay_type=essay_type,
+                                 refine_all=bool(data.get("refine_all")))
+    return EssayResponse(essay=result["essay"], method="cascade", profile=profile.name,
+                         truncated=cancel.expired or None, sections=result["drafted"],
+                         refined=result["refined"])
+
+def essay_request(data: dict) -> Tuple[str, GenerationProfile]:
+    """
+    Build the prompt and generation profile for an essay request.
+
+    Raises:
+        ValueError: If the topic is missing or the options are invalid
+    """
+    topic = data.get("topic")
+    if not topic:
+        raise ValueError("No topic provided.")
+    words = int(data.get("length") or 500)
+    options = dict(data.get("options") or {})
+    # Roughly 1.4 tokens per English word, plus room for headings
+    options.setdefault("num_predict", int(words * 1.4) + 64)
+    profile = get_profile("essay", options)
+    prompt = (
+        f"Write a {data.get('tone', 'formal')} {data.get('essay_type', 'analytical')} essay "
+        f"of about {words} words on the topic: {topic}"
+    )
+    return prompt, profile
+
+@app.post("/api/code", response_model=Union[ChatResponse, ErrorResponse])
+async def code(request: Request):
     data = await request.json()
     prompt = data.get("prompt") or data.get("message") or ""
-    response = gemma.chat(prompt)
-    return {"response": response, "method": "gemma"}
+    try:
+        profile = get_profile("code", data.get("options"))
+    except ValueError as e:
+        return respond(request, ErrorResponse(error=str(e)))
+    cancel = profile.cancel_token()
+    with jobs.interactive():
+        response = await run_until_disconnect(request, cancel, gemma.chat, prompt,
+                                              session_id=data.get("session_id"), profile=profile,
+                                              cancel=cancel)
+    return respond(request, ChatResponse(
+        response=response, method="gemma", profile=profile.name, truncated=cancel.expired or None
+    ))
+
+@app.delete("/api/sessions/{session_id}", response_model=DeleteSessionResponse)
+def delete_session(request: Request, session_id: str):
+    return respond(request, DeleteSessionResponse(deleted=gemma.sessions.delete(session_id)))
 
-@app.post("/api/ocr")
+@app.post("/api/ocr", response_model=Union[OCRResponse, ErrorResponse])
 async def ocr(request: Request):
     data = await request.json()
+    return respond(request, await answer_ocr(data, partial(run_until_disconnect, request)))
+
+async def answer_ocr(data: dict, run: Runner) -> APIResponse:
     image_data = data.get("image_data")
     if not image_data:
-        return {"error": "No image data provided."}
+        return ErrorResponse(error="No image data provided.")
+    try:
+        image_bytes = decode_image_data(image_data)
+        text = await run(CancelToken(), recognizer.extract_text_from_bytes, image_bytes, OCR_API_CONFIG)
+        return OCRResponse(text=text.strip())
+    except GenerationCancelled:
+        raise
+    except Exception as e:
+        return ErrorResponse(error=f"OCR failed: {str(e)}")
+
+def decode_image_data(image_data: str) -> bytes:
+    # Remove base64 header if present
+    if "," in image_data:
+        image_data = image_data.split(",", 1)[1]
+    return base64.b64decode(image_data)
+
+def collect_pages(images, document) -> list:
+    pages = [decode_image_data(image) for image in images]
+    if document:
+        pages.extend(split_document(decode_image_data(document)))
+    if len(pages) > MAX_PAGES:
+        raise ValueError(f"Too many pages ({len(pages)}); the limit is {MAX_PAGES}")
+    return pages
+
+@app.post("/api/ocr/batch", response_model=Union[OCRBatchResponse, ErrorResponse])
+async def ocr_batch(request: Request):
+    """
+    OCR many images or a multi-page document (TIFF, PDF) in one request.
+
+    Pages are processed in parallel. With "stream" (the default) each
+    page's result is sent as an NDJSON line (an OCRPage) as soon as it is
+    done, followed by a StreamSummary; otherwise all pages are returned
+    together in page order. `?fields=page,text` trims each page.
+    """
+    data = await request.json()
+    images = data.get("images") or []
+    document = data.get("document")
+    if not images and not document:
+        return respond(request, ErrorResponse(error="No images or document provided."))
+
+    cancel = CancelToken()
+    try:
+        pages = await run_until_disconnect(request, cancel, collect_pages, images, document)
+    except GenerationCancelled:
+        raise
+    except Exception as e:
+        return respond(request, ErrorResponse(error=f"OCR failed: {str(e)}"))
+
+    started = time.perf_counter()
+    futures = batch_ocr.submit(pages, OCR_API_CONFIG, cancel)
+
+    if not data.get("stream", True):
+        results = await gather_results(futures, cancel)
+        return respond(request, OCRBatchResponse(
+            pages=results,
+            text="\n\f".join(page.get("text", "") for page in results),
+            page_count=len(results),
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+        ))
+
+    return StreamingResponse(stream_results(request, futures, cancel, started, "page_count"),
+                             media_type="application/x-ndjson")
+
+@app.post("/api/solve", response_model=Union[SolveResponse, ErrorResponse])
+async def solve(request: Request):
+    """
+    Solve every math line of a text (e.g. a pasted worksheet) in one request.
+
+    Accepts "text" or a list of "lines". Results (SolveResult) stream back
+    as NDJSON in completion order unless "stream" is false.
+    `?fields=line,answer` trims each result.
+    """
+    data = await request.json()
+    lines = data.get("lines")
+    if lines is None:
+        lines = recognizer.equation_lines(data.get("text") or "")
+    if not lines:
+        return respond(request, ErrorResponse(error="No equations provided."))
+    return await solve_lines(request, data, lines, CancelToken(), time.perf_counter())
+
+@app.post("/api/solve-screen", response_model=Union[SolveResponse, ErrorResponse])
+async def solve_screen(request: Request):
+    """
+    OCR an image (or the server's screen when no "image_data" is sent) and
+    solve the equations on it, streaming each answer as it is ready.
+    """
+    data = await request.json()
+    cancel = CancelToken()
+    started = time.perf_counter()
+    try:
+        if data.get("image_data"):
+            image_bytes = decode_image_data(data["image_data"])
+            text = await run_until_disconnect(request, cancel, recognizer.extract_text_from_bytes, image_bytes)
+        else:
+            region = tuple(data["region"]) if data.get("region") else None
+            text = await run_until_disconnect(request, cancel, recognizer.read_screen, region)
+    except GenerationCancelled:
+        raise
+    except Exception as e:
+        return respond(request, ErrorResponse(error=f"OCR failed: {str(e)}"))
+
+    lines = recognizer.equation_lines(text)
+    if not lines:
+        return respond(request, SolveResponse(results=[], line_count=0, elapsed_ms=0.0, text=text))
+    return await solve_lines(request, data, lines, cancel, started)
+
+def screen_region_status() -> ScreenRegionResponse:
+    pinned = recognizer.screen_region
+    active = recognizer.active_window()
+    return ScreenRegionResponse(pinned=list(pinned) if pinned else None,
+                                active_window=list(active) if active else None)
+
+@app.get("/api/screen/region", response_model=ScreenRegionResponse)
+def get_screen_region(request: Request):
+    """
+    The pinned capture region and the focused window's bounds.
+    """
+    return respond(request, screen_region_status())
+
+@app.post("/api/screen/region", response_model=Union[ScreenRegionResponse, ErrorResponse])
+async def pin_screen_region(request: Request):
+    """
+    Pin "region" ([left, top, width, height]) for screen reads without one.
+    """
+    data = await request.json()
+    region = data.get("region")
+    if (not isinstance(region, list) or len(region) != 4
+            or not all(isinstance(value, int) for value in region) or region[2] <= 0 or region[3] <= 0):
+        return respond(request, ErrorResponse(error="region must be [left, top, width, height]."))
+    recognizer.pin_region(tuple(region))
+    return respond(request, await run_in_threadpool(screen_region_status))
+
+@app.delete("/api/screen/region", response_model=ScreenRegionResponse)
+def unpin_screen_region(request: Request):
+    recognizer.pin_region(None)
+    return respond(request, screen_region_status())
+
+async def solve_lines(request: Request, data: dict, lines: list, cancel: CancelToken, started: float):
+    futures = solve_pipeline.submit(lines, cancel)
+    if not data.get("stream", True):
+        results = await gather_results(futures, cancel)
+        return respond(request, SolveResponse(
+            results=results,
+            line_count=len(results),
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+        ))
+    return StreamingResponse(stream_results(request, futures, cancel, started, "line_count"),
+                             media_type="application/x-ndjson")
+
+async def gather_results(futures: list, cancel: CancelToken) -> list:
+    try:
+        return await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+    finally:
+        cancel.cancel()
+
+async def stream_results(request: Request, futures: list, cancel: CancelToken, started: float,
+                         count_key: str):
+    """
+    Yield each future's result as an NDJSON line when it completes, then a
+    final StreamSummary line.
+    """
+    fields = parse_fields(request.query_params.get("fields"))
+    try:
+        for next_done in asyncio.as_completed([asyncio.wrap_future(future) for future in futures]):
+            yield dumps(select_fields(await next_done, fields)) + b"\n"
+        summary = StreamSummary(elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+                                **{count_key: len(futures)})
+        yield summary.model_dump_json(exclude_none=True).encode() + b"\n"
+    finally:
+        # Reached on completion and when the client disconnects mid-stream
+        cancel.cancel("request finished")
+        for future in futures:
+            future.cancel()
+
+@app.post("/api/notes", response_model=Union[NotesDocument, ErrorResponse])
+async def add_notes(request: Request):
+    """
+    Add study notes ("text", optional "title") to the index that chat
+    requests with "notes": true draw on. Sending an existing "doc_id"
+    replaces that document.
+    """
+    data = await request.json()
+    text = data.get("text") or ""
+    if not text.strip():
+        return respond(request, ErrorResponse(error="No text provided."))
+    started = time.perf_counter()
+    cancel = CancelToken()
+    try:
+        document = await run_until_disconnect(request, cancel, notes.add_document, text,
+                                              data.get("title"), data.get("doc_id"), cancel=cancel)
+    except GenerationCancelled:
+        raise
+    except Exception as e:
+        return respond(request, ErrorResponse(error=f"Indexing notes failed: {str(e)}"))
+    return respond(request, NotesDocument(
+        **document, elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+    ))
+
+@app.get("/api/notes", response_model=NotesList)
+def list_notes(request: Request):
+    return respond(request, NotesList(documents=notes.index.documents()))
+
+@app.post("/api/notes/search", response_model=Union[NotesSearchResponse, ErrorResponse])
+async def search_notes(request: Request):
+    data = await request.json()
+    query = data.get("query") or ""
+    if not query.strip():
+        return respond(request, ErrorResponse(error="No query provided."))
+    try:
+        k = int(data.get("k", 4))
+    except (TypeError, ValueError):
+        k = 0
+    if not 1 <= k <= MAX_NOTES:
+        return respond(request, ErrorResponse(error=f"k must be a number from 1 to {MAX_NOTES}."))
+    cancel = CancelToken()
     try:
-        # Remove base64 header if present
-        if "," in image_data:
-            image_data = image_data.split(",", 1)[1]
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-        text = pytesseract.image_to_string(image)
-        return {"text": text.strip()}
+        results = await run_until_disconnect(request, cancel, notes.search, query, k, cancel=cancel)
+    except GenerationCancelled:
+        raise
     except Exception as e:
-        return {"error": f"OCR failed: {str(e)}"}
+        return respond(request, ErrorResponse(error=f"Notes search failed: {str(e)}"))
+    return respond(request, NotesSearchResponse(results=results))
+
+@app.delete("/api/notes/{doc_id}", response_model=DeleteSessionResponse)
+def delete_notes(request: Request, doc_id: str):
+    return respond(request, DeleteSessionResponse(deleted=notes.remove_document(doc_id)))
+
+def batches(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+@jobs.handler("essay", preemptible=True)
+def essay_job(job: Job) -> dict:
+    prompt, profile = essay_request(job.payload)
+    job.checkpoint()
+    cancel = job.bind(profile.cancel_token())
+    return write_essay(job.payload, prompt, profile, cancel).model_dump(exclude_none=True)
+
+@jobs.handler("solve")
+def solve_job(job: Job) -> dict:
+    lines = job.payload.get("lines") or recognizer.equation_lines(job.payload.get("text") or "")
+    started = time.perf_counter()
+    results = []
+    # A few lines per worker at a time, so interactive requests can cut in between
+    for start, batch in batches(lines, solve_pipeline.max_workers * 4):
+        job.checkpoint()
+        futures = solve_pipeline.submit(batch, job.cancel, start)
+        results.extend(future.result() for future in futures)
+        job.progress(len(results), len(lines))
+    return SolveResponse(
+        results=results,
+        line_count=len(results),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+    ).model_dump(exclude_none=True)
+
+@jobs.handler("ocr")
+def ocr_job(job: Job) -> dict:
+    pages = collect_pages(job.payload.get("images") or [], job.payload.get("document"))
+    started = time.perf_counter()
+    results = []
+    for start, batch in batches(pages, batch_ocr.max_workers):
+        job.checkpoint()
+        futures = batch_ocr.submit(batch, OCR_API_CONFIG, job.cancel, start)
+        results.extend(future.result() for future in futures)
+        job.progress(len(results), len(pages))
+    return OCRBatchResponse(
+        pages=results,
+        text="\n\f".join(page.get("text", "") for page in results),
+        page_count=len(results),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+    ).model_dump(exclude_none=True)
+
+def check_job(kind: str, data: dict):
+    """
+    Reject a job request that is bound to fail before queueing it.
+    """
+    if kind == "essay":
+        essay_request(data)
+    elif kind == "solve" and not (data.get("lines") or recognizer.equation_lines(data.get("text") or "")):
+        raise ValueError("No equations provided.")
+    elif kind == "ocr" and not (data.get("images") or data.get("document")):
+        raise ValueError("No images or document provided.")
+
+@app.post("/api/jobs", response_model=Union[JobStatus, ErrorResponse])
+async def submit_job(request: Request):
+    """
+    Queue an essay, solve or OCR request as a background job.
+
+    The body is the endpoint's usual body plus "type" ("essay", "solve" or
+    "ocr") and an optional "priority" ("high", "normal" or "low"). Poll
+    GET /api/jobs/{job_id} or subscribe to /api/jobs/{job_id}/events for
+    progress; the finished job's "result" is the endpoint's response.
+    """
+    data = await request.json()
+    kind = data.pop("type", None)
+    priority = data.pop("priority", "normal")
+    try:
+        check_job(kind, data)
+        record = jobs.submit(kind, data, priority)
+    except ValueError as e:
+        return respond(request, ErrorResponse(error=str(e)))
+    record.pop("payload")
+    return FastJSONResponse(JobStatus(**record), status_code=202)
+
+@app.get("/api/jobs", response_model=JobList)
+def list_jobs(request: Request, state: Optional[str] = None):
+    return respond(request, JobList(jobs=[JobStatus(**record) for record in jobs.list_jobs(state)]))
+
+@app.get("/api/jobs/{job_id}", response_model=Union[JobStatus, ErrorResponse])
+def get_job(request: Request, job_id: str):
+    record = jobs.get(job_id)
+    if record is None:
+        return FastJSONResponse(ErrorResponse(error="Job not found"), status_code=404)
+    record.pop("payload")
+    return respond(request, JobStatus(**record))
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """
+    Server-Sent Events stream of the job's JobStatus each time it changes,
+    ending when the job finishes.
+    """
+    return StreamingResponse(
+        jobs.events(job_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/api/jobs/{job_id}", response_model=Union[JobStatus, ErrorResponse])
+def cancel_job(request: Request, job_id: str):
+    if not jobs.cancel(job_id):
+        return FastJSONResponse(ErrorResponse(error="Job not found or already finished"), status_code=404)
+    record = jobs.get(job_id)
+    record.pop("payload")
+    return respond(request, JobStatus(**record))
+
+# One persistent connection per client, carrying many concurrent requests
+gateway = WebSocketGateway(rate_limiter)
+
+def gateway_runner(request: GatewayRequest) -> Runner:
+    async def run(cancel: CancelToken, func, /, *args, **kwargs):
+        request.bind(cancel)
+        return await run_in_threadpool(guarded(cancel, profiled(func)), *args, **kwargs)
+    return run
+
+@gateway.handler("chat")
+async def gateway_chat(message: dict, request: GatewayRequest):
+    return await answer_chat(message, gateway_runner(request),
+                             on_token=lambda token: request.emit_threadsafe("token", token=token))
+
+@gateway.handler("ocr")
+async def gateway_ocr(message: dict, request: GatewayRequest):
+    return await answer_ocr(message, gateway_runner(request))
+
+@gateway.handler("solve")
+async def gateway_solve(message: dict, request: GatewayRequest):
+    """
+    Solve each line, sending a "line" event (a SolveResult) per answer.
+    """
+    lines = message.get("lines")
+    if lines is None:
+        lines = recognizer.equation_lines(message.get("text") or "")
+    if not lines:
+        return ErrorResponse(error="No equations provided.")
+    started = time.perf_counter()
+    futures = solve_pipeline.submit(lines, request.cancel)
+    try:
+        for next_done in asyncio.as_completed([asyncio.wrap_future(future) for future in futures]):
+            request.emit("line", **await next_done)
+    finally:
+        for future in futures:
+            future.cancel()
+    return StreamSummary(line_count=len(lines), elapsed_ms=round((time.perf_counter() - started) * 1000, 2))
+
+@app.websocket("/ws")
+async def websocket_gateway(websocket: WebSocket):
+    """
+    WebSocket gateway multiplexing chat (with token streaming), OCR and
+    solve requests; see WebSocketGateway for the message format.
+    """
+    await gateway.serve(websocket)
+
+@app.exception_handler(GenerationCancelled)
+async def generation_cancelled(request: Request, exc: GenerationCancelled):
+    # The client is gone (or cancelled); 499 (client closed request) only shows up in logs
+    return Response(status_code=499)
+
+@app.exception_handler(GenerationTimeout)
+async def generation_timeout(request: Request, exc: GenerationTimeout):
+    # The deadline passed before any output; the client is still waiting for an answer
+    return FastJSONResponse(ErrorResponse(error=f"Generation timed out: {str(exc)}"), status_code=504)
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the veswo-bot backend")
+    parser.add_argument("--host", default=os.environ.get("VESWO_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("VESWO_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("VESWO_WORKERS", "1")),
+                        help="Number of worker processes")
+    args = parser.parse_args()
+    if args.workers > 1:
+        # Workers import the app by name; the SQLite store and leader lock coordinate them
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        uvicorn.run(app, host=args.host, port=args.port) 
\ No newline at end of file
@@ -1,19 +1,182 @@
-import requests
+from typing import Any, Callable, Dict, List, Optional, Union
+import os
+from .cascade import ModelCascade
+from .sessions import SessionStore, ChatSession
+from .model_router import ModelRouter, OllamaBackend
+from .generation import CancelToken, GenerationProfile, get_profile
+from .model_lifecycle import ModelLifecycle
 
 class GemmaAssistant:
-    def __init__(self, ollama_url="http://localhost:11434/api/generate", model="gemma"):
+    def __init__(self, ollama_url="http://localhost:11434/api/generate", model="gemma",
+                 sessions: Optional[SessionStore] = None, backends: Optional[List[str]] = None,
+                 small_model: Optional[str] = None, embed_model: Optional[str] = None):
         self.ollama_url = ollama_url
         self.model = model
-        print(f"Gemma AI backend initialized using Ollama at {self.ollama_url} with model '{self.model}'")
+        self.embed_model = embed_model or os.environ.get("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+        self.sessions = sessions or SessionStore()
+        if backends:
+            self.router = ModelRouter(backends, model=model, small_model=small_model)
+        else:
+            # OLLAMA_BACKENDS lets deployments add nodes without code changes
+            kwargs = {"small_model": small_model} if small_model else {}
+            self.router = ModelRouter.from_env(ollama_url, model, **kwargs)
+        self.lifecycle = ModelLifecycle(self.router, [model, self.router.small_model])
+        # Small model drafts, large model escalates and refines (needs OLLAMA_SMALL_MODEL)
+        self.cascade = (
+            ModelCascade(self._generate, self.router.small_model, model)
+            if self.router.small_model else None
+        )
+        self.cascade_default = os.environ.get("OLLAMA_CASCADE", "0") == "1"
+        nodes = ", ".join(backend.url for backend in self.router.backends)
+        print(f"Gemma AI backend initialized using Ollama at {nodes} with model '{self.model}'")
 
-    def chat(self, prompt):
+    def chat(self, prompt, session_id: Optional[str] = None,
+             profile: Union[str, GenerationProfile, None] = None,
+             cancel: Optional[CancelToken] = None,
+             on_token: Optional[Callable[[str], None]] = None):
+        """
+        Generate a reply to a prompt.
+
+        Args:
+            prompt: The user's message
+            session_id: Optional conversation to continue
+            profile: Generation profile (name or object) with the output budget,
+                stop sequences and deadline; defaults to "chat"
+            cancel: Cancellation token; a new one with the profile's deadline
+                is created if omitted
+            on_token: Optional callback receiving generated text as it streams
+
+        Returns:
+            The generated text
+        """
+        if not isinstance(profile, GenerationProfile):
+            profile = get_profile(profile)
+        if cancel is None:
+            cancel = profile.cancel_token()
+
+        if session_id is None:
+            return self._generate(prompt, model=self.router.select_model(prompt), profile=profile,
+                                  cancel=cancel, on_token=on_token)["response"]
+
+        session = self.sessions.get_or_create(session_id)
+        with session.lock:
+            return self._chat_in_session(session, prompt, profile, cancel, on_token)
+
+    def cascade_chat(self, prompt, profile: Union[str, GenerationProfile, None] = None,
+                     cancel: Optional[CancelToken] = None,
+                     on_token: Optional[Callable[[str], None]] = None,
+                     escalate: bool = False) -> Dict[str, Any]:
+        """
+        Generate a stateless reply through the model cascade: the small model
+        answers first and weak drafts are redone by the large model.
+
+        Sessions are not supported, since a KV context belongs to one model.
+        Without a small model every prompt goes to the large model.
+
+        Args:
+            prompt: The user's message
+            profile: Generation profile (name or object); defaults to "chat"
+            cancel: Cancellation token; a new one with the profile's deadline
+                is created if omitted
+            on_token: Optional callback receiving generated text
+            escalate: Skip the small model
+
+        Returns:
+            Dict with the "response", the "model" that wrote it and, when
+            escalated, the "reason"
+        """
+        if not isinstance(profile, GenerationProfile):
+            profile = get_profile(profile)
+        if cancel is None:
+            cancel = profile.cancel_token()
+        if self.cascade is None:
+            data = self._generate(prompt, profile=profile, cancel=cancel, on_token=on_token)
+            return {"response": data["response"], "model": self.model}
+        return self.cascade.answer(prompt, profile, cancel, on_token, escalate=escalate)
+
+    def remember(self, session_id: Optional[str], prompt: str, response: str):
+        """
+        Record a turn answered outside the model so follow-ups can refer to it.
+        """
+        if session_id is None:
+            return
+        session = self.sessions.get_or_create(session_id)
+        with session.lock:
+            session.add_turn("user", prompt)
+            session.add_turn("assistant", response)
+            self.sessions.save(session)
+
+    def _chat_in_session(self, session: ChatSession, prompt: str, profile: GenerationProfile,
+                         cancel: CancelToken, on_token: Optional[Callable[[str], None]]) -> str:
+        session.compact(self.sessions.token_budget, self.sessions.keep_recent, self._summarize)
+
+        def build_payload(backend: OllamaBackend):
+            # A KV context is only valid on the node and model that produced it
+            if session.backend != backend.url or session.model != self.model:
+                session.reset_context()
+            return self._payload(session.build_prompt(prompt), self.model, profile, session.context)
+
+        data, backend = self.router.generate(build_payload, prefer=session.backend,
+                                             cancel=cancel, on_token=on_token)
+
+        session.add_turn("user", prompt)
+        session.add_turn("assistant", data["response"])
+        if data.get("context"):
+            session.context = data["context"]
+            session.context_turns = len(session.turns)
+            session.backend = backend.url
+            session.model = self.model
+        else:
+            session.reset_context()
+        self.sessions.save(session)
+        return data["response"]
+
+    def embed(self, texts: List[str], cancel: Optional[CancelToken] = None) -> List[List[float]]:
+        """
+        Embed texts with the embedding model (OLLAMA_EMBED_MODEL).
+        """
+        return self.router.embed(texts, self.embed_model, cancel=cancel)
+
+    def warm_up(self):
+        """
+        Load the models on every Ollama node so the first chat does not pay for it.
+        """
+        return self.lifecycle.preload()
+
+    def _summarize(self, transcript: str) -> str:
+        prompt = (
+            "Summarize the following tutoring conversation in a few sentences, "
+            "keeping any facts, numbers and open questions the student may refer back to.\n\n"
+            f"{transcript}"
+        )
+        profile = get_profile("chat", {"num_predict": 256, "temperature": 0.2})
+        try:
+            return self._generate(prompt, model=self.router.select_model(prompt),
+                                  profile=profile)["response"].strip()
+        except Exception:
+            # Keep the tail of the transcript if the model is unavailable
+            return transcript[-2000:]
+
+    def _payload(self, prompt, model, profile: GenerationProfile, context=None):
         payload = {
-            "model": self.model,
+            "model": model,
             "prompt": prompt,
-            "stream": False
+            "stream": False,
+            "options": profile.ollama_options(prompt, len(context) if context else 0),
+            # Keeps the model resident between requests during active hours
+            "keep_alive": self.lifecycle.keep_alive_value()
         }
-        response = requests.post(self.ollama_url, json=payload)
-        response.raise_for_status()
-        return response.json()["response"]
+        if context:
+            payload["context"] = context
+        return payload
+
+    def _generate(self, prompt, model=None, profile: Optional[GenerationProfile] = None,
+                  context=None, cancel: Optional[CancelToken] = None,
+                  on_token: Optional[Callable[[str], None]] = None):
+        profile = profile or get_profile()
+        payload = self._payload(prompt, model or self.model, profile, context)
+        data, _ = self.router.generate(lambda backend: payload,
+                                       cancel=cancel or profile.cancel_token(), on_token=on_token)
+        return data
 
-    # You can add more methods for essay, code, etc., if needed, using the same pattern. 
\ No newline at end of file
+    # You can add more methods for essay, code, etc., if needed, using the same pattern.
@@ -0,0 +1,140 @@
+from typing import Any, Dict, Iterator, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from io import BytesIO
+import os
+import threading
+import time
+from PIL import Image, ImageSequence
+from .generation import CancelToken
+from .profiling import profiled
+from .screen_recognizer import ScreenRecognizer
+
+MAX_PAGES = int(os.environ.get("VESWO_OCR_MAX_PAGES", "200"))
+PDF_RENDER_SCALE = 300 / 72  # Render PDF pages at 300 dpi for tesseract
+
+
+def _encode_png(image: Image.Image) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _split_pdf(data: bytes) -> List[bytes]:
+    try:
+        import pypdfium2  # Optional dependency for PDF input
+    except ImportError:
+        raise ValueError("PDF documents require the pypdfium2 package")
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        if len(pdf) > MAX_PAGES:
+            raise ValueError(f"Document has {len(pdf)} pages; the limit is {MAX_PAGES}")
+        return [_encode_png(page.render(scale=PDF_RENDER_SCALE).to_pil()) for page in pdf]
+    finally:
+        pdf.close()
+
+
+def split_document(data: bytes) -> List[bytes]:
+    """
+    Split a multi-page document into one encoded image per page.
+
+    Multi-frame images (TIFF, GIF, ...) are split frame by frame and PDFs are
+    rendered page by page when pypdfium2 is installed. Single images are
+    returned unchanged, so their OCR cache key stays the upload's hash.
+
+    Args:
+        data: The encoded document
+
+    Returns:
+        List of encoded page images
+    """
+    if data[:5] == b"%PDF-":
+        return _split_pdf(data)
+
+    with Image.open(BytesIO(data)) as image:
+        frames = getattr(image, "n_frames", 1)
+        if frames == 1:
+            return [data]
+        if frames > MAX_PAGES:
+            raise ValueError(f"Document has {frames} pages; the limit is {MAX_PAGES}")
+        return [_encode_png(frame.convert("RGB")) for frame in ImageSequence.Iterator(image)]
+
+
+class BatchOCR:
+    """
+    Fan OCR for many pages out over a pool of worker threads.
+
+    Both OCR engines do their work outside the GIL (a tesseract subprocess
+    or libtesseract), so threads give real parallelism without the cost of
+    a process pool.
+    """
+
+    def __init__(self, recognizer: ScreenRecognizer, max_workers: Optional[int] = None):
+        self.recognizer = recognizer
+        self.max_workers = max_workers or int(os.environ.get("VESWO_OCR_WORKERS", str(os.cpu_count() or 2)))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr")
+        self.pending = 0  # Pages queued or being read
+        self._lock = threading.Lock()
+
+    def submit(self, pages: List[bytes], ocr_config: Optional[Dict[str, str]] = None,
+               cancel: Optional[CancelToken] = None, start: int = 0) -> List[Future]:
+        """
+        Queue every page for OCR.
+
+        Args:
+            pages: Encoded page images
+            ocr_config: Optional tesseract lang/config
+            cancel: Optional cancellation token shared by every page
+            start: Number of the first page, when reading a slice of a document
+
+        Returns:
+            One future per page, resolving to that page's result dict
+        """
+        cancel = cancel or CancelToken()
+        task = profiled(self._ocr_page)
+        with self._lock:
+            self.pending += len(pages)
+        futures = [
+            self.executor.submit(task, index, page, ocr_config, cancel)
+            for index, page in enumerate(pages, start)
+        ]
+        for future in futures:
+            future.add_done_callback(self._page_done)
+        return futures
+
+    def run(self, pages: List[bytes], ocr_config: Optional[Dict[str, str]] = None,
+            cancel: Optional[CancelToken] = None) -> Iterator[Dict[str, Any]]:
+        """
+        OCR the pages and yield each page's result as soon as it finishes.
+        """
+        futures = self.submit(pages, ocr_config, cancel)
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _page_done(self, future: Future):
+        with self._lock:
+            self.pending -= 1
+
+    def _ocr_page(self, index: int, page: bytes, ocr_config: Optional[Dict[str, str]],
+                  cancel: CancelToken) -> Dict[str, Any]:
+        cancel.raise_if_cancelled()
+        started = time.perf_counter()
+        try:
+            text = self.recognizer.extract_text_from_bytes(page, ocr_config)
+        except Exception as e:
+            return {
+                "page": index,
+                "error": str(e),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+        return {
+            "page": index,
+            "text": text,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
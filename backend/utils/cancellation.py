@@ -0,0 +1,57 @@
+from typing import Any, Callable
+import asyncio
+from starlette.concurrency import run_in_threadpool
+from .generation import CancelToken
+from .profiling import profiled
+
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+def guarded(cancel: CancelToken, func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap blocking work so it is skipped if its request was cancelled while
+    it was still queued for a worker thread.
+    """
+    def run(*args, **kwargs):
+        cancel.raise_if_cancelled()
+        return func(*args, **kwargs)
+    return run
+
+
+async def run_until_disconnect(request, cancel: CancelToken, func: Callable[..., Any], /,
+                               *args, **kwargs) -> Any:
+    """
+    Run blocking work in the threadpool while watching the client connection.
+
+    If the client disconnects first, the token is cancelled: queued work
+    never starts and a running generation closes its Ollama stream, so no
+    GPU time is spent on an answer nobody will read.
+
+    Args:
+        request: The incoming request (anything with an async is_disconnected())
+        cancel: Token passed to the work so it can stop early
+        func: Blocking callable to run
+        *args, **kwargs: Arguments for func (which may include its own `cancel`)
+
+    Returns:
+        The result of func
+
+    Raises:
+        GenerationCancelled: If the client disconnected
+    """
+    work = asyncio.ensure_future(run_in_threadpool(guarded(cancel, profiled(func)), *args, **kwargs))
+    try:
+        while not work.done():
+            done, _ = await asyncio.wait({work}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                break
+            if await request.is_disconnected():
+                cancel.cancel("client disconnected")
+                break
+        return await work
+    except asyncio.CancelledError:
+        # The server is abandoning the request (e.g. shutdown); stop the work too
+        cancel.cancel("request cancelled")
+        # Retrieve the worker's eventual GenerationCancelled so it is not logged
+        work.add_done_callback(lambda task: task.cancelled() or task.exception())
+        raise
@@ -0,0 +1,215 @@
+import os
+import sys
+import threading
+import numpy as np
+from PIL import Image
+from typing import Optional, Tuple, Union
+
+Region = Tuple[int, int, int, int]  # (left, top, width, height)
+
+
+class CaptureBackend:
+    """
+    Base class for screen capture backends.
+
+    Every backend returns frames as RGB uint8 numpy arrays of shape
+    (height, width, 3), which is what ScreenRecognizer works with.
+    """
+    name = "base"
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        """
+        Capture the screen or a region of the screen.
+
+        Args:
+            region: Optional tuple (left, top, width, height) defining screen region
+
+        Returns:
+            RGB numpy array containing the capture
+        """
+        raise NotImplementedError
+
+    def screen_size(self) -> Tuple[int, int]:
+        """
+        Return the (width, height) of the captured screen.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def bgra_to_rgb(buffer, width: int, height: int) -> np.ndarray:
+    """
+    View a raw BGRA buffer as an RGB array without copying pixel data.
+
+    The returned array is a strided view over the original buffer, so it is
+    only valid for as long as the buffer is kept alive (numpy holds a
+    reference to it).
+    """
+    frame = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 4)
+    return frame[:, :, 2::-1]
+
+
+class MSSCaptureBackend(CaptureBackend):
+    """
+    Fast native capture through python-mss.
+
+    On Linux this uses XGetImage with the MIT-SHM extension, on macOS
+    CoreGraphics and on Windows BitBlt, all without spawning a subprocess.
+    """
+    name = "mss"
+
+    def __init__(self, monitor: int = 1):
+        import mss  # Optional dependency, imported lazily
+        self._mss = mss
+        self.monitor = monitor
+        # mss handles hold a display connection that is not thread safe
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._mss.mss()
+            self._local.session = session
+        return session
+
+    def _monitor_bounds(self) -> dict:
+        monitors = self._session().monitors
+        index = self.monitor if self.monitor < len(monitors) else 0
+        return monitors[index]
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        if region:
+            left, top, width, height = region
+            bounds = {"left": left, "top": top, "width": width, "height": height}
+        else:
+            bounds = self._monitor_bounds()
+        shot = self._session().grab(bounds)
+        return bgra_to_rgb(shot.raw, shot.width, shot.height)
+
+    def screen_size(self) -> Tuple[int, int]:
+        bounds = self._monitor_bounds()
+        return bounds["width"], bounds["height"]
+
+    def close(self):
+        session = getattr(self._local, "session", None)
+        if session is not None:
+            session.close()
+            self._local.session = None
+
+
+class PyAutoGUICaptureBackend(CaptureBackend):
+    """
+    Portable fallback using pyautogui.screenshot.
+    """
+    name = "pyautogui"
+
+    def __init__(self):
+        # pyautogui connects to the display on import, so only import it when
+        # this backend is actually selected
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        if region:
+            screenshot = self._pyautogui.screenshot(region=region)
+        else:
+            screenshot = self._pyautogui.screenshot()
+        return np.asarray(screenshot.convert("RGB"))
+
+    def screen_size(self) -> Tuple[int, int]:
+        size = self._pyautogui.size()
+        return size[0], size[1]
+
+
+class FrameBufferCaptureBackend(CaptureBackend):
+    """
+    Virtual framebuffer backed by an in-memory frame or an image file.
+
+    Used in tests and on headless servers: "captures" are crops of the
+    stored frame, returned as views without copying.
+    """
+    name = "framebuffer"
+
+    def __init__(self, source: Union[str, np.ndarray, Image.Image, None] = None,
+                 size: Tuple[int, int] = (1280, 720)):
+        self._lock = threading.Lock()
+        if source is None:
+            width, height = size
+            source = np.full((height, width, 3), 255, dtype=np.uint8)
+        self.set_frame(source)
+
+    def set_frame(self, source: Union[str, np.ndarray, Image.Image]):
+        """
+        Replace the current frame with an image path, PIL image or array.
+        """
+        if isinstance(source, str):
+            with Image.open(source) as image:
+                frame = np.asarray(image.convert("RGB"))
+        elif isinstance(source, Image.Image):
+            frame = np.asarray(source.convert("RGB"))
+        else:
+            frame = np.asarray(source, dtype=np.uint8)
+            if frame.ndim == 2:
+                frame = np.stack([frame] * 3, axis=-1)
+            elif frame.shape[2] == 4:
+                frame = frame[:, :, :3]
+        with self._lock:
+            self._frame = frame
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        with self._lock:
+            frame = self._frame
+        if not region:
+            return frame
+        left, top, width, height = region
+        return frame[top:top + height, left:left + width]
+
+    def screen_size(self) -> Tuple[int, int]:
+        height, width = self._frame.shape[:2]
+        return width, height
+
+
+CAPTURE_BACKENDS = {
+    MSSCaptureBackend.name: MSSCaptureBackend,
+    PyAutoGUICaptureBackend.name: PyAutoGUICaptureBackend,
+    FrameBufferCaptureBackend.name: FrameBufferCaptureBackend,
+}
+
+
+def _has_display() -> bool:
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+
+def get_capture_backend(name: Optional[str] = None) -> CaptureBackend:
+    """
+    Create a capture backend by name.
+
+    The name defaults to the VESWO_CAPTURE_BACKEND environment variable. With
+    no explicit choice, mss is preferred, then pyautogui, and the virtual
+    framebuffer is used when no display is available at all.
+
+    Args:
+        name: One of "mss", "pyautogui", "framebuffer" or None for auto
+
+    Returns:
+        A ready-to-use CaptureBackend
+    """
+    name = name or os.environ.get("VESWO_CAPTURE_BACKEND")
+    if name:
+        if name not in CAPTURE_BACKENDS:
+            raise ValueError(f"Unsupported capture backend: {name}")
+        return CAPTURE_BACKENDS[name]()
+
+    if not _has_display():
+        return FrameBufferCaptureBackend()
+
+    for backend_class in (MSSCaptureBackend, PyAutoGUICaptureBackend):
+        try:
+            return backend_class()
+        except Exception:
+            continue
+    return FrameBufferCaptureBackend()
@@ -0,0 +1,203 @@
+from typing import Any, Callable, Dict, List, Optional
+import re
+import threading
+from .generation import CancelToken, GenerationProfile
+from .sessions import estimate_tokens
+
+# Phrases a model uses when it is out of its depth
+HEDGES = re.compile(
+    r"\b(i'?m not (sure|certain)|i don'?t know|i do not know|i cannot (answer|determine)|"
+    r"i can'?t (answer|determine|help)|not enough information|as an ai)\b",
+    re.IGNORECASE
+)
+# Prompts that deserve more than a one-liner
+DEMANDING = re.compile(
+    r'```|\b(explain|prove|derive|why|compare|analy[sz]e|step[- ]by[- ]step|code|essay)\b',
+    re.IGNORECASE
+)
+
+
+def repetition(text: str) -> float:
+    """
+    Share of word trigrams that repeat an earlier one (0 for varied text).
+    """
+    words = text.lower().split()
+    trigrams = [tuple(words[i:i + 3]) for i in range(len(words) - 2)]
+    if not trigrams:
+        return 0.0
+    return 1.0 - len(set(trigrams)) / len(trigrams)
+
+
+def escalation_reason(prompt: str, response: str, data: Optional[Dict[str, Any]] = None,
+                      min_tokens: int = 24) -> Optional[str]:
+    """
+    Decide whether a small model's draft should be redone by the large model.
+
+    Ollama does not report token probabilities, so this looks at what the
+    draft says and how it ended instead.
+
+    Args:
+        prompt: The prompt the draft answers
+        response: The draft
+        data: Final Ollama response (for done_reason)
+        min_tokens: Shortest acceptable answer to a demanding prompt
+
+    Returns:
+        Why the draft is not good enough, or None to accept it
+    """
+    text = response.strip()
+    if not text:
+        return "empty"
+    if data and data.get("done_reason") == "length":
+        return "truncated"
+    if HEDGES.search(text):
+        return "uncertain"
+    if len(text.split()) >= 30 and repetition(text) > 0.3:
+        return "repetitive"
+    if DEMANDING.search(prompt) and estimate_tokens(text) < min_tokens:
+        return "too_short"
+    return None
+
+
+class ModelCascade:
+    """
+    Answer with a small, fast model first and escalate to the large model
+    only when the draft looks weak.
+
+    Args:
+        generate: Runs one generation; called as generate(prompt, model=...,
+            profile=..., cancel=..., on_token=...) and returns the final
+            Ollama response
+        small_model: Model that drafts
+        large_model: Model that escalated prompts and refinements go to
+        max_draft_tokens: Prompts longer than this skip the draft, since
+            small models handle long inputs poorly
+        accept: Returns a reason to escalate a draft, or None
+    """
+
+    def __init__(self, generate: Callable[..., Dict[str, Any]], small_model: str, large_model: str,
+                 max_draft_tokens: int = 1024,
+                 accept: Callable[..., Optional[str]] = escalation_reason):
+        self.generate = generate
+        self.small_model = small_model
+        self.large_model = large_model
+        self.max_draft_tokens = max_draft_tokens
+        self.accept = accept
+        self._lock = threading.Lock()
+        self._stats = {"drafted": 0, "accepted": 0, "escalated": 0, "refined": 0}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counts of drafts, accepted drafts, escalations and refined essay sections.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def answer(self, prompt: str, profile: GenerationProfile, cancel: CancelToken,
+               on_token: Optional[Callable[[str], None]] = None,
+               escalate: bool = False) -> Dict[str, Any]:
+        """
+        Answer a prompt, drafting with the small model when that is likely enough.
+
+        The draft is not streamed while it is being judged; once accepted it
+        is passed to on_token in one piece. An escalated answer streams as usual.
+
+        Args:
+            prompt: The prompt
+            profile: Generation profile for both models
+            cancel: Cancellation token shared by the draft and the escalation
+            on_token: Optional callback receiving generated text
+            escalate: Go straight to the large model
+
+        Returns:
+            Dict with the "response", the "model" that wrote it and, when
+            escalated, the "reason"
+        """
+        reason = "requested" if escalate else None
+        if reason is None and estimate_tokens(prompt) > self.max_draft_tokens:
+            reason = "long_prompt"
+        if reason is None:
+            self._count("drafted")
+            data = self.generate(prompt, model=self.small_model, profile=profile, cancel=cancel)
+            draft = data["response"]
+            reason = self.accept(prompt, draft, data)
+            # Out of time: a weak draft beats no answer
+            if reason is None or cancel.expired:
+                self._count("accepted")
+                if on_token is not None and draft:
+                    on_token(draft)
+                return {"response": draft, "model": self.small_model}
+
+        self._count("escalated")
+        data = self.generate(prompt, model=self.large_model, profile=profile, cancel=cancel,
+                             on_token=on_token)
+        return {"response": data["response"], "model": self.large_model, "reason": reason}
+
+    def essay(self, topic: str, sections: List[str], words: int, profile: GenerationProfile,
+              cancel: CancelToken, tone: str = "formal", essay_type: str = "analytical",
+              on_token: Optional[Callable[[str], None]] = None,
+              refine_all: bool = False) -> Dict[str, Any]:
+        """
+        Write an essay section by section: the small model drafts every
+        section, the large model refines the introduction, the conclusion
+        and any draft that looks weak.
+
+        Args:
+            topic: The essay topic
+            sections: What each section covers, in order
+            words: Target length of the whole essay
+            profile: Essay generation profile; its output budget is split
+                across the sections
+            cancel: Cancellation token for the whole essay
+            tone: Writing tone
+            essay_type: Type of essay
+            on_token: Optional callback receiving each finished section
+            refine_all: Have the large model refine every section
+
+        Returns:
+            Dict with the "essay" and the number of sections "drafted" and "refined"
+        """
+        section_words = max(60, words // len(sections))
+        # Roughly 1.4 tokens per English word, plus a little slack
+        section_profile = profile.with_overrides({"num_predict": int(section_words * 1.4) + 32})
+        outline = "\n".join(f"{number}. {section}" for number, section in enumerate(sections, 1))
+        written: List[str] = []
+        refined = 0
+        for index, section in enumerate(sections):
+            if cancel.expired:
+                break
+            previous = " ".join(" ".join(written).split()[-60:])
+            prompt = (
+                f"You are writing a {tone} {essay_type} essay on the topic: {topic}\n"
+                f"Outline:\n{outline}\n\n"
+                + (f"The essay so far ends with: ...{previous}\n\n" if previous else "")
+                + f"Write only section {index + 1} ({section}) in about {section_words} words. "
+                "Do not add a heading."
+            )
+            self._count("drafted")
+            data = self.generate(prompt, model=self.small_model, profile=section_profile, cancel=cancel)
+            text = data["response"].strip()
+            # Judge the draft against its section, not the instructions around it
+            weak = self.accept(section, text, data)
+            if weak is None and len(text.split()) < section_words / 3:
+                weak = "too_short"
+            if (refine_all or weak or index in (0, len(sections) - 1)) and not cancel.expired:
+                revision = self.generate(
+                    f"Revise this {section.lower()} section of a {tone} {essay_type} essay on "
+                    f"\"{topic}\". Improve clarity, accuracy and flow, keep about {section_words} "
+                    f"words and return only the revised section without a heading.\n\n{text}",
+                    model=self.large_model, profile=section_profile, cancel=cancel
+                )["response"].strip()
+                # A revision cut off by the deadline is worse than the full draft
+                if revision and not cancel.expired:
+                    text = revision
+                    refined += 1
+            written.append(text)
+            if on_token is not None:
+                on_token(text + ("\n\n" if index < len(sections) - 1 else ""))
+        self._count("refined", refined)
+        return {"essay": "\n\n".join(written), "drafted": len(written), "refined": refined}
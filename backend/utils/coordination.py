@@ -0,0 +1,139 @@
+from typing import Optional
+import os
+import threading
+import time
+from .shared_store import SharedStore, default_store_path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LeaderLock:
+    """
+    Non-blocking inter-process lock used to elect one leader worker.
+
+    The lock is held for the lifetime of the process and released by the
+    OS if the worker dies, so another worker can take over.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(os.path.dirname(default_store_path()), "leader.lock")
+        self._file = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        handle = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            return False
+        self._file = handle
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class BackendMonitor:
+    """
+    Background thread coordinating Ollama warm-up and health probing.
+
+    Only the leader worker warms the model and probes the nodes; it
+    publishes node health to the shared store. Every other worker applies
+    the published health to its own router instead of probing itself.
+    Followers keep trying to take over leadership in case the leader exits.
+    The leader also deletes expired shared store entries now and then.
+    """
+    HEALTH_KEY = "ollama_nodes"
+    MODEL_KEY = "model_lifecycle"
+    PURGE_INTERVAL = 3600.0
+
+    def __init__(self, assistant, store: SharedStore, leader: LeaderLock,
+                 interval: float = 10.0):
+        self.assistant = assistant
+        self.store = store
+        self.leader = leader
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._warmed = False
+        self._purged_at = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="backend-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+        self.leader.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.leader.acquire():
+                    self._lead()
+                else:
+                    self._follow()
+            except Exception as e:
+                print(f"Backend monitor error: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def _lead(self):
+        lifecycle = self.assistant.lifecycle
+        if not self._warmed:
+            self.store.set("health", self.MODEL_KEY, {**lifecycle.status(), "state": lifecycle.LOADING})
+            self.assistant.warm_up()
+            self._warmed = True
+        else:
+            lifecycle.refresh()
+            lifecycle.ensure_loaded()
+        nodes = self.assistant.router.check_health()
+        self.store.set("health", self.HEALTH_KEY, {"nodes": nodes, "checked_at": time.time()})
+        self.store.set("health", self.MODEL_KEY, lifecycle.status())
+        if time.time() - self._purged_at > self.PURGE_INTERVAL:
+            purged = self.store.purge_expired()
+            self._purged_at = time.time()
+            if purged:
+                print(f"Purged {purged} expired cache entries")
+
+    def _follow(self):
+        model_status = self.store.get("health", self.MODEL_KEY)
+        if model_status:
+            self.assistant.lifecycle.apply_status(model_status)
+
+        published = self.store.get("health", self.HEALTH_KEY)
+        if not published:
+            return
+        router = self.assistant.router
+        for node in published["nodes"]:
+            backend = router.get_backend(node["url"])
+            if backend is None:
+                continue
+            if node["healthy"]:
+                backend.ejected_until = 0.0
+            elif backend.is_available(time.time()):
+                router.eject(backend, self.interval)
@@ -0,0 +1,151 @@
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field, replace
+import os
+import threading
+import time
+from .sessions import estimate_tokens
+
+# Changing num_ctx makes Ollama reload the model, so every profile shares
+# one window by default and only grows it when a prompt would not fit
+DEFAULT_NUM_CTX = int(os.environ.get("VESWO_NUM_CTX", "4096"))
+MAX_NUM_CTX = int(os.environ.get("VESWO_MAX_NUM_CTX", "16384"))
+MAX_NUM_PREDICT = 4096
+MAX_DEADLINE = 600.0
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+class GenerationTimeout(Exception):
+    """
+    The deadline passed before the model produced any output (e.g. during a
+    slow prefill or model load); the node itself may be perfectly healthy.
+    """
+    pass
+
+
+class CancelToken:
+    """
+    Cancellation flag shared between a request handler and the worker
+    thread generating for it, with an optional deadline.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self._event = threading.Event()
+        self.expires_at = time.monotonic() + deadline if deadline else None
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise GenerationCancelled(self.reason)
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    name: str
+    num_predict: int
+    temperature: float
+    stop: List[str] = field(default_factory=list)
+    num_ctx: int = DEFAULT_NUM_CTX
+    deadline: float = 60.0  # Seconds before the generation is cut off
+
+    OVERRIDABLE = ("num_predict", "temperature", "stop", "num_ctx", "deadline")
+
+    def with_overrides(self, overrides: Optional[Dict[str, Any]]) -> "GenerationProfile":
+        """
+        Apply per-request overrides, clamped to the server-side limits.
+
+        Raises:
+            ValueError: For unknown options or values of the wrong type
+        """
+        if not overrides:
+            return self
+        unknown = set(overrides) - set(self.OVERRIDABLE)
+        if unknown:
+            raise ValueError(f"Unsupported generation options: {', '.join(sorted(unknown))}")
+
+        values = {}
+        try:
+            if "num_predict" in overrides:
+                values["num_predict"] = max(1, min(int(overrides["num_predict"]), MAX_NUM_PREDICT))
+            if "temperature" in overrides:
+                values["temperature"] = max(0.0, min(float(overrides["temperature"]), 2.0))
+            if "num_ctx" in overrides:
+                values["num_ctx"] = max(512, min(int(overrides["num_ctx"]), MAX_NUM_CTX))
+            if "deadline" in overrides:
+                values["deadline"] = max(1.0, min(float(overrides["deadline"]), MAX_DEADLINE))
+            if "stop" in overrides:
+                stop = overrides["stop"]
+                if isinstance(stop, str):
+                    stop = [stop]
+                if not isinstance(stop, list) or not all(isinstance(s, str) for s in stop):
+                    raise ValueError("stop must be a string or a list of strings")
+                values["stop"] = stop[:8]
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid generation options: {str(e)}")
+        return replace(self, **values)
+
+    def ollama_options(self, prompt: str = "", context_tokens: int = 0) -> Dict[str, Any]:
+        """
+        Options for the Ollama request, growing num_ctx only when the reused
+        context, the prompt and the output budget would not fit.
+        """
+        num_ctx = self.num_ctx
+        needed = context_tokens + estimate_tokens(prompt) + self.num_predict
+        while num_ctx < needed and num_ctx < MAX_NUM_CTX:
+            num_ctx *= 2
+        options = {
+            "num_predict": self.num_predict,
+            "temperature": self.temperature,
+            "num_ctx": min(num_ctx, MAX_NUM_CTX),
+        }
+        if self.stop:
+            options["stop"] = list(self.stop)
+        return options
+
+    def cancel_token(self) -> CancelToken:
+        return CancelToken(self.deadline)
+
+
+PROFILES = {
+    "chat": GenerationProfile("chat", num_predict=512, temperature=0.7,
+                              stop=["\nUser:"], deadline=60.0),
+    "essay": GenerationProfile("essay", num_predict=2048, temperature=0.8,
+                               stop=["\nUser:"], deadline=180.0),
+    "code": GenerationProfile("code", num_predict=1024, temperature=0.2, deadline=120.0),
+    "solve": GenerationProfile("solve", num_predict=384, temperature=0.1,
+                               stop=["\nUser:"], deadline=45.0),
+    # Per-chunk notes for long documents; the deadline covers every chunk
+    "summarize": GenerationProfile("summarize", num_predict=384, temperature=0.2,
+                                   stop=["\nUser:"], deadline=300.0),
+}
+
+
+def get_profile(name: Optional[str] = None,
+                overrides: Optional[Dict[str, Any]] = None) -> GenerationProfile:
+    """
+    Look up a generation profile by name and apply request overrides.
+    """
+    name = name or "chat"
+    if name not in PROFILES:
+        raise ValueError(f"Unsupported generation profile: {name}")
+    return PROFILES[name].with_overrides(overrides)
@@ -0,0 +1,210 @@
+from typing import Optional, Union
+from dataclasses import dataclass
+import ast
+import math
+import operator
+import re
+from sympy import Eq, Symbol, nan, oo, zoo
+from sympy.parsing.sympy_parser import (
+    parse_expr,
+    standard_transformations,
+    implicit_multiplication_application,
+)
+from .problem_solver import Problem, ProblemSolver, ProblemType
+from .shared_store import SharedStore
+
+@dataclass
+class LocalAnswer:
+    response: str
+    method: str
+
+class IntentRouter:
+    """
+    Answer plain arithmetic and single equations locally so they never reach
+    the LLM. Anything else returns None and should go to GemmaAssistant.chat.
+    """
+    ARITHMETIC_METHOD = "Direct Evaluation"
+    EQUATION_METHOD = "Problem Solver"
+
+    MAX_PROMPT_LENGTH = 120
+    MAX_EXPONENT = 64
+    # Larger results (about 1200 digits) go to the LLM instead of tying up the CPU
+    MAX_RESULT_BITS = 4096
+    # Solved equations are cheap to redo, so the shared memo only keeps them a day
+    MEMO_TTL = 24 * 3600
+
+    _operators = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.FloorDiv: operator.floordiv,
+        ast.Mod: operator.mod,
+        ast.Pow: operator.pow,
+        ast.USub: operator.neg,
+        ast.UAdd: operator.pos,
+    }
+
+    def __init__(self, problem_solver: Optional[ProblemSolver] = None,
+                 store: Optional[SharedStore] = None):
+        self.problem_solver = problem_solver or ProblemSolver()
+        # Optional memo of solved equations shared between worker processes
+        self.store = store
+        self.question_prefix = re.compile(
+            r'^\s*(what\s+is|what\'s|calculate|compute|evaluate|solve(\s+for\s+[a-z])?)\s*[:,]?\s*',
+            re.IGNORECASE
+        )
+        self.arithmetic_pattern = re.compile(r'^[\d\s+\-*/^().%]+$')
+        # Only single-letter unknowns, so parse_expr never sees a callable name
+        self.equation_pattern = re.compile(r'^[\da-zA-Z\s+\-*/().]+=[\da-zA-Z\s+\-*/().]+$')
+        self.unsafe_names = re.compile(r'[a-zA-Z]\s*[a-zA-Z.]')
+        self.transformations = standard_transformations + (implicit_multiplication_application,)
+        self.code_hint = re.compile(
+            r'```|\b(def|class|function|import|return|python|javascript|java|c\+\+|code|bug|compile)\b',
+            re.IGNORECASE
+        )
+        self.math_hint = re.compile(
+            r'\b(solve|equation|derivative|integral|simplify|factor|calculate)\b|\d\s*[+\-*/^=]\s*\w',
+            re.IGNORECASE
+        )
+
+    def answer(self, prompt: str) -> Optional[LocalAnswer]:
+        """
+        Try to answer a prompt without the LLM.
+
+        Args:
+            prompt: The user's chat message
+
+        Returns:
+            LocalAnswer if the prompt was arithmetic or an equation, else None
+        """
+        if len(prompt) > self.MAX_PROMPT_LENGTH or not re.search(r'\d', prompt):
+            return None
+
+        display = self.question_prefix.sub('', prompt.strip()).rstrip('?.! ')
+        return self.answer_normalized(self._normalize(display), display)
+
+    def answer_normalized(self, text: str, display: Optional[str] = None) -> Optional[LocalAnswer]:
+        """
+        Answer an expression or equation whose operators are already in
+        Python form (no question prefix, "**" for powers).
+
+        Args:
+            text: The normalized expression or equation
+            display: How to show the expression in the response (defaults to text)
+
+        Returns:
+            LocalAnswer if text was arithmetic or a solvable equation, else None
+        """
+        display = display or text
+        if self.arithmetic_pattern.match(text) and re.search(r'\d\s*[+\-*/%]', text):
+            value = self._evaluate(text)
+            if value is not None:
+                return LocalAnswer(f"{display} = {self._format_number(value)}", self.ARITHMETIC_METHOD)
+            return None
+
+        if (text.count('=') == 1 and self.equation_pattern.match(text)
+                and not self.unsafe_names.search(text)):
+            solution = self._memoized_solve(text)
+            if solution:
+                return LocalAnswer(solution, self.EQUATION_METHOD)
+
+        return None
+
+    def suggest_profile(self, prompt: str) -> str:
+        """
+        Pick the generation profile for a prompt the LLM has to answer.
+        """
+        if self.code_hint.search(prompt):
+            return "code"
+        if self.math_hint.search(prompt):
+            return "solve"
+        return "chat"
+
+    def _normalize(self, text: str) -> str:
+        for symbol, replacement in (('×', '*'), ('÷', '/'), ('−', '-'), ('^', '**')):
+            text = text.replace(symbol, replacement)
+        return text.strip()
+
+    def _evaluate(self, expression: str) -> Optional[Union[int, float]]:
+        """
+        Safely evaluate a purely numeric expression via the AST.
+        """
+        try:
+            tree = ast.parse(expression, mode='eval')
+            return self._eval_node(tree.body)
+        except (SyntaxError, ValueError, TypeError, ZeroDivisionError, OverflowError):
+            return None
+
+    def _eval_node(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and type(node.op) in self._operators:
+            return self._operators[type(node.op)](self._eval_node(node.operand))
+        if isinstance(node, ast.BinOp) and type(node.op) in self._operators:
+            left = self._eval_node(node.left)
+            right = self._eval_node(node.right)
+            if isinstance(node.op, ast.Pow):
+                if abs(right) > self.MAX_EXPONENT:
+                    raise ValueError("Exponent too large")
+                # Each power may stay small while a nested one explodes, so bound the result
+                if isinstance(left, int) and abs(left).bit_length() * abs(right) > self.MAX_RESULT_BITS:
+                    raise OverflowError("Result too large")
+            value = self._operators[type(node.op)](left, right)
+            if isinstance(value, int) and value.bit_length() > self.MAX_RESULT_BITS:
+                raise OverflowError("Result too large")
+            # (-8)**(1/3) is complex in Python; leave such answers to the LLM
+            if isinstance(value, complex) or (isinstance(value, float) and not math.isfinite(value)):
+                raise ValueError("Result is not a finite real number")
+            return value
+        raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+    def _memoized_solve(self, text: str) -> Optional[str]:
+        if self.store is None:
+            return self._solve_equation(text)
+        key = re.sub(r'\s+', '', text)
+        memo = self.store.get("solver", key)
+        if memo is not None:
+            return memo["solution"]
+        solution = self._solve_equation(text)
+        self.store.set("solver", key, {"solution": solution}, ttl=self.MEMO_TTL)
+        return solution
+
+    def _solve_equation(self, text: str) -> Optional[str]:
+        # Map every letter to a Symbol so names like E, I or S are not sympy constants
+        names = {letter: Symbol(letter) for letter in set(re.findall(r'[a-zA-Z]', text))}
+        try:
+            left, right = text.split('=')
+            equation = Eq(
+                parse_expr(left, local_dict=names, transformations=self.transformations),
+                parse_expr(right, local_dict=names, transformations=self.transformations)
+            )
+        except Exception:
+            return None
+        # x/0 parses to zoo*x, which would otherwise "solve" to x = 0
+        if equation.has(zoo, nan, oo, -oo):
+            return None
+
+        unknowns = sorted(equation.free_symbols, key=lambda symbol: symbol.name)
+        if len(unknowns) != 1:
+            return None
+
+        problem = Problem(
+            text=text,
+            type=ProblemType.MATH,
+            variables={symbol.name: symbol for symbol in unknowns},
+            equations=[equation],
+            known_values={},
+            unknown_variables=[symbol.name for symbol in unknowns]
+        )
+        result = self.problem_solver.solve_problem(problem)
+        if not result['solution']:
+            return None
+        return "\n".join(
+            f"{var} = {self._format_number(value)}" for var, value in result['solution'].items()
+        )
+
+    def _format_number(self, value: Union[int, float]) -> str:
+        if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:g}" if isinstance(value, float) else str(value)
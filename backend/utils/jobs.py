@@ -0,0 +1,444 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from contextlib import contextmanager
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from .generation import CancelToken, GenerationCancelled
+from .responses import dumps
+from .shared_store import default_store_path
+
+# Lower runs first; interactive chat is not a job and always goes ahead of all of them
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+PREEMPTED = "preempted by interactive request"
+CLIENT_CANCELLED = "cancelled by client"
+SHUTDOWN = "shutting down"
+
+
+class Job:
+    """
+    A job being run by a worker thread, handed to its handler.
+
+    Handlers report progress with progress() and call checkpoint() between
+    units of work so they pause while interactive requests are running.
+    """
+
+    def __init__(self, queue: "JobQueue", record: Dict[str, Any]):
+        self.id = record["job_id"]
+        self.kind = record["type"]
+        self.priority = record["priority"]
+        self.payload = record["payload"]
+        self.preemptions = record["preemptions"]
+        self.cancel = CancelToken()
+        # Set by a client cancel, which must win over a preemption already under way
+        self.cancel_requested = False
+        self._queue = queue
+
+    def bind(self, cancel: CancelToken) -> CancelToken:
+        """
+        Make `cancel` (e.g. a profile's token with its deadline) the one
+        cancellation and preemption will trip.
+        """
+        if self.cancel.cancelled:
+            cancel.cancel(self.cancel.reason)
+        self.cancel = cancel
+        return cancel
+
+    def request_cancel(self):
+        """
+        Cancel at the client's request, replacing any earlier reason such
+        as a preemption so the job is not requeued.
+        """
+        self.cancel_requested = True
+        self.cancel.cancel(CLIENT_CANCELLED)
+        self.cancel.reason = CLIENT_CANCELLED
+
+    def progress(self, done: int, total: int):
+        self._queue._update(self.id, done=done, total=total)
+
+    def checkpoint(self):
+        """
+        Stop if the job was cancelled, and wait while interactive requests run.
+        """
+        self.cancel.raise_if_cancelled()
+        while not self._queue.idle.wait(0.5):
+            self.cancel.raise_if_cancelled()
+        self.cancel.raise_if_cancelled()
+
+
+JobHandler = Callable[[Job], Dict[str, Any]]
+
+
+class JobQueue:
+    """
+    Persistent priority queue for long-running work (essays, batch solves,
+    multi-page OCR) run by background worker threads.
+
+    Jobs live in the shared SQLite database, so they survive a restart and
+    any worker process can report on them. Jobs are claimed highest
+    priority first, then oldest first. While interactive requests are in
+    flight (see interactive()) no new job starts, running jobs pause at
+    their next checkpoint, and preemptible jobs (a single long generation)
+    are stopped and requeued, at most `max_preemptions` times each.
+    """
+
+    def __init__(self, path: Optional[str] = None, workers: Optional[int] = None,
+                 heartbeat: float = 5.0, stale_after: float = 15.0, keep_finished: float = 86400.0,
+                 max_preemptions: int = 3, on_change: Optional[Callable[[], None]] = None):
+        self.path = path or default_store_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.workers = workers or int(os.environ.get("VESWO_JOB_WORKERS", "1"))
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self.keep_finished = keep_finished
+        self.max_preemptions = max_preemptions
+        self.on_change = on_change
+        self.handlers: Dict[str, JobHandler] = {}
+        self.preemptible: Dict[str, bool] = {}
+        self.running: Dict[str, Job] = {}
+        self.idle = threading.Event()  # Set while no interactive request is running
+        self.idle.set()
+        self._interactive = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " priority INTEGER NOT NULL,"
+            " state TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " done INTEGER,"
+            " total INTEGER,"
+            " preemptions INTEGER NOT NULL DEFAULT 0,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " heartbeat_at REAL)"
+        )
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (state, priority, created_at)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def handler(self, kind: str, preemptible: bool = False) -> Callable[[JobHandler], JobHandler]:
+        """
+        Register a handler(job) -> result dict for jobs of this kind.
+
+        Args:
+            kind: Job type name used when submitting
+            preemptible: Whether the job may be stopped and restarted from
+                scratch when an interactive request arrives
+        """
+        def register(func: JobHandler) -> JobHandler:
+            self.handlers[kind] = func
+            self.preemptible[kind] = preemptible
+            return func
+        return register
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: str = "normal") -> Dict[str, Any]:
+        """
+        Queue a job.
+
+        Returns:
+            The job record
+
+        Raises:
+            ValueError: For unknown job types or priorities
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unsupported job type: {kind}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unsupported priority: {priority} (use {', '.join(PRIORITIES)})")
+        job_id = uuid.uuid4().hex
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, priority, state, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, PRIORITIES[priority], QUEUED, json.dumps(payload), time.time())
+        )
+        self._changed()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def list_jobs(self, state: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        if state:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY created_at DESC LIMIT ?", (state, limit)
+            )
+        else:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            )
+        return [self._record(row, payload=False) for row in rows]
+
+    def active(self) -> int:
+        """
+        Jobs queued or running in any worker process.
+        """
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", (QUEUED, RUNNING)
+        ).fetchone()[0]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job. A job running in another worker
+        process stops at its owner's next heartbeat.
+
+        Returns:
+            False if the job does not exist or already finished
+        """
+        conn = self._connection()
+        cursor = conn.execute(
+            "UPDATE jobs SET state = ?, finished_at = ? WHERE id = ? AND state = ?",
+            (CANCELLED, time.time(), job_id, QUEUED)
+        )
+        if not cursor.rowcount:
+            cursor = conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND state = ?", (job_id, RUNNING)
+            )
+            if not cursor.rowcount:
+                return False
+            with self._lock:
+                job = self.running.get(job_id)
+            if job is not None:
+                job.request_cancel()
+        self._changed()
+        return True
+
+    @contextmanager
+    def interactive(self):
+        """
+        Mark an interactive request as running: jobs pause, and preemptible
+        ones are stopped and requeued, until the last one finishes.
+        """
+        with self._lock:
+            self._interactive += 1
+            self.idle.clear()
+            running = list(self.running.values())
+        for job in running:
+            if self.preemptible.get(job.kind) and job.preemptions < self.max_preemptions:
+                job.cancel.cancel(PREEMPTED)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._interactive -= 1
+                if not self._interactive:
+                    self.idle.set()
+
+    def start(self):
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"jobs-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._monitor, name="jobs-monitor", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop the workers; jobs they were running go back to the queue.
+        """
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            running = list(self.running.values())
+        for job in running:
+            job.cancel.cancel(SHUTDOWN)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def claim(self) -> Optional[Job]:
+        """
+        Atomically take the next queued job, highest priority first.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY priority, created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET state = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (RUNNING, now, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = Job(self, self._record(row))
+        with self._lock:
+            self.running[job.id] = job
+        self._changed()
+        return job
+
+    def run(self, job: Job):
+        """
+        Run a claimed job to completion, failure, cancellation or preemption.
+        """
+        try:
+            result = self.handlers[job.kind](job)
+        except GenerationCancelled:
+            reason = job.cancel.reason
+            if reason in (PREEMPTED, SHUTDOWN) and not self._cancel_requested(job):
+                # Runs again from the start once the queue gets to it
+                self._update(job.id, state=QUEUED, started_at=None,
+                             preemptions=job.preemptions + (reason == PREEMPTED))
+            else:
+                self._finish(job, CANCELLED, error=reason)
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+        else:
+            self._finish(job, DONE, result=result)
+        finally:
+            with self._lock:
+                self.running.pop(job.id, None)
+            self._changed()
+
+    def _work(self):
+        while not self._stop.is_set():
+            # Interactive requests go first; don't start anything while they run
+            if not self.idle.wait(0.5):
+                continue
+            try:
+                job = self.claim()
+            except Exception as e:
+                print(f"Job queue error: {str(e)}")
+                job = None
+            if job is None:
+                # Also polls for jobs submitted by other worker processes
+                self._wake.wait(1.0)
+                self._wake.clear()
+                continue
+            self.run(job)
+
+    def _monitor(self):
+        while not self._stop.wait(self.heartbeat):
+            try:
+                self._beat()
+            except Exception as e:
+                print(f"Job monitor error: {str(e)}")
+
+    def _beat(self):
+        conn = self._connection()
+        now = time.time()
+        with self._lock:
+            running = list(self.running.values())
+        for job in running:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (now, job.id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job.id,)).fetchone()
+            if row is not None and row[0]:
+                job.request_cancel()
+        # Jobs whose worker died (e.g. the backend was killed) run again
+        requeued = conn.execute(
+            "UPDATE jobs SET state = ?, started_at = NULL WHERE state = ? AND heartbeat_at < ?",
+            (QUEUED, RUNNING, now - self.stale_after)
+        ).rowcount
+        conn.execute(
+            "DELETE FROM jobs WHERE state IN (?, ?, ?) AND finished_at < ?",
+            FINISHED + (now - self.keep_finished,)
+        )
+        if requeued:
+            self._changed()
+
+    def _cancel_requested(self, job: Job) -> bool:
+        # Another worker process can only leave the flag in the database
+        if job.cancel_requested:
+            return True
+        row = self._connection().execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job.id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def _finish(self, job: Job, state: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None):
+        self._update(job.id, state=state, finished_at=time.time(), error=error,
+                     result=json.dumps(result, default=str) if result is not None else None)
+
+    def _update(self, job_id: str, **columns):
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        self._connection().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id)
+        )
+
+    def _changed(self):
+        self._wake.set()
+        if self.on_change is not None:
+            self.on_change()
+
+    def _record(self, row: sqlite3.Row, payload: bool = True) -> Dict[str, Any]:
+        priorities = {value: name for name, value in PRIORITIES.items()}
+        record = {
+            "job_id": row["id"],
+            "type": row["kind"],
+            "priority": priorities.get(row["priority"], str(row["priority"])),
+            "state": row["state"],
+            "done": row["done"],
+            "total": row["total"],
+            "preemptions": row["preemptions"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "error": row["error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+        }
+        if payload:
+            record["payload"] = json.loads(row["payload"])
+        return record
+
+    async def events(self, job_id: str, is_disconnected: Callable[[], Awaitable[bool]],
+                     interval: float = 0.5) -> AsyncIterator[str]:
+        """
+        Server-Sent Events for one job: its record whenever it changes,
+        until it finishes or the client disconnects.
+        """
+        last = None
+        while not await is_disconnected():
+            record = self.get(job_id)
+            if record is None:
+                yield f"event: error\ndata: {dumps({'error': 'Job not found'}).decode()}\n\n"
+                return
+            del record["payload"]
+            if record != last:
+                last = record
+                fields = {key: value for key, value in record.items() if value is not None}
+                yield f"event: job\ndata: {dumps(fields).decode()}\n\n"
+                if record["state"] in FINISHED:
+                    return
+            await asyncio.sleep(interval)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
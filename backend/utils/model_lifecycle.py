@@ -0,0 +1,173 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import datetime
+import os
+import threading
+import time
+from .model_router import ModelRouter
+from .generation import DEFAULT_NUM_CTX
+
+
+class ModelLifecycle:
+    """
+    Keeps the Ollama models loaded and reports their load state.
+
+    Models are preloaded at startup and every request carries a keep_alive
+    so Ollama holds them in memory. During active hours the keep-alive is
+    long (by default indefinitely); outside them Ollama is allowed to
+    unload idle models.
+    """
+    UNLOADED = "unloaded"
+    LOADING = "loading"
+    READY = "ready"
+    ERROR = "error"
+
+    def __init__(self, router: ModelRouter, models: Iterable[str],
+                 keep_alive: Optional[str] = None, idle_keep_alive: Optional[str] = None,
+                 active_hours: Optional[Tuple[int, int]] = None):
+        self.router = router
+        self.models = [model for model in models if model]
+        self.keep_alive = keep_alive or os.environ.get("OLLAMA_KEEP_ALIVE", "-1")
+        self.idle_keep_alive = idle_keep_alive or os.environ.get("OLLAMA_IDLE_KEEP_ALIVE", "5m")
+        if active_hours is None:
+            start, end = os.environ.get("VESWO_ACTIVE_HOURS", "7-23").split("-")
+            active_hours = (int(start), int(end))
+        self.active_hours = active_hours
+        self.state = self.UNLOADED
+        self.last_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.nodes: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def is_active_hours(self, now: Optional[datetime.datetime] = None) -> bool:
+        hour = (now or datetime.datetime.now()).hour
+        start, end = self.active_hours
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end  # Window spanning midnight
+
+    def keep_alive_value(self, now: Optional[datetime.datetime] = None):
+        """
+        keep_alive to send with requests: Ollama accepts durations such as
+        "30m" or a number of seconds, where -1 means forever.
+        """
+        value = self.keep_alive if self.is_active_hours(now) else self.idle_keep_alive
+        try:
+            return int(value)
+        except ValueError:
+            return value
+
+    @property
+    def ready(self) -> bool:
+        return self.state == self.READY
+
+    def preload(self) -> Dict[str, Any]:
+        """
+        Load every model on every node and pin it with the current keep-alive.
+
+        Returns:
+            The lifecycle status after loading
+        """
+        with self._lock:
+            self.state = self.LOADING
+            started = time.time()
+            errors = []
+            for backend in self.router.backends:
+                for model in self.models:
+                    try:
+                        # An empty prompt makes Ollama load the model without generating
+                        backend.http.post(
+                            backend.generate_url,
+                            json={
+                                "model": model,
+                                "prompt": "",
+                                "keep_alive": self.keep_alive_value(),
+                                # Load with the window requests use, or the first one reloads it
+                                "options": {"num_ctx": DEFAULT_NUM_CTX},
+                            },
+                            timeout=300
+                        ).raise_for_status()
+                    except Exception as e:
+                        errors.append(f"{model} on {backend.url}: {str(e)}")
+
+            loaded_anywhere = len(errors) < len(self.router.backends) * len(self.models)
+            if loaded_anywhere:
+                self.state = self.READY
+                self.load_seconds = time.time() - started
+                self.loaded_at = time.time()
+            else:
+                self.state = self.ERROR
+            self.last_error = "; ".join(errors) or None
+        self.refresh()
+        return self.status()
+
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Ask each node which models are resident (/api/ps) and update the state.
+        """
+        nodes = []
+        for backend in self.router.backends:
+            try:
+                response = backend.http.get(f"{backend.url}/api/ps", timeout=2)
+                response.raise_for_status()
+                running = {
+                    entry.get("name"): entry.get("expires_at")
+                    for entry in response.json().get("models", [])
+                }
+            except Exception as e:
+                nodes.append({"url": backend.url, "reachable": False, "error": str(e), "models": {}})
+                continue
+            nodes.append({
+                "url": backend.url,
+                "reachable": True,
+                "models": {model: self._find_loaded(model, running) for model in self.models}
+            })
+
+        with self._lock:
+            self.nodes = nodes
+            reachable = [node for node in nodes if node["reachable"]]
+            if self.state != self.LOADING and reachable and self.models:
+                resident = any(node["models"].get(self.models[0]) for node in reachable)
+                if resident:
+                    self.state = self.READY
+                elif self.state == self.READY:
+                    # Evicted by Ollama (e.g. outside active hours)
+                    self.state = self.UNLOADED
+        return self.status()
+
+    def _find_loaded(self, model: str, running: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Ollama reports "gemma:latest" for a model requested as "gemma"
+        for name, expires_at in running.items():
+            if name == model or (":" not in model and name.split(":")[0] == model):
+                return {"name": name, "expires_at": expires_at}
+        return None
+
+    def ensure_loaded(self):
+        """
+        Reload the models if they were evicted during active hours.
+        """
+        if self.is_active_hours() and self.state in (self.UNLOADED, self.ERROR):
+            self.preload()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "models": self.models,
+            "keep_alive": self.keep_alive_value(),
+            "active_hours": list(self.active_hours),
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+            "nodes": self.nodes,
+        }
+
+    def apply_status(self, status: Dict[str, Any]):
+        """
+        Adopt a status published by the leader worker.
+        """
+        with self._lock:
+            self.state = status["state"]
+            self.load_seconds = status.get("load_seconds")
+            self.loaded_at = status.get("loaded_at")
+            self.last_error = status.get("last_error")
+            self.nodes = status.get("nodes", [])
@@ -0,0 +1,387 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import requests
+from .sessions import estimate_tokens
+from .generation import CancelToken, GenerationCancelled, GenerationTimeout
+
+
+def normalize_backend_url(url: str) -> str:
+    """
+    Reduce an Ollama URL to its base, e.g. http://host:11434/api/generate
+    becomes http://host:11434.
+    """
+    url = url.strip().rstrip("/")
+    for suffix in ("/api/generate", "/api/chat", "/api"):
+        if url.endswith(suffix):
+            return url[:-len(suffix)]
+    return url
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+class OllamaError(Exception):
+    pass
+
+
+class OllamaBackend:
+    def __init__(self, url: str):
+        self.url = normalize_backend_url(url)
+        self.http = requests.Session()  # Keeps connections to the node alive
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    @property
+    def generate_url(self) -> str:
+        return f"{self.url}/api/generate"
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "latency": self.ewma_latency,
+            "healthy": self.is_available(time.time()),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class ModelRouter:
+    """
+    Spread generation requests over several Ollama nodes.
+
+    Nodes are picked by fewest outstanding requests or by latency-weighted
+    load, failing nodes are ejected for a cool-down period, and failed
+    requests are retried on another node. Short, simple prompts can be sent
+    to a smaller model.
+    """
+    STRATEGIES = ("least_outstanding", "latency")
+    COMPLEX_PROMPT = re.compile(
+        r'```|\b(explain|essay|prove|derive|why|compare|analy[sz]e|step[- ]by[- ]step|code)\b',
+        re.IGNORECASE
+    )
+
+    def __init__(self, backends: Iterable[str], model: str = "gemma",
+                 small_model: Optional[str] = None, strategy: str = "least_outstanding",
+                 max_retries: int = 2, eject_after: int = 3, eject_seconds: float = 30.0,
+                 cheap_prompt_tokens: int = 48, timeout: Optional[float] = None):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unsupported routing strategy: {strategy}")
+        self.backends = [OllamaBackend(url) for url in backends]
+        if not self.backends:
+            raise ValueError("At least one Ollama backend is required")
+        self.model = model
+        self.small_model = small_model
+        self.strategy = strategy
+        self.max_retries = max_retries
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.cheap_prompt_tokens = cheap_prompt_tokens
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+
+    @classmethod
+    def from_env(cls, default_url: str, model: str, **kwargs) -> "ModelRouter":
+        """
+        Build a router from OLLAMA_BACKENDS (comma separated URLs),
+        OLLAMA_SMALL_MODEL and OLLAMA_ROUTING, falling back to a single node.
+        """
+        urls = [url for url in os.environ.get("OLLAMA_BACKENDS", "").split(",") if url.strip()]
+        kwargs.setdefault("small_model", os.environ.get("OLLAMA_SMALL_MODEL") or None)
+        kwargs.setdefault("strategy", os.environ.get("OLLAMA_ROUTING", "least_outstanding"))
+        return cls(urls or [default_url], model=model, **kwargs)
+
+    def select_model(self, prompt: str) -> str:
+        """
+        Pick the small model for short, simple prompts when one is configured.
+        """
+        if (self.small_model and estimate_tokens(prompt) <= self.cheap_prompt_tokens
+                and not self.COMPLEX_PROMPT.search(prompt)):
+            return self.small_model
+        return self.model
+
+    def get_backend(self, url: str) -> Optional[OllamaBackend]:
+        url = normalize_backend_url(url)
+        for backend in self.backends:
+            if backend.url == url:
+                return backend
+        return None
+
+    def _pick(self, exclude: Tuple[OllamaBackend, ...] = (),
+              prefer: Optional[str] = None) -> OllamaBackend:
+        now = time.time()
+        candidates = [b for b in self.backends if b not in exclude]
+        if not candidates:
+            raise BackendUnavailable("No Ollama backends left to try")
+
+        available = [b for b in candidates if b.is_available(now)]
+        if not available:
+            # Everything is ejected: probe the node whose cool-down ends first
+            return min(candidates, key=lambda b: b.ejected_until)
+
+        if prefer:
+            preferred = self.get_backend(prefer)
+            if preferred in available and preferred.outstanding <= min(b.outstanding for b in available) + 1:
+                return preferred
+
+        # Rotate the starting point so ties are spread evenly
+        offset = next(self._round_robin) % len(available)
+        available = available[offset:] + available[:offset]
+        if self.strategy == "latency":
+            known = [b.ewma_latency for b in available if b.ewma_latency is not None]
+            default_latency = sum(known) / len(known) if known else 1.0
+            return min(available, key=lambda b: (b.outstanding + 1) * (b.ewma_latency or default_latency))
+        return min(available, key=lambda b: b.outstanding)
+
+    def _release(self, backend: OllamaBackend, elapsed: Optional[float] = None,
+                 failed: bool = False):
+        with self._lock:
+            backend.outstanding -= 1
+            if failed:
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= self.eject_after:
+                    backend.ejected_until = time.time() + self.eject_seconds
+            elif elapsed is not None:
+                backend.consecutive_failures = 0
+                backend.ejected_until = 0.0
+                if backend.ewma_latency is None:
+                    backend.ewma_latency = elapsed
+                else:
+                    backend.ewma_latency = 0.8 * backend.ewma_latency + 0.2 * elapsed
+
+    def eject(self, backend: OllamaBackend, seconds: Optional[float] = None):
+        with self._lock:
+            backend.ejected_until = time.time() + (self.eject_seconds if seconds is None else seconds)
+
+    def generate(self, build_payload: Callable[[OllamaBackend], Dict[str, Any]],
+                 prefer: Optional[str] = None, cancel: Optional[CancelToken] = None,
+                 on_token: Optional[Callable[[str], None]] = None) -> Tuple[Dict[str, Any], OllamaBackend]:
+        """
+        Run a /api/generate call on the best available node.
+
+        The request is always streamed from Ollama so that it can be cut off:
+        when `cancel` is cancelled or its deadline passes, the connection is
+        closed, which makes Ollama stop generating.
+
+        Args:
+            build_payload: Called with the chosen backend to build the request
+                payload, so callers can drop node-specific state such as a
+                KV context when a request lands on a different node
+            prefer: URL of the node to use when it is healthy and not overloaded
+            cancel: Optional cancellation token with deadline
+            on_token: Optional callback receiving each generated text chunk
+
+        Returns:
+            Tuple of (final Ollama response with the full text, backend that served it).
+            If the deadline passes mid-generation, the partial text is returned
+            with done_reason "deadline".
+
+        Raises:
+            GenerationCancelled: If the token was cancelled
+            GenerationTimeout: If the deadline passed before any output arrived
+            BackendUnavailable: If every node failed
+        """
+        tried: Tuple[OllamaBackend, ...] = ()
+        last_error: Optional[Exception] = None
+        for _ in range(self.max_retries + 1):
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+                if cancel.expired:
+                    raise GenerationTimeout(f"Deadline passed before generation started: {last_error}")
+            try:
+                with self._lock:
+                    backend = self._pick(tried, prefer)
+                    backend.outstanding += 1
+            except BackendUnavailable:
+                break
+            tried += (backend,)
+
+            started = time.time()
+            try:
+                payload = dict(build_payload(backend), stream=True)
+                response = backend.http.post(backend.generate_url, json=payload, stream=True,
+                                             timeout=(3.05, self._read_timeout(cancel)))
+                if response.status_code >= 500:
+                    # Unread streamed bodies keep their pooled connection until closed
+                    response.close()
+                    response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if self._deadline_hit(e, cancel):
+                    self._release(backend)
+                    raise GenerationTimeout("Deadline passed before the model started answering")
+                self._release(backend, failed=True)
+                last_error = e
+                continue
+            except Exception:
+                self._release(backend, failed=True)
+                raise
+
+            try:
+                if response.status_code >= 400:
+                    response.close()
+                    response.raise_for_status()
+                data = self._read_stream(response, cancel, on_token)
+            except (GenerationCancelled, requests.HTTPError):
+                # Cancellation and client errors say nothing about node health
+                self._release(backend)
+                raise
+            except Exception:
+                self._release(backend, failed=True)
+                raise
+            self._release(backend, elapsed=time.time() - started)
+            return data, backend
+
+        raise BackendUnavailable(f"All Ollama backends failed: {last_error}")
+
+    def embed(self, texts: List[str], model: str,
+              cancel: Optional[CancelToken] = None) -> List[List[float]]:
+        """
+        Embed texts with Ollama's /api/embed on the best available node,
+        retrying on another node when one fails.
+
+        Args:
+            texts: Texts to embed in one request
+            model: Embedding model name
+            cancel: Optional cancellation token
+
+        Returns:
+            One vector per text
+
+        Raises:
+            GenerationCancelled: If the token was cancelled
+            BackendUnavailable: If every node failed
+        """
+        tried: Tuple[OllamaBackend, ...] = ()
+        last_error: Optional[Exception] = None
+        for _ in range(self.max_retries + 1):
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            try:
+                with self._lock:
+                    backend = self._pick(tried)
+                    backend.outstanding += 1
+            except BackendUnavailable:
+                break
+            tried += (backend,)
+            try:
+                response = backend.http.post(f"{backend.url}/api/embed", json={"model": model, "input": texts},
+                                             timeout=(3.05, self._read_timeout(cancel)))
+                if response.status_code == 404 and "model" not in response.text:
+                    # Ollama before 0.3 only has the one-text-per-call endpoint
+                    vectors = [self._embed_one(backend, text, model, cancel) for text in texts]
+                    self._release(backend)
+                    return vectors
+                if response.status_code >= 500:
+                    response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if self._deadline_hit(e, cancel):
+                    self._release(backend)
+                    raise GenerationTimeout("Deadline passed before the embeddings were ready")
+                self._release(backend, failed=True)
+                last_error = e
+                continue
+            except Exception:
+                self._release(backend, failed=True)
+                raise
+            # Embedding latency says nothing about generation latency, so it is not recorded
+            self._release(backend)
+            data = response.json()
+            if "error" in data:
+                raise OllamaError(data["error"])
+            return data["embeddings"]
+
+        raise BackendUnavailable(f"All Ollama backends failed: {last_error}")
+
+    def _embed_one(self, backend: OllamaBackend, text: str, model: str,
+                   cancel: Optional[CancelToken]) -> List[float]:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        response = backend.http.post(f"{backend.url}/api/embeddings", json={"model": model, "prompt": text},
+                                     timeout=(3.05, self._read_timeout(cancel)))
+        data = response.json()
+        if "error" in data:
+            raise OllamaError(data["error"])
+        return data["embedding"]
+
+    @staticmethod
+    def _deadline_hit(error: Exception, cancel: Optional[CancelToken]) -> bool:
+        # The read timeout is capped at the request deadline, so a read timeout
+        # once the deadline has passed is the caller's budget, not a sick node
+        return isinstance(error, requests.ReadTimeout) and cancel is not None and cancel.expired
+
+    def _read_timeout(self, cancel: Optional[CancelToken]) -> Optional[float]:
+        remaining = cancel.remaining() if cancel is not None else None
+        if remaining is None:
+            return self.timeout
+        if self.timeout is None:
+            return max(remaining, 0.1)
+        return max(min(remaining, self.timeout), 0.1)
+
+    def _read_stream(self, response: requests.Response, cancel: Optional[CancelToken],
+                     on_token: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        parts: List[str] = []
+        final: Dict[str, Any] = {}
+        try:
+            for line in response.iter_lines():
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                    if cancel.expired:
+                        final = {"done": False, "done_reason": "deadline"}
+                        break
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise OllamaError(chunk["error"])
+                token = chunk.get("response", "")
+                if token:
+                    parts.append(token)
+                    if on_token is not None:
+                        on_token(token)
+                if chunk.get("done"):
+                    final = chunk
+                    break
+        except (requests.ConnectionError, requests.Timeout):
+            if cancel is None or not cancel.expired:
+                raise
+            final = {"done": False, "done_reason": "deadline"}
+        finally:
+            # Closing the connection makes Ollama abort a generation still running
+            response.close()
+        final = dict(final)
+        final["response"] = "".join(parts)
+        return final
+
+    def check_health(self, timeout: float = 2.0) -> List[Dict[str, Any]]:
+        """
+        Probe every node and eject the ones that do not answer.
+        """
+        for backend in self.backends:
+            try:
+                backend.http.get(f"{backend.url}/api/tags", timeout=timeout).raise_for_status()
+                with self._lock:
+                    backend.consecutive_failures = 0
+                    backend.ejected_until = 0.0
+            except Exception:
+                self.eject(backend)
+        return self.status()
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [backend.status() for backend in self.backends]
+
+    def outstanding(self) -> int:
+        """
+        Generations currently in flight across all nodes.
+        """
+        return sum(backend.outstanding for backend in self.backends)
@@ -0,0 +1,111 @@
+from typing import Callable, Dict, Optional, Union
+from collections import OrderedDict
+import hashlib
+import threading
+import numpy as np
+from .shared_store import SharedStore
+
+# Rough per-entry bookkeeping cost on top of the text itself
+ENTRY_OVERHEAD = 128
+
+
+class OCRCache:
+    """
+    Content-addressed cache of OCR results.
+
+    Entries are keyed by a BLAKE2b hash of the image content together with
+    the OCR language and tesseract config, so the same screenshot submitted
+    again is answered without running tesseract. Entries live in a
+    memory-bounded LRU and, optionally, in a persistent SharedStore that
+    survives restarts and is shared between worker processes. Screenshots
+    can hold private text, so persisted entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, store: Optional[SharedStore] = None,
+                 ttl: Optional[float] = 24 * 3600):
+        self.max_bytes = max_bytes
+        self.store = store
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(image: Union[bytes, memoryview, np.ndarray], ocr_config: Dict[str, str]) -> str:
+        """
+        Hash image content and OCR settings into a cache key.
+
+        Args:
+            image: Encoded image bytes or a decoded pixel array
+            ocr_config: The pytesseract lang/config settings
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        if isinstance(image, np.ndarray):
+            # Shape and dtype distinguish arrays with identical raw bytes
+            digest.update(f"{image.shape}{image.dtype}".encode())
+            digest.update(np.ascontiguousarray(image).data)
+        else:
+            digest.update(image)
+        digest.update(f"\0{ocr_config.get('lang', '')}\0{ocr_config.get('config', '')}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+
+        if self.store is not None:
+            text = self.store.get("ocr", key)
+            if text is not None:
+                self._remember(key, text)
+                with self._lock:
+                    self.hits += 1
+                return text
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, text: str):
+        self._remember(key, text)
+        if self.store is not None:
+            self.store.set("ocr", key, text, ttl=self.ttl)
+
+    def get_or_compute(self, image: Union[bytes, memoryview, np.ndarray],
+                       ocr_config: Dict[str, str], compute: Callable[[], str]) -> str:
+        """
+        Return the cached text for an image or run `compute` and cache it.
+        """
+        key = self.make_key(image, ocr_config)
+        text = self.get(key)
+        if text is None:
+            text = compute()
+            self.put(key, text)
+        return text
+
+    def _remember(self, key: str, text: str):
+        cost = len(text.encode()) + ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.encode()) + ENTRY_OVERHEAD
+            self._entries[key] = text
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.encode()) + ENTRY_OVERHEAD
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,217 @@
+from typing import Dict, Optional, Tuple
+import os
+import queue
+import shlex
+import threading
+from PIL import Image
+
+
+def parse_tesseract_config(config: str) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+    """
+    Split a tesseract command-line config string into its parts.
+
+    Args:
+        config: e.g. "--psm 6 --oem 1 -c tessedit_char_whitelist=0123456789"
+
+    Returns:
+        Tuple of (psm, oem, variables)
+    """
+    psm = oem = None
+    variables = {}
+    args = shlex.split(config or "")
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("--psm", "--oem") and i + 1 < len(args):
+            if arg == "--psm":
+                psm = int(args[i + 1])
+            else:
+                oem = int(args[i + 1])
+            i += 2
+        elif arg == "-c" and i + 1 < len(args) and "=" in args[i + 1]:
+            name, value = args[i + 1].split("=", 1)
+            variables[name] = value
+            i += 2
+        else:
+            i += 1
+    return psm, oem, variables
+
+
+# Put on a pool by close() to wake threads waiting on it
+_CLOSED = object()
+
+
+class OCREngine:
+    """
+    Base class for OCR engines: turn a PIL image into text.
+    """
+    name = "base"
+
+    def image_to_string(self, image: Image.Image, lang: str = "eng", config: str = "") -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractEngine(OCREngine):
+    """
+    Runs the tesseract binary through pytesseract, one process per image.
+    """
+    name = "pytesseract"
+
+    def __init__(self):
+        import pytesseract
+        self._pytesseract = pytesseract
+
+    def image_to_string(self, image: Image.Image, lang: str = "eng", config: str = "") -> str:
+        return self._pytesseract.image_to_string(image, lang=lang, config=config)
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Keeps libtesseract handles (through tesserocr) warm and reuses them.
+
+    Creating a handle loads the language model, which is what dominates a
+    pytesseract call on small images. Handles are pooled per configuration
+    (lang, psm, oem and -c variables); recognition releases the GIL, so
+    threads using different handles run in parallel.
+    """
+    name = "tesserocr"
+
+    def __init__(self, pool_size: Optional[int] = None):
+        import tesserocr  # Optional dependency, needs libtesseract
+        self._tesserocr = tesserocr
+        self.pool_size = pool_size or int(os.environ.get("VESWO_OCR_WORKERS", str(os.cpu_count() or 2)))
+        self._pools: Dict[tuple, queue.LifoQueue] = {}
+        self._created: Dict[tuple, int] = {}
+        self._all = []
+        # ids of handles that were busy during close(); ended when returned
+        self._retired = set()
+        self._lock = threading.Lock()
+
+    def _key(self, lang: str, config: str) -> tuple:
+        psm, oem, variables = parse_tesseract_config(config)
+        return lang, psm, oem, tuple(sorted(variables.items()))
+
+    def _acquire(self, key: tuple):
+        with self._lock:
+            pool = self._pools.setdefault(key, queue.LifoQueue())
+            try:
+                return pool.get_nowait()
+            except queue.Empty:
+                pass
+            create = self._created.get(key, 0) < self.pool_size
+            if create:
+                self._created[key] = self._created.get(key, 0) + 1
+
+        if not create:
+            # All handles for this configuration are busy; wait for one
+            api = pool.get()
+            if api is _CLOSED:
+                # The engine was closed meanwhile: pass the wake-up on and use the new pool
+                pool.put(_CLOSED)
+                return self._acquire(key)
+            return api
+
+        lang, psm, oem, variables = key
+        kwargs = {"lang": lang, "variables": dict(variables)}
+        if psm is not None:
+            kwargs["psm"] = psm
+        if oem is not None:
+            kwargs["oem"] = oem
+        try:
+            api = self._tesserocr.PyTessBaseAPI(**kwargs)
+        except Exception:
+            with self._lock:
+                self._created[key] -= 1
+            raise
+        with self._lock:
+            self._all.append(api)
+        return api
+
+    def _release(self, key: tuple, api):
+        with self._lock:
+            # Handles out during close() have no pool to go back to
+            pool = None if id(api) in self._retired else self._pools.get(key)
+            self._retired.discard(id(api))
+            if pool is None and api in self._all:
+                self._all.remove(api)
+        if pool is None:
+            api.End()
+        else:
+            pool.put(api)
+
+    def warm_up(self, lang: str = "eng", config: str = ""):
+        """
+        Create one handle ahead of the first request.
+        """
+        key = self._key(lang, config)
+        self._release(key, self._acquire(key))
+
+    def image_to_string(self, image: Image.Image, lang: str = "eng", config: str = "") -> str:
+        key = self._key(lang, config)
+        api = self._acquire(key)
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            self._release(key, api)
+
+    def close(self):
+        """
+        End every idle handle. Handles still in use are ended when they are
+        released; later calls, and threads that were waiting for a handle,
+        create new ones.
+        """
+        with self._lock:
+            idle = set()
+            for pool in self._pools.values():
+                while True:
+                    try:
+                        idle.add(id(pool.get_nowait()))
+                    except queue.Empty:
+                        break
+                pool.put(_CLOSED)
+            for api in self._all:
+                if id(api) in idle:
+                    api.End()
+                else:
+                    self._retired.add(id(api))
+            self._all = []
+            self._pools = {}
+            self._created = {}
+
+
+OCR_ENGINES = {
+    TesserocrEngine.name: TesserocrEngine,
+    PytesseractEngine.name: PytesseractEngine,
+}
+
+
+def get_ocr_engine(name: Optional[str] = None) -> OCREngine:
+    """
+    Create an OCR engine by name.
+
+    The name defaults to the VESWO_OCR_ENGINE environment variable. With no
+    explicit choice the persistent tesserocr engine is used when it can
+    load, and pytesseract otherwise.
+
+    Args:
+        name: "tesserocr", "pytesseract" or None for auto
+
+    Returns:
+        A ready-to-use OCREngine
+    """
+    name = name or os.environ.get("VESWO_OCR_ENGINE")
+    if name:
+        if name not in OCR_ENGINES:
+            raise ValueError(f"Unsupported OCR engine: {name}")
+        return OCR_ENGINES[name]()
+
+    try:
+        engine = TesserocrEngine()
+        engine.warm_up()
+        return engine
+    except Exception:
+        return PytesseractEngine()
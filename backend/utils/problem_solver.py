@@ -1,11 +1,32 @@
 from typing import Dict, Any, Optional, List, Union
 import re
 import sympy
-from sympy import symbols, solve, Eq, Symbol
+from sympy import solve, Eq, Symbol
+from sympy.parsing.sympy_parser import (
+    parse_expr,
+    standard_transformations,
+    implicit_multiplication_application,
+    convert_xor,
+)
 import numpy as np
 from dataclasses import dataclass
 from enum import Enum
 
+TRANSFORMATIONS = standard_transformations + (implicit_multiplication_application, convert_xor)
+IDENTIFIER = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
+# Words that are never the variable a problem asks for
+STOP_WORDS = frozenset("""
+    a about all an and answer are as at be by calculate compute determine does each equals
+    evaluate find for from given how if in into is it its let number of on or result show
+    solve than that the then there these this to value was what when where which will with
+""".split())
+# "Solve for x", "find the value of y", "what is v"
+TARGET = re.compile(
+    r'\b(?:solve\s+for|find|calculate|compute|determine|what\s+is)\s+(?:the\s+value\s+of\s+)?'
+    r'([a-zA-Z][a-zA-Z0-9_]*)\b',
+    re.IGNORECASE
+)
+
 class ProblemType(Enum):
     MATH = "math"
     PHYSICS = "physics"
@@ -47,17 +68,19 @@ class ProblemSolver:
         # Determine problem type
         problem_type = self._determine_problem_type(problem_text)
         
-        # Extract variables
-        variables = self._extract_variables(problem_text)
-        
         # Extract equations
         equations = self._extract_equations(problem_text)
         
+        # Extract variables (only symbols that occur in the equations)
+        variables = self._extract_variables(problem_text, equations)
+        
         # Extract known values
-        known_values = self._extract_known_values(problem_text)
+        known_values = self._extract_known_values(problem_text, equations)
         
         # Determine unknown variables
-        unknown_variables = self._determine_unknowns(variables, known_values)
+        unknown_variables = self._determine_unknowns(
+            variables, known_values, self._extract_targets(problem_text, variables), len(equations)
+        )
         
         return Problem(
             text=problem_text,
@@ -101,22 +124,35 @@ class ProblemSolver:
         
         return ProblemType.MATH
     
-    def _extract_variables(self, text: str) -> Dict[str, Symbol]:
+    def _extract_variables(self, text: str, equations: List[Eq]) -> Dict[str, Symbol]:
         """
         Extract variables from problem text.
+        
+        Only the free symbols of the parsed equations are variables; the
+        words around them ("Solve", "car", "travels") never are.
         """
         variables = {}
-        
-        # Find all potential variables (words that could be variables)
-        potential_vars = re.findall(r'\b[a-zA-Z][a-zA-Z0-9]*\b', text)
-        
-        # Filter out common words and create symbols
-        for var in potential_vars:
-            if var.lower() not in ['the', 'and', 'or', 'in', 'on', 'at', 'to', 'for']:
-                variables[var] = symbols(var)
-        
+        for equation in equations:
+            for symbol in sorted(equation.free_symbols, key=lambda symbol: symbol.name):
+                variables[symbol.name] = symbol
         return variables
     
+    def _extract_targets(self, text: str, variables: Dict[str, Symbol]) -> List[str]:
+        """
+        Find the variables the text asks for, e.g. x in "Solve for x".
+        """
+        targets = []
+        for match in TARGET.finditer(text):
+            name = match.group(1)
+            if name.lower() not in STOP_WORDS and name in variables and name not in targets:
+                targets.append(name)
+        return targets
+    
+    def _parse_side(self, expression: str):
+        # Map every name to a Symbol so names like E, I or S are not sympy constants
+        names = {name: Symbol(name) for name in IDENTIFIER.findall(expression)}
+        return parse_expr(expression, local_dict=names, transformations=TRANSFORMATIONS)
+    
     def _extract_equations(self, text: str) -> List[Eq]:
         """
         Extract equations from problem text.
@@ -125,15 +161,24 @@ class ProblemSolver:
         
         # Look for patterns like "2x + 5 = 13" or "Solve for x: 2x + 5 = 13"
         equation_patterns = [
+            # A whole line of single-letter algebra, after an optional "...:" lead-in,
+            # which also catches givens such as "y = 4" on their own line
+            r'(?m)^(?:[^:=\n]*:)?[ \t]*(?![^\n]*[a-zA-Z]{2})([\w \t+\-*/().^]+=[\w \t+\-*/().^]+?)[ \t.]*$',
             r'(\d*[a-zA-Z]\s*[+\-*/]\s*\d+\s*=\s*\d+)',  # 2x + 5 = 13
             r'(\d+\s*[+\-*/]\s*\d*[a-zA-Z]\s*=\s*\d+)',  # 5 + 2x = 13
             r'([a-zA-Z]\s*[+\-*/]\s*\d+\s*=\s*\d+)',     # x + 5 = 13
             r'(\d+\s*[+\-*/]\s*[a-zA-Z]\s*=\s*\d+)',     # 5 + x = 13
         ]
         
+        # The patterns overlap ("x + 5 = 13" is inside "2x + 5 = 13"), so each
+        # stretch of text yields at most one equation, from the first pattern
+        used_spans = []
         for pattern in equation_patterns:
             matches = re.finditer(pattern, text)
             for match in matches:
+                start, end = match.span(1)
+                if any(start < used_end and used_start < end for used_start, used_end in used_spans):
+                    continue
                 try:
                     equation_str = match.group(1).strip()
                     if '=' in equation_str:
@@ -141,7 +186,8 @@ class ProblemSolver:
                         # Clean up the expressions
                         left = left.strip().replace(' ', '')
                         right = right.strip().replace(' ', '')
-                        equations.append(Eq(sympy.sympify(left), sympy.sympify(right)))
+                        equations.append(Eq(self._parse_side(left), self._parse_side(right)))
+                        used_spans.append((start, end))
                 except Exception as e:
                     continue
         
@@ -157,32 +203,52 @@ class ProblemSolver:
                             left, right = equation_part.split('=')
                             left = left.strip().replace(' ', '')
                             right = right.strip().replace(' ', '')
-                            equations.append(Eq(sympy.sympify(left), sympy.sympify(right)))
+                            equations.append(Eq(self._parse_side(left), self._parse_side(right)))
                         except:
                             pass
         
         return equations
     
-    def _extract_known_values(self, text: str) -> Dict[str, float]:
+    def _extract_known_values(self, text: str, equations: Optional[List[Eq]] = None) -> Dict[str, float]:
         """
         Extract known values from problem text.
         """
         known_values = {}
+        equations = equations or []
+        equation_symbols = {symbol.name for equation in equations for symbol in equation.free_symbols}
         
-        # Find number-variable pairs
+        # Find number-quantity pairs such as "100 meters"; the 2 in "2x" is
+        # a coefficient, not the value of x
         pairs = re.finditer(r'(\d+(?:\.\d+)?)\s*([a-zA-Z][a-zA-Z0-9]*)', text)
         for pair in pairs:
             value, var = pair.groups()
-            known_values[var] = float(value)
+            if var not in equation_symbols:
+                known_values[var] = float(value)
+        
+        # Givens like "a = 3" stated next to the equation being solved
+        if len(equations) > 1:
+            for equation in equations:
+                if isinstance(equation.lhs, Symbol) and equation.rhs.is_number:
+                    known_values[equation.lhs.name] = float(equation.rhs)
         
         return known_values
     
     def _determine_unknowns(self, variables: Dict[str, Symbol], 
-                          known_values: Dict[str, float]) -> List[str]:
+                          known_values: Dict[str, float],
+                          targets: Optional[List[str]] = None,
+                          equation_count: int = 0) -> List[str]:
         """
         Determine which variables are unknown.
+        
+        When the text names what to solve for and there are no more
+        equations than targets, the other symbols are parameters that stay
+        symbolic (e.g. "Solve for x: a*x + b = c").
         """
-        return [var for var in variables.keys() if var not in known_values]
+        unknowns = [var for var in variables.keys() if var not in known_values]
+        wanted = [var for var in (targets or []) if var in unknowns]
+        if wanted and equation_count <= len(wanted):
+            return wanted
+        return unknowns
     
     def _solve_math_problem(self, problem: Problem) -> Dict[str, Any]:
         """
@@ -220,12 +286,13 @@ class ProblemSolver:
             if isinstance(solutions, list) and len(solutions) == len(problem.unknown_variables):
                 for i, var in enumerate(problem.unknown_variables):
                     if i < len(solutions):  # Add bounds checking
-                        result['solution'][var] = float(solutions[i])
+                        result['solution'][var] = self._solution_value(solutions[i])
                         result['steps'].append(f"{var} = {solutions[i]}")
             elif isinstance(solutions, dict):
                 # Handle case where solve returns a dictionary
                 for var, value in solutions.items():
-                    result['solution'][var] = float(value)
+                    # solve() keys the dict by Symbol; use names so results stay JSON-safe
+                    result['solution'][str(var)] = self._solution_value(value)
                     result['steps'].append(f"{var} = {value}")
             else:
                 result['steps'].append("Could not find a unique solution")
@@ -235,6 +302,13 @@ class ProblemSolver:
         
         return result
     
+    def _solution_value(self, value) -> Union[float, str]:
+        # Solutions in terms of other symbols (parameters) are kept as text
+        try:
+            return float(value)
+        except TypeError:
+            return str(value)
+    
     def _solve_physics_problem(self, problem: Problem) -> Dict[str, Any]:
         """
         Solve a physics problem.
@@ -0,0 +1,226 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+PROFILING_ENABLED = os.environ.get("VESWO_PROFILING", "0") == "1"
+PROFILE_INTERVAL = float(os.environ.get("VESWO_PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.environ.get(
+    "VESWO_PROFILE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "veswo", "profiles")
+)
+
+# Profiler of the request being handled, if it asked to be profiled
+_current: ContextVar[Optional["SamplingProfiler"]] = ContextVar("veswo_profiler", default=None)
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for the threads doing one request's work.
+
+    A background thread snapshots the stacks of the tracked threads every
+    `interval` seconds via sys._current_frames(), so the profiled code runs
+    unmodified. Threads are tracked while they run work wrapped by
+    profiled().
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.frames: List[Tuple[str, str, int]] = []  # (function, file, line)
+        self.samples: Dict[int, List[Tuple[List[int], float]]] = {}  # thread -> (stack, seconds)
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @contextmanager
+    def track(self):
+        """
+        Sample the current thread while inside this block.
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[ident] -= 1
+                if not self._threads[ident]:
+                    del self._threads[ident]
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def _sample(self, weight: float):
+        with self._lock:
+            idents = list(self._threads)
+        if not idents:
+            return
+        frames = sys._current_frames()
+        for ident in idents:
+            frame = frames.get(ident)
+            if frame is not None:
+                self.samples.setdefault(ident, []).append((self._stack(frame), weight))
+
+    def _stack(self, frame) -> List[int]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self.frames)
+                self.frames.append(key)
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()  # Root first
+        return stack
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """
+        Export as a speedscope file (https://www.speedscope.app), one
+        sampled profile per thread.
+        """
+        profiles = []
+        for ident, samples in self.samples.items():
+            profiles.append({
+                "type": "sampled",
+                "name": f"{name} (thread {ident})",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weight for _, weight in samples),
+                "samples": [stack for stack, _ in samples],
+                "weights": [weight for _, weight in samples],
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "veswo-bot",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [{"name": func, "file": file, "line": line} for func, file, line in self.frames]
+            },
+            "profiles": profiles,
+        }
+
+    def to_collapsed(self) -> str:
+        """
+        Export as collapsed stacks ("a;b;c <microseconds>" per line) for
+        flamegraph.pl and similar tools.
+        """
+        totals: Dict[str, float] = {}
+        for samples in self.samples.values():
+            for stack, weight in samples:
+                key = ";".join(self.frames[index][0] for index in stack)
+                totals[key] = totals.get(key, 0.0) + weight
+        return "\n".join(f"{stack} {int(seconds * 1e6)}" for stack, seconds in totals.items())
+
+
+def current_profiler() -> Optional[SamplingProfiler]:
+    return _current.get()
+
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap work about to be handed to another thread so that thread is
+    sampled if the current request is being profiled. Returns func itself
+    otherwise, so unprofiled requests pay for one context variable lookup.
+    """
+    profiler = _current.get()
+    if profiler is None:
+        return func
+
+    def run(*args, **kwargs):
+        with profiler.track():
+            return func(*args, **kwargs)
+    return run
+
+
+def save_profile(profiler: SamplingProfiler, profile_id: str, name: str) -> str:
+    """
+    Write a profile to PROFILE_DIR as <id>.speedscope.json.
+
+    Returns:
+        Path of the written file
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = profile_path(profile_id)
+    with open(path, "w") as f:
+        json.dump(profiler.to_speedscope(name), f)
+    return path
+
+
+def profile_path(profile_id: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.speedscope.json")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests sent with an `X-Profile: 1` header
+    or `?profile=1`. The response carries an X-Profile-Id header naming
+    the speedscope file written once the request finishes.
+
+    Only installed when VESWO_PROFILING=1, so it costs nothing otherwise.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def requested(scope) -> bool:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile" and value not in (b"", b"0"):
+                return True
+        query = scope.get("query_string", b"")
+        return b"profile=1" in query.split(b"&")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:16]
+        profiler = SamplingProfiler()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        token = _current.set(profiler)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            _current.reset(token)
+            try:
+                path = save_profile(profiler, profile_id, f"{scope['method']} {scope['path']}")
+                print(f"Profile for {scope['method']} {scope['path']} written to {path}")
+            except OSError as e:
+                print(f"Saving profile failed: {str(e)}")
@@ -0,0 +1,181 @@
+from typing import Dict, Optional, Tuple
+import hashlib
+import math
+import os
+import time
+from .responses import dumps
+
+# Token cost per "METHOD path"; chat and OCR keep Ollama or the CPU busy for
+# seconds, while reads such as status checks or job polling are nearly free
+ENDPOINT_COSTS = {
+    "GET /api/status": 1,
+    "POST /api/warm": 10,
+    "POST /api/chat": 10,
+    "POST /api/code": 10,
+    "POST /api/essay": 30,
+    "POST /api/ocr": 5,
+    "POST /api/ocr/batch": 25,
+    "POST /api/solve": 2,
+    "POST /api/solve-screen": 8,
+    "POST /api/jobs": 25,
+    "POST /api/notes": 10,
+    "POST /api/notes/search": 2,
+}
+DEFAULT_COST = 1
+
+
+def parse_quotas(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse per-API-key quotas of the form "key=rate/burst,other=rate/burst".
+    """
+    quotas = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        key, limits = item.strip().split("=", 1)
+        rate, _, burst = limits.partition("/")
+        quotas[key] = (float(rate), float(burst or rate))
+    return quotas
+
+
+class RateLimiter:
+    """
+    Token buckets per client: each holds up to `burst` tokens and refills
+    at `rate` tokens per second, and a request spends its endpoint's cost.
+
+    State is a plain dict updated only from the event loop thread, so
+    there is no lock to contend on. Each worker process keeps its own
+    buckets.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: float = 100.0,
+                 costs: Optional[Dict[str, int]] = None,
+                 quotas: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.costs = costs if costs is not None else ENDPOINT_COSTS
+        # Hashed API key -> (rate, burst) overriding the defaults
+        self.quotas = {self.key_for_api_key(key): limits for key, limits in (quotas or {}).items()}
+        self.max_clients = max_clients
+        self._buckets: Dict[str, list] = {}  # client -> [tokens, updated_at]
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        """
+        Build a limiter from VESWO_RATE_LIMIT (tokens/second, 0 disables),
+        VESWO_RATE_BURST and VESWO_API_KEY_QUOTAS.
+        """
+        rate = float(os.environ.get("VESWO_RATE_LIMIT", "5"))
+        if rate <= 0:
+            return None
+        return cls(
+            rate=rate,
+            burst=float(os.environ.get("VESWO_RATE_BURST", "100")),
+            quotas=parse_quotas(os.environ.get("VESWO_API_KEY_QUOTAS", ""))
+        )
+
+    @staticmethod
+    def key_for_api_key(api_key: str) -> str:
+        # Keys are never kept in memory in the clear
+        return "key:" + hashlib.blake2b(api_key.encode(), digest_size=12).hexdigest()
+
+    def client_key(self, scope) -> str:
+        """
+        Identify the client of an ASGI request by X-API-Key, else by address.
+
+        Only keys listed in the quotas count; any other key would let a
+        client start a fresh, full bucket just by sending a new value.
+        """
+        for name, value in scope.get("headers", ()):
+            if name == b"x-api-key" and value:
+                key = self.key_for_api_key(value.decode("latin-1"))
+                if key in self.quotas:
+                    return key
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    def _limits(self, client: str) -> Tuple[float, float]:
+        return self.quotas.get(client, (self.rate, self.burst))
+
+    def cost(self, method: str, path: str) -> int:
+        return self.costs.get(f"{method.upper()} {path.rstrip('/') or '/'}", DEFAULT_COST)
+
+    def acquire(self, client: str, cost: float, now: Optional[float] = None) -> float:
+        """
+        Spend `cost` tokens from a client's bucket.
+
+        Returns:
+            0 if the request may proceed, else seconds until it would be allowed
+        """
+        now = time.monotonic() if now is None else now
+        rate, burst = self._limits(client)
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._prune(now)
+            bucket = self._buckets[client] = [burst, now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if cost > burst:
+            # Could never succeed; wait for a full bucket and then let it through
+            cost = burst
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / rate
+
+    def _prune(self, now: float):
+        """
+        Forget clients whose buckets have refilled; a new bucket starts full,
+        so dropping them changes nothing.
+        """
+        full = []
+        for client, (tokens, updated) in self._buckets.items():
+            rate, burst = self._limits(client)
+            if tokens + (now - updated) * rate >= burst:
+                full.append(client)
+        for client in full:
+            del self._buckets[client]
+        if len(self._buckets) >= self.max_clients:
+            # Still full of active clients; drop the oldest half
+            for client in list(self._buckets)[:self.max_clients // 2]:
+                del self._buckets[client]
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware answering 429 with Retry-After once a client's bucket
+    is empty. Clients are identified by a known X-API-Key header, or else by
+    address.
+    """
+
+    def __init__(self, app, limiter: Optional[RateLimiter]):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        # CORS preflights are free; they never reach an endpoint
+        if self.limiter is None or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        cost = self.limiter.cost(scope["method"], scope["path"])
+        retry_after = self.limiter.acquire(self.limiter.client_key(scope), cost)
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+
+        body = dumps({"error": "Rate limit exceeded", "retry_after": round(retry_after, 2)})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,236 @@
+from typing import Iterable, List, Optional, Tuple
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+from .capture_backends import Region
+
+# Width the pre-scan downsamples captures to; text lines survive, cost stays flat
+PRESCAN_WIDTH = 960
+# Edge strength that counts as text; UI text is high contrast against its background
+EDGE_THRESHOLD = 40
+# Windows never worth reading, e.g. the assistant's own window (comma separated)
+IGNORED_WINDOWS = [
+    name.strip().lower()
+    for name in os.environ.get("VESWO_IGNORE_WINDOWS", "veswo").split(",") if name.strip()
+]
+MIN_WINDOW_SIZE = 120
+# Seconds an X11 window lookup is reused; each one runs several xdotool calls
+X11_LOOKUP_TTL = 0.25
+
+
+def find_text_regions(image: np.ndarray, max_regions: int = 8, padding: int = 8) -> List[Region]:
+    """
+    Quickly find the blocks of an image that look like text.
+
+    Works on a downsampled grayscale copy: a morphological gradient marks
+    character edges, which are then smeared horizontally into lines and
+    lines into blocks. This costs a few milliseconds, far less than
+    running tesseract over empty desktop or images.
+
+    Args:
+        image: RGB capture
+        max_regions: Largest number of blocks to return; beyond it a single
+            region covering every block is returned, so no text is dropped
+        padding: Pixels added around each block
+
+    Returns:
+        (left, top, width, height) blocks in image coordinates, in reading order
+    """
+    height, width = image.shape[:2]
+    if not height or not width:
+        return []
+    gray = cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2GRAY)
+    factor = min(1.0, PRESCAN_WIDTH / width)
+    if factor < 1.0:
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+    edges = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, mask = cv2.threshold(edges, EDGE_THRESHOLD, 255, cv2.THRESH_BINARY)
+    # Characters into lines, then neighbouring lines into blocks
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 11)))
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    blocks = []
+    for left, top, block_width, block_height, area in stats[1:]:
+        # Specks and thin rules are not text
+        if block_height < 8 or block_width < 12:
+            continue
+        blocks.append((int(area), int(left), int(top), int(block_width), int(block_height)))
+    blocks.sort(reverse=True)
+    if len(blocks) > max_regions:
+        # Too many blocks to OCR one by one; read the area spanning all of them
+        left = min(block[1] for block in blocks)
+        top = min(block[2] for block in blocks)
+        right = max(block[1] + block[3] for block in blocks)
+        bottom = max(block[2] + block[4] for block in blocks)
+        blocks = [(0, left, top, right - left, bottom - top)]
+
+    regions = []
+    for _, left, top, block_width, block_height in blocks:
+        right = min(width, int((left + block_width) / factor) + padding)
+        bottom = min(height, int((top + block_height) / factor) + padding)
+        left = max(0, int(left / factor) - padding)
+        top = max(0, int(top / factor) - padding)
+        regions.append((left, top, right - left, bottom - top))
+    return sorted(regions, key=lambda region: (region[1], region[0]))
+
+
+def coverage(regions: Iterable[Region], size: Tuple[int, int]) -> float:
+    """
+    Fraction of an image of (width, height) covered by the regions.
+    """
+    width, height = size
+    mask = np.zeros((height, width), dtype=bool)
+    for left, top, region_width, region_height in regions:
+        mask[top:top + region_height, left:left + region_width] = True
+    return float(mask.mean()) if mask.size else 0.0
+
+
+def _ignored(*names: Optional[str]) -> bool:
+    text = " ".join(name for name in names if name).lower()
+    return any(ignored in text for ignored in IGNORED_WINDOWS)
+
+
+def _usable(region: Region) -> bool:
+    return region[2] >= MIN_WINDOW_SIZE and region[3] >= MIN_WINDOW_SIZE
+
+
+def _windows_front_window() -> Optional[Region]:
+    import ctypes
+    from ctypes import wintypes
+    user32 = ctypes.windll.user32
+    found: List[Region] = []
+
+    @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    def visit(hwnd, _):
+        # EnumWindows walks the windows front to back
+        if not user32.IsWindowVisible(hwnd) or user32.IsIconic(hwnd):
+            return True
+        length = user32.GetWindowTextLengthW(hwnd)
+        if not length:
+            return True
+        title = ctypes.create_unicode_buffer(length + 1)
+        user32.GetWindowTextW(hwnd, title, length + 1)
+        rect = wintypes.RECT()
+        user32.GetWindowRect(hwnd, ctypes.byref(rect))
+        region = (rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top)
+        if _ignored(title.value) or not _usable(region):
+            return True
+        found.append(region)
+        return False
+
+    user32.EnumWindows(visit, 0)
+    return found[0] if found else None
+
+
+def _macos_front_window() -> Optional[Region]:
+    import Quartz  # Optional dependency (pyobjc-framework-Quartz)
+    windows = Quartz.CGWindowListCopyWindowInfo(
+        Quartz.kCGWindowListOptionOnScreenOnly | Quartz.kCGWindowListExcludeDesktopElements,
+        Quartz.kCGNullWindowID
+    )
+    # Listed front to back; layer 0 holds normal application windows
+    for window in windows:
+        if window.get("kCGWindowLayer") != 0:
+            continue
+        if _ignored(window.get("kCGWindowOwnerName"), window.get("kCGWindowName")):
+            continue
+        bounds = window.get("kCGWindowBounds", {})
+        region = (int(bounds.get("X", 0)), int(bounds.get("Y", 0)),
+                  int(bounds.get("Width", 0)), int(bounds.get("Height", 0)))
+        if _usable(region):
+            return region
+    return None
+
+
+def _x11(*args: str) -> str:
+    return subprocess.run(list(args), capture_output=True, text=True, timeout=1).stdout.strip()
+
+
+def _x11_stacking() -> List[str]:
+    # _NET_CLIENT_LIST_STACKING lists client windows bottom to top, in hex
+    if shutil.which("xprop"):
+        stacking = _x11("xprop", "-root", "_NET_CLIENT_LIST_STACKING").partition("#")[2]
+        windows = [str(int(window, 16)) for window in re.findall(r"0x[0-9a-fA-F]+", stacking)]
+        if windows:
+            visible = set(_x11("xdotool", "search", "--onlyvisible", "--name", "").split())
+            return [window for window in reversed(windows) if window in visible]
+    # Without the EWMH list only the active window is known
+    active = _x11("xdotool", "getactivewindow")
+    return [active] if active else []
+
+
+_x11_lookup: Tuple[float, Optional[Region]] = (float("-inf"), None)
+_x11_lock = threading.Lock()
+
+
+def _x11_front_window() -> Optional[Region]:
+    global _x11_lookup
+    # Captures arrive in bursts; the lock also keeps concurrent ones to one lookup
+    with _x11_lock:
+        looked_up_at, region = _x11_lookup
+        if time.monotonic() - looked_up_at < X11_LOOKUP_TTL:
+            return region
+        region = _x11_lookup_front_window()
+        _x11_lookup = (time.monotonic(), region)
+        return region
+
+
+def _x11_lookup_front_window() -> Optional[Region]:
+    if not shutil.which("xdotool"):
+        return None
+    for window in _x11_stacking():
+        if _ignored(_x11("xdotool", "getwindowname", window)):
+            continue
+        geometry = dict(
+            line.split("=", 1) for line in _x11("xdotool", "getwindowgeometry", "--shell", window).split()
+            if "=" in line
+        )
+        if not {"X", "Y", "WIDTH", "HEIGHT"} <= geometry.keys():
+            continue
+        region = (int(geometry["X"]), int(geometry["Y"]), int(geometry["WIDTH"]), int(geometry["HEIGHT"]))
+        if _usable(region):
+            return region
+    return None
+
+
+def active_window_region() -> Optional[Region]:
+    """
+    Bounds of the frontmost application window, skipping the assistant's
+    own window (VESWO_IGNORE_WINDOWS).
+
+    Uses the Win32 API on Windows, Quartz on macOS and xdotool on X11.
+
+    Returns:
+        (left, top, width, height), or None when it cannot be determined
+    """
+    try:
+        if sys.platform == "win32":
+            return _windows_front_window()
+        if sys.platform == "darwin":
+            return _macos_front_window()
+        if os.environ.get("DISPLAY"):
+            return _x11_front_window()
+    except Exception as e:
+        print(f"Active window lookup failed: {str(e)}")
+    return None
+
+
+def clip_region(region: Region, size: Tuple[int, int]) -> Optional[Region]:
+    """
+    Clip a region to a screen of (width, height); None if nothing is left.
+    """
+    width, height = size
+    left, top = max(0, region[0]), max(0, region[1])
+    right = min(width, region[0] + region[2])
+    bottom = min(height, region[1] + region[3])
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right - left, bottom - top
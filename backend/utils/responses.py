@@ -0,0 +1,88 @@
+from typing import Any, Dict, Optional, Set
+import json
+import numpy as np
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+from .schemas import APIResponse
+
+try:
+    import orjson  # Optional dependency, much faster than json
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """
+    Convert values the JSON encoders do not know, such as sympy numbers and
+    symbols from the problem solver or numpy scalars.
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, np.generic):
+        return value.item()
+    if getattr(value, "is_Integer", False):
+        return int(value)
+    if getattr(value, "is_Number", False) and getattr(value, "is_real", False):
+        return float(value)
+    if hasattr(value, "free_symbols"):  # Any other sympy object
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON, with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """
+    Parse a `?fields=a,b` query value. Errors are always kept so a compact
+    response never hides a failure.
+
+    Returns:
+        The selected field names, or None when every field is wanted
+    """
+    if not fields:
+        return None
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    return (selected | {"error"}) if selected else None
+
+
+def select_fields(record: Dict[str, Any], fields: Optional[Set[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return record
+    return {key: value for key, value in record.items() if key in fields}
+
+
+def _include(model: APIResponse, fields: Optional[Set[str]]) -> Optional[Any]:
+    if fields is None:
+        return None
+    if model.RECORDS is None:
+        return fields
+    include: Dict[str, Any] = {name: True for name in type(model).model_fields if name != model.RECORDS}
+    include[model.RECORDS] = {"__all__": fields}
+    return include
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered by pydantic's serializer for response models and
+    by orjson for plain data, without whitespace or null fields.
+    """
+
+    def __init__(self, content: Any, status_code: int = 200, fields: Optional[Set[str]] = None, **kwargs):
+        self.fields = fields
+        super().__init__(content, status_code=status_code, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, APIResponse):
+            return content.model_dump_json(
+                exclude_none=True, include=_include(content, self.fields)
+            ).encode()
+        return dumps(content)
+
@@ -0,0 +1,407 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import numpy as np
+from .generation import CancelToken
+from .sessions import estimate_tokens
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def default_index_dir() -> str:
+    """
+    Location of the notes index (VESWO_INDEX_DIR overrides it).
+    """
+    path = os.environ.get("VESWO_INDEX_DIR")
+    if path:
+        return path
+    return os.path.join(os.path.expanduser("~"), ".cache", "veswo", "notes")
+
+
+def chunk_text(text: str, max_tokens: int = 200, overlap: int = 40) -> List[str]:
+    """
+    Split text into chunks of about `max_tokens` tokens for embedding.
+
+    Chunks break at paragraph and sentence boundaries where possible, and
+    each one repeats up to `overlap` tokens of sentences from the end of
+    the previous chunk so facts spanning a boundary are not lost.
+
+    Args:
+        text: The document text
+        max_tokens: Token budget per chunk
+        overlap: Tokens carried over from the previous chunk
+
+    Returns:
+        List of chunk texts
+    """
+    pieces = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in SENTENCE_END.split(paragraph):
+            # Hard-wrap run-on "sentences" such as OCR'd tables
+            while estimate_tokens(sentence) > max_tokens:
+                pieces.append(sentence[:max_tokens * 4])
+                sentence = sentence[max_tokens * 4:]
+            if sentence:
+                pieces.append(sentence)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and size + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            carried: List[str] = []
+            carried_tokens = 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous)
+                if carried_tokens + previous_tokens > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            current, size = carried, carried_tokens
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class VectorIndex:
+    """
+    On-disk index of unit-length chunk embeddings for cosine search.
+
+    Vectors live in a memory-mapped float32 matrix (one row per chunk), so
+    the index is not loaded into memory and a search is one matrix-vector
+    product over the mapped rows. Chunk text and documents are kept in
+    SQLite next to it. Removing a document marks its rows deleted; the
+    matrix is compacted in place once most rows are dead.
+
+    Every write bumps a version number, so other worker processes sharing
+    the directory pick up changes before their next search.
+    """
+
+    def __init__(self, directory: Optional[str] = None, initial_capacity: int = 1024):
+        self.directory = directory or default_index_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self.db_path = os.path.join(self.directory, "chunks.sqlite3")
+        self.matrix_path = os.path.join(self.directory, "vectors.f32")
+        self.initial_capacity = initial_capacity
+        self.dim: Optional[int] = None
+        self.count = 0  # Rows in use, including deleted ones
+        self.matrix: Optional[np.memmap] = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.version = -1
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " row INTEGER PRIMARY KEY,"
+            " doc_id TEXT NOT NULL,"
+            " chunk INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " doc_id TEXT PRIMARY KEY,"
+            " title TEXT,"
+            " chunks INTEGER NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, key: str) -> Optional[int]:
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _bump_version(self):
+        self._connection().execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1)"
+            " ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    def _refresh(self):
+        # Reload the row count, deleted mask and mapping after any write
+        version = self._meta("version") or 0
+        if version == self.version:
+            return
+        conn = self._connection()
+        self.dim = self._meta("dim")
+        self.count = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+        self.alive = np.zeros(self.count, dtype=bool)
+        rows = [row for (row,) in conn.execute("SELECT row FROM chunks WHERE deleted = 0")]
+        self.alive[rows] = True
+        self.matrix = None
+        if self.dim and os.path.exists(self.matrix_path):
+            capacity = os.path.getsize(self.matrix_path) // (self.dim * 4)
+            if capacity:
+                self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+",
+                                        shape=(capacity, self.dim))
+        self.version = version
+
+    def _reserve(self, rows: int):
+        capacity = self.matrix.shape[0] if self.matrix is not None else 0
+        if rows <= capacity:
+            return
+        new_capacity = max(self.initial_capacity, capacity)
+        while new_capacity < rows:
+            new_capacity *= 2
+        self.matrix = None
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+",
+                                shape=(new_capacity, self.dim))
+
+    def add(self, doc_id: str, title: Optional[str], chunks: List[str], vectors: np.ndarray):
+        """
+        Add (or replace) a document's chunks and their embeddings.
+
+        Raises:
+            ValueError: If the vectors do not match the chunks or the index's dimension
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(chunks):
+            raise ValueError("Expected one embedding per chunk")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh()
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (self.dim,))
+                elif vectors.shape[1] != self.dim:
+                    raise ValueError(
+                        f"Embeddings have {vectors.shape[1]} dimensions but the index has {self.dim}; "
+                        "delete the index to switch embedding models"
+                    )
+                start = self.count
+                self._reserve(start + len(chunks))
+                self.matrix[start:start + len(chunks)] = vectors
+                self.matrix.flush()
+                conn.execute("UPDATE chunks SET deleted = 1 WHERE doc_id = ?", (doc_id,))
+                conn.executemany(
+                    "INSERT INTO chunks (row, doc_id, chunk, text) VALUES (?, ?, ?, ?)",
+                    [(start + index, doc_id, index, text) for index, text in enumerate(chunks)]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (doc_id, title, chunks, created_at) VALUES (?, ?, ?, ?)",
+                    (doc_id, title, len(chunks), time.time())
+                )
+                self._bump_version()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self.version = -1
+                raise
+            self._refresh()
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                removed = conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,)).rowcount
+                conn.execute("UPDATE chunks SET deleted = 1 WHERE doc_id = ?", (doc_id,))
+                self._bump_version()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._refresh()
+            live = int(self.alive.sum())
+            if self.count - live > max(live, 256):
+                self.compact()
+            return bool(removed)
+
+    def compact(self):
+        """
+        Move the live rows to the front of the matrix and renumber them.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh()
+                live = np.flatnonzero(self.alive)
+                if self.matrix is not None and len(live):
+                    # Fancy indexing copies first, so overlapping rows are safe
+                    self.matrix[:len(live)] = self.matrix[live]
+                    self.matrix.flush()
+                conn.execute("DELETE FROM chunks WHERE deleted = 1")
+                # New numbers never exceed old ones, so ascending order never collides
+                conn.executemany(
+                    "UPDATE chunks SET row = ? WHERE row = ?",
+                    [(new, int(old)) for new, old in enumerate(live) if new != old]
+                )
+                self._bump_version()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self.version = -1
+                raise
+            self._refresh()
+
+    def search(self, vector: List[float], k: int = 4) -> List[Dict[str, Any]]:
+        """
+        Find the k chunks most similar to a query embedding.
+
+        Returns:
+            Chunk dicts (doc_id, title, chunk, text, score), best first
+        """
+        if k < 1:
+            return []
+        with self._lock:
+            self._refresh()
+            if self.matrix is None or not self.alive.any():
+                return []
+            query = np.asarray(vector, dtype=np.float32)
+            if query.shape != (self.dim,):
+                raise ValueError(f"Query has {query.size} dimensions but the index has {self.dim}")
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+            scores = self.matrix[:self.count] @ query
+            scores[~self.alive] = -np.inf
+            k = min(k, int(self.alive.sum()))
+            best = np.argpartition(scores, -k)[-k:]
+            best = best[np.argsort(-scores[best])]
+            ranked = [(int(row), float(scores[row])) for row in best]
+
+        placeholders = ",".join("?" * len(ranked))
+        found = {
+            row: (doc_id, title, chunk, text)
+            for row, doc_id, title, chunk, text in self._connection().execute(
+                "SELECT c.row, c.doc_id, d.title, c.chunk, c.text FROM chunks c"
+                f" LEFT JOIN documents d ON d.doc_id = c.doc_id WHERE c.row IN ({placeholders})",
+                [row for row, _ in ranked]
+            )
+        }
+        hits = []
+        for row, score in ranked:
+            if row in found:
+                doc_id, title, chunk, text = found[row]
+                hits.append({"doc_id": doc_id, "title": title, "chunk": chunk, "text": text,
+                             "score": round(score, 4)})
+        return hits
+
+    def documents(self) -> List[Dict[str, Any]]:
+        return [
+            {"doc_id": doc_id, "title": title, "chunks": chunks, "created_at": created_at}
+            for doc_id, title, chunks, created_at in self._connection().execute(
+                "SELECT doc_id, title, chunks, created_at FROM documents ORDER BY created_at DESC"
+            )
+        ]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        self.matrix = None
+
+
+class Retriever:
+    """
+    Retrieval over a student's notes for grounded chat.
+
+    Documents are chunked and embedded once when added; a question is
+    answered from only the few chunks closest to it, so the prompt stays
+    small however many notes are stored.
+    """
+
+    def __init__(self, embed: Callable[..., List[List[float]]], index: VectorIndex,
+                 chunk_tokens: int = 200, overlap: int = 40, batch_size: int = 32):
+        self.embed = embed
+        self.index = index
+        self.chunk_tokens = chunk_tokens
+        self.overlap = overlap
+        self.batch_size = batch_size
+
+    def add_document(self, text: str, title: Optional[str] = None, doc_id: Optional[str] = None,
+                     cancel: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """
+        Chunk, embed and index a document, replacing any with the same id.
+
+        Returns:
+            Dict with the doc_id, title and number of chunks
+
+        Raises:
+            ValueError: If the text is empty
+        """
+        chunks = chunk_text(text, self.chunk_tokens, self.overlap)
+        if not chunks:
+            raise ValueError("No text to index.")
+        vectors: List[List[float]] = []
+        for start in range(0, len(chunks), self.batch_size):
+            vectors.extend(self.embed(chunks[start:start + self.batch_size], cancel=cancel))
+        doc_id = doc_id or uuid.uuid4().hex
+        self.index.add(doc_id, title, chunks, np.asarray(vectors, dtype=np.float32))
+        return {"doc_id": doc_id, "title": title, "chunks": len(chunks)}
+
+    def remove_document(self, doc_id: str) -> bool:
+        return self.index.remove(doc_id)
+
+    def search(self, query: str, k: int = 4, min_score: float = 0.0,
+               cancel: Optional[CancelToken] = None) -> List[Dict[str, Any]]:
+        vector = self.embed([query], cancel=cancel)[0]
+        return [hit for hit in self.index.search(vector, k) if hit["score"] >= min_score]
+
+    def augment(self, prompt: str, k: int = 4, min_score: float = 0.3, token_budget: int = 1024,
+                cancel: Optional[CancelToken] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Prefix a question with the most relevant excerpts from the notes.
+
+        Args:
+            prompt: The student's question
+            k: Maximum number of excerpts
+            min_score: Cosine similarity below which excerpts are left out
+            token_budget: Maximum tokens of excerpts to include
+            cancel: Optional cancellation token
+
+        Returns:
+            Tuple of (prompt to send, excerpts used); the prompt is unchanged
+            when nothing relevant was found
+        """
+        hits = []
+        used = 0
+        for hit in self.search(prompt, k, min_score, cancel=cancel):
+            tokens = estimate_tokens(hit["text"])
+            if used + tokens > token_budget:
+                break
+            hits.append(hit)
+            used += tokens
+        if not hits:
+            return prompt, []
+        excerpts = "\n\n".join(
+            f"[{number}] {hit['title'] or 'Notes'}: {hit['text']}" for number, hit in enumerate(hits, 1)
+        )
+        return (
+            "Answer the question using these excerpts from the student's notes where they are "
+            "relevant, and cite them by number.\n\n"
+            f"{excerpts}\n\nQuestion: {prompt}"
+        ), hits
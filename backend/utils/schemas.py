@@ -0,0 +1,186 @@
+from typing import Any, ClassVar, Dict, List, Optional, Union
+from pydantic import BaseModel, Field
+
+
+class APIResponse(BaseModel):
+    """
+    Base for response bodies. Fields left as None are omitted from the JSON.
+
+    RECORDS names the list field holding per-item results (pages, lines);
+    `?fields=` selects keys inside those items. Without it the response
+    itself is the record.
+    """
+    RECORDS: ClassVar[Optional[str]] = None
+
+
+class ErrorResponse(APIResponse):
+    error: str
+
+
+class ModelStatus(APIResponse):
+    state: str
+    models: List[str]
+    keep_alive: Union[int, str]
+    active_hours: List[int]
+    load_seconds: Optional[float] = None
+    loaded_at: Optional[float] = None
+    last_error: Optional[str] = None
+    nodes: List[Dict[str, Any]] = Field(default_factory=list)
+    cascade: Optional[Dict[str, int]] = None  # Draft/escalation counts when the cascade is set up
+
+
+class StatusResponse(APIResponse):
+    status: str
+    gemma_ready: bool
+    model: ModelStatus
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+
+class OCRStatus(APIResponse):
+    ready: bool
+    engine: Optional[str] = None
+
+
+class QueueStatus(APIResponse):
+    generations: int  # In flight on the Ollama nodes
+    ocr_pages: int  # Waiting for or in OCR
+    jobs: int = 0  # Background jobs queued or running
+
+
+class StatusEvent(APIResponse):
+    """
+    Payload of the `status` events on /api/status/stream.
+    """
+    gemma_ready: bool
+    model: ModelStatus
+    ocr: OCRStatus
+    queue: QueueStatus
+
+
+class NoteExcerpt(APIResponse):
+    doc_id: str
+    title: Optional[str] = None
+    chunk: int
+    text: Optional[str] = None
+    score: float
+
+
+class ChatResponse(APIResponse):
+    response: str
+    method: str
+    profile: Optional[str] = None
+    session_id: Optional[str] = None
+    truncated: Optional[bool] = None
+    sources: Optional[List[NoteExcerpt]] = None  # Notes the answer was grounded in
+    model: Optional[str] = None  # Model that wrote a cascaded answer
+    escalation: Optional[str] = None  # Why the small model's draft was not used
+    document_chunks: Optional[int] = None  # Chunks a long "document" was condensed from
+
+
+class EssayResponse(APIResponse):
+    essay: str
+    method: str
+    profile: Optional[str] = None
+    truncated: Optional[bool] = None
+    sections: Optional[int] = None  # Sections drafted by the small model (cascade)
+    refined: Optional[int] = None  # Sections the large model refined
+
+
+class DeleteSessionResponse(APIResponse):
+    deleted: bool
+
+
+class NotesDocument(APIResponse):
+    doc_id: str
+    title: Optional[str] = None
+    chunks: int
+    created_at: Optional[float] = None
+    elapsed_ms: Optional[float] = None
+
+
+class NotesList(APIResponse):
+    RECORDS: ClassVar[Optional[str]] = "documents"
+
+    documents: List[NotesDocument]
+
+
+class NotesSearchResponse(APIResponse):
+    RECORDS: ClassVar[Optional[str]] = "results"
+
+    results: List[NoteExcerpt]
+
+
+class OCRResponse(APIResponse):
+    text: str
+
+
+class ScreenRegionResponse(APIResponse):
+    pinned: Optional[List[int]] = None  # (left, top, width, height)
+    active_window: Optional[List[int]] = None
+
+
+class OCRPage(APIResponse):
+    page: int
+    text: Optional[str] = None
+    error: Optional[str] = None
+    elapsed_ms: float
+
+
+class OCRBatchResponse(APIResponse):
+    RECORDS: ClassVar[Optional[str]] = "pages"
+
+    pages: List[OCRPage]
+    text: str
+    page_count: int
+    elapsed_ms: float
+
+
+class SolveResult(APIResponse):
+    line: int
+    text: str
+    expression: Optional[str] = None
+    answer: Optional[str] = None
+    method: Optional[str] = None
+    error: Optional[str] = None
+    elapsed_ms: float
+
+
+class SolveResponse(APIResponse):
+    RECORDS: ClassVar[Optional[str]] = "results"
+
+    results: List[SolveResult]
+    line_count: int
+    elapsed_ms: float
+    text: Optional[str] = None
+
+
+class StreamSummary(APIResponse):
+    """
+    Last NDJSON line of a streamed batch, after one line per record.
+    """
+    done: bool = True
+    page_count: Optional[int] = None
+    line_count: Optional[int] = None
+    elapsed_ms: float
+
+
+class JobStatus(APIResponse):
+    job_id: str
+    type: str
+    priority: str
+    state: str  # queued, running, done, failed or cancelled
+    done: Optional[int] = None
+    total: Optional[int] = None
+    preemptions: int = 0
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None  # The response the endpoint would have returned
+
+
+class JobList(APIResponse):
+    RECORDS: ClassVar[Optional[str]] = "jobs"
+
+    jobs: List[JobStatus]
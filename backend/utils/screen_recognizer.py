@@ -1,43 +1,150 @@
 import cv2
 import numpy as np
-import pytesseract
 from PIL import Image
-import pyautogui
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Callable, Dict, Any, Optional, List, Tuple
+import os
 import re
+import threading
+from io import BytesIO
+from .capture_backends import CaptureBackend, Region, get_capture_backend
+from .ocr_cache import OCRCache
+from .ocr_engine import OCREngine, get_ocr_engine
+from .regions import active_window_region, clip_region, coverage, find_text_regions
+from .shared_store import SharedStore
+
+# Above this share of the capture, one OCR pass over everything beats several crops
+FULL_FRAME_COVERAGE = 0.6
+# Captures smaller than this (in pixels) are read whole without a pre-scan
+MIN_PRESCAN_AREA = 200 * 200
 
 class ScreenRecognizer:
-    def __init__(self):
-        # Configure pytesseract path if needed
-        # pytesseract.pytesseract.tesseract_cmd = r'path_to_tesseract'
-        
+    def __init__(self, capture_backend: Optional[CaptureBackend] = None,
+                 ocr_cache: Optional[OCRCache] = None, ocr_engine: Optional[OCREngine] = None,
+                 store: Optional[SharedStore] = None,
+                 window_tracker: Optional[Callable[[], Optional[Region]]] = None):
         # Initialize screen capture settings
-        self.screen_region = None  # (left, top, width, height)
+        self._store = store
+        # Region pinned by the user when there is no shared store to keep it in
+        self._screen_region: Optional[Region] = None
+        if window_tracker is None and os.environ.get("VESWO_TRACK_WINDOW", "1") == "1":
+            window_tracker = active_window_region
+        self._window_tracker = window_tracker
+        self._capture_backend = capture_backend
+        self._ocr_engine = ocr_engine
+        self._engine_lock = threading.Lock()
         
         # Initialize OCR settings
         self.ocr_config = {
             'lang': 'eng',
             'config': '--psm 6'  # Assume uniform text block
         }
+        
+        # Repeated images are answered from the cache instead of tesseract
+        self.ocr_cache = ocr_cache if ocr_cache is not None else OCRCache()
+    
+    @property
+    def capture_backend(self) -> CaptureBackend:
+        """
+        Capture backend in use, selected on first access so that importing
+        and constructing the recognizer never touches the display.
+        """
+        if self._capture_backend is None:
+            self._capture_backend = get_capture_backend()
+        return self._capture_backend
     
-    def capture_screen(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+    @property
+    def ocr_engine(self) -> OCREngine:
+        """
+        OCR engine in use: a warm tesserocr pool when available, else pytesseract.
+        """
+        if self._ocr_engine is None:
+            with self._engine_lock:
+                if self._ocr_engine is None:
+                    self._ocr_engine = get_ocr_engine()
+        return self._ocr_engine
+    
+    @property
+    def ocr_engine_name(self) -> Optional[str]:
+        """
+        Name of the OCR engine, or None until it has been loaded.
+        """
+        return self._ocr_engine.name if self._ocr_engine is not None else None
+    
+    def close(self):
+        """
+        Release the OCR engine's tesseract handles, if any were created.
+        """
+        if self._ocr_engine is not None:
+            self._ocr_engine.close()
+    
+    @property
+    def screen_region(self) -> Optional[Region]:
+        """
+        Region pinned by the user, read from the shared store on every call so
+        a pin set through any worker applies to all of them and survives restarts.
+        """
+        if self._store is None:
+            return self._screen_region
+        region = self._store.get("screen", "pinned_region")
+        return tuple(region) if region is not None else None
+    
+    def pin_region(self, region: Optional[Region]):
+        """
+        Pin the region read when callers don't pass one; None unpins it.
+        
+        Args:
+            region: Tuple (left, top, width, height) or None
+        """
+        self._screen_region = tuple(region) if region is not None else None
+        if self._store is not None:
+            if self._screen_region is None:
+                self._store.delete("screen", "pinned_region")
+            else:
+                self._store.set("screen", "pinned_region", list(self._screen_region))
+    
+    def active_window(self) -> Optional[Region]:
+        """
+        Bounds of the focused window clipped to the screen, if they can be found.
+        """
+        if self._window_tracker is None:
+            return None
+        region = self._window_tracker()
+        if region is None:
+            return None
+        try:
+            return clip_region(region, self.capture_backend.screen_size())
+        except NotImplementedError:
+            return region
+    
+    def resolve_region(self, region: Optional[Region] = None) -> Optional[Region]:
+        """
+        Pick the region to capture: the one given, else the pinned region,
+        else the focused window, else the whole screen (None).
+        """
+        if region:
+            return tuple(region)
+        pinned = self.screen_region
+        if pinned is not None:
+            return pinned
+        return self.active_window()
+    
+    def capture_screen(self, region: Optional[Tuple[int, int, int, int]] = None,
+                       auto_region: bool = True) -> np.ndarray:
         """
         Capture the screen or a region of the screen.
         
         Args:
             region: Optional tuple (left, top, width, height) defining screen region
+            auto_region: Without a region, capture the pinned region or the
+                focused window instead of the whole screen
             
         Returns:
-            numpy array containing the screen capture
+            numpy array containing the screen capture (RGB)
         """
         try:
-            if region:
-                screenshot = pyautogui.screenshot(region=region)
-            else:
-                screenshot = pyautogui.screenshot()
-            
-            # Convert PIL Image to numpy array
-            return np.array(screenshot)
+            if auto_region:
+                region = self.resolve_region(region)
+            return self.capture_backend.grab(region)
             
         except Exception as e:
             raise Exception(f"Screen capture failed: {str(e)}")
@@ -53,17 +160,75 @@ class ScreenRecognizer:
             Extracted text as string
         """
         try:
-            # Convert numpy array to PIL Image
-            pil_image = Image.fromarray(image)
+            return self.ocr_cache.get_or_compute(
+                image, self.ocr_config, lambda: self._run_ocr(Image.fromarray(image), self.ocr_config)
+            )
             
-            # Perform OCR
-            text = pytesseract.image_to_string(pil_image, **self.ocr_config)
+        except Exception as e:
+            raise Exception(f"Text extraction failed: {str(e)}")
+    
+    def read_image(self, image: np.ndarray) -> str:
+        """
+        OCR only the parts of an image that look like text.
+        
+        A cheap pre-scan finds text blocks; each is OCR'd (through the cache)
+        and the results are joined top to bottom. Images without text skip
+        OCR entirely, and mostly-text images are read in one pass.
+        
+        Args:
+            image: numpy array containing the image
+            
+        Returns:
+            Extracted text as string
+        """
+        height, width = image.shape[:2]
+        if height * width < MIN_PRESCAN_AREA:
+            return self.extract_text(image)
+        blocks = find_text_regions(image)
+        if not blocks:
+            return ""
+        if coverage(blocks, (width, height)) > FULL_FRAME_COVERAGE:
+            return self.extract_text(image)
+        texts = [self.extract_text(image[top:top + h, left:left + w]) for left, top, w, h in blocks]
+        return "\n".join(text for text in texts if text)
+    
+    def read_screen(self, region: Optional[Tuple[int, int, int, int]] = None) -> str:
+        """
+        Capture the screen (see capture_screen) and read its text blocks.
+        
+        Args:
+            region: Optional screen region to read
+            
+        Returns:
+            Extracted text as string
+        """
+        return self.read_image(self.capture_screen(region))
+    
+    def extract_text_from_bytes(self, image_bytes: bytes,
+                                ocr_config: Optional[Dict[str, str]] = None) -> str:
+        """
+        Extract text from an encoded image (PNG, JPEG, ...).
+        
+        Args:
+            image_bytes: The encoded image file contents
+            ocr_config: Optional lang/config overriding self.ocr_config
             
-            return text.strip()
+        Returns:
+            Extracted text as string
+        """
+        ocr_config = ocr_config if ocr_config is not None else self.ocr_config
+        try:
+            # The encoded bytes are hashed directly, so cache hits skip decoding too
+            return self.ocr_cache.get_or_compute(
+                image_bytes, ocr_config, lambda: self._run_ocr(Image.open(BytesIO(image_bytes)), ocr_config)
+            )
             
         except Exception as e:
             raise Exception(f"Text extraction failed: {str(e)}")
     
+    def _run_ocr(self, image: Image.Image, ocr_config: Dict[str, str]) -> str:
+        return self.ocr_engine.image_to_string(image, **ocr_config).strip()
+    
     def find_text_on_screen(self, search_text: str, 
                            region: Optional[Tuple[int, int, int, int]] = None) -> List[Dict[str, Any]]:
         """
@@ -77,11 +242,8 @@ class ScreenRecognizer:
             List of dictionaries containing found text locations and content
         """
         try:
-            # Capture screen
-            screen = self.capture_screen(region)
-            
-            # Extract text
-            text = self.extract_text(screen)
+            # Capture the screen and OCR its text blocks
+            text = self.read_screen(region)
             
             # Find matches
             matches = []
@@ -108,11 +270,8 @@ class ScreenRecognizer:
             Dictionary containing analyzed screen content
         """
         try:
-            # Capture screen
-            screen = self.capture_screen(region)
-            
-            # Extract text
-            text = self.extract_text(screen)
+            # Capture the screen and OCR its text blocks
+            text = self.read_screen(region)
             
             # Analyze content
             analysis = {
@@ -140,27 +299,30 @@ class ScreenRecognizer:
             List of dictionaries containing detected equations
         """
         try:
-            # Capture screen
-            screen = self.capture_screen(region)
+            # Capture the screen and OCR its text blocks
+            text = self.read_screen(region)
             
-            # Extract text
-            text = self.extract_text(screen)
-            
-            # Find potential equations
-            equations = []
-            for line in text.splitlines():
-                # Look for lines containing mathematical operators
-                if re.search(r'[+\-*/=]', line):
-                    equations.append({
-                        'equation': line.strip(),
-                        'type': self._classify_equation_type(line)
-                    })
-            
-            return equations
+            return [
+                {'equation': line, 'type': self._classify_equation_type(line)}
+                for line in self.equation_lines(text)
+            ]
             
         except Exception as e:
             raise Exception(f"Equation detection failed: {str(e)}")
     
+    def equation_lines(self, text: str) -> List[str]:
+        """
+        Pick the lines of OCR output that look like math.
+        
+        Args:
+            text: Extracted text
+            
+        Returns:
+            Stripped lines containing a mathematical operator
+        """
+        # OCR often returns typographic operators instead of ASCII ones
+        return [line.strip() for line in text.splitlines() if re.search(r'[+\-*/=×÷−–]', line)]
+    
     def _classify_equation_type(self, equation: str) -> str:
         """
         Classify the type of mathematical equation.
@@ -0,0 +1,216 @@
+from typing import Callable, List, Optional
+from dataclasses import asdict, dataclass, field
+from collections import OrderedDict
+import threading
+import time
+import uuid
+from .shared_store import SharedStore
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (about four characters per token for English).
+    """
+    return max(1, (len(text) + 3) // 4)
+
+
+@dataclass
+class ChatTurn:
+    role: str
+    content: str
+    tokens: int
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    turns: List[ChatTurn] = field(default_factory=list)
+    summary: str = ""
+    # Token context returned by Ollama; lets follow-up turns skip re-prefilling history
+    context: Optional[List[int]] = None
+    # Number of turns already folded into `context`
+    context_turns: int = 0
+    # Ollama node and model the context belongs to; it is meaningless elsewhere
+    backend: Optional[str] = None
+    model: Optional[str] = None
+    last_used: float = field(default_factory=time.time)
+    # Bumped on every save to the shared store, to spot copies saved by other workers
+    version: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def to_dict(self) -> dict:
+        data = {name: value for name, value in self.__dict__.items() if name != "lock"}
+        data["turns"] = [asdict(turn) for turn in self.turns]
+        return data
+
+    def load(self, data: dict):
+        """
+        Replace this session's state with a copy saved by to_dict().
+        """
+        for name, value in data.items():
+            setattr(self, name, value)
+        self.turns = [ChatTurn(**turn) for turn in data["turns"]]
+
+    @property
+    def history_tokens(self) -> int:
+        estimated = sum(turn.tokens for turn in self.turns) + estimate_tokens(self.summary)
+        if self.context:
+            return max(estimated, len(self.context))
+        return estimated
+
+    def add_turn(self, role: str, content: str):
+        self.turns.append(ChatTurn(role, content, estimate_tokens(content)))
+
+    def reset_context(self):
+        self.context = None
+        self.context_turns = 0
+        self.backend = None
+        self.model = None
+
+    def build_prompt(self, prompt: str) -> str:
+        """
+        Build the prompt text to send for a new user message.
+
+        With a live context only the turns the model has not seen yet are
+        sent; otherwise the summary and retained turns are replayed as a
+        transcript.
+        """
+        if self.context:
+            pending = self.turns[self.context_turns:]
+            if not pending:
+                return prompt
+            return self._render(pending, prompt)
+
+        if not self.turns and not self.summary:
+            return prompt
+        return self._render(self.turns, prompt, summary=self.summary)
+
+    def _render(self, turns: List[ChatTurn], prompt: str, summary: str = "") -> str:
+        lines = []
+        if summary:
+            lines.append(f"Summary of the conversation so far: {summary}")
+            lines.append("")
+        for turn in turns:
+            speaker = "User" if turn.role == "user" else "Assistant"
+            lines.append(f"{speaker}: {turn.content}")
+        lines.append(f"User: {prompt}")
+        lines.append("Assistant:")
+        return "\n".join(lines)
+
+    def compact(self, token_budget: int, keep_recent: int,
+                summarize: Callable[[str], str]):
+        """
+        Fold older turns into the running summary once the history exceeds
+        the token budget.
+
+        Args:
+            token_budget: Maximum number of history tokens to keep
+            keep_recent: Number of most recent turns kept verbatim
+            summarize: Callable turning a transcript into a short summary
+        """
+        if self.history_tokens <= token_budget or len(self.turns) <= keep_recent:
+            return
+
+        older = self.turns[:-keep_recent] if keep_recent else self.turns
+        recent = self.turns[-keep_recent:] if keep_recent else []
+        transcript = "\n".join(
+            f"{'User' if turn.role == 'user' else 'Assistant'}: {turn.content}"
+            for turn in older
+        )
+        if self.summary:
+            transcript = f"Previous summary: {self.summary}\n{transcript}"
+
+        self.summary = summarize(transcript)
+        self.turns = recent
+        # The KV context still holds the dropped turns, so rebuild it next turn
+        self.reset_context()
+
+
+class SessionStore:
+    """
+    Chat sessions by id, least recently used evicted first.
+
+    With a SharedStore, every session is saved there after each turn and
+    reloaded when another worker process saved a newer copy, so a
+    conversation keeps its history and KV context whichever worker serves
+    the next request. Two workers answering the same session at the same
+    time still overwrite each other's turn.
+    """
+    NAMESPACE = "sessions"
+
+    def __init__(self, max_sessions: int = 256, ttl: float = 3600.0,
+                 token_budget: int = 2048, keep_recent: int = 4,
+                 store: Optional[SharedStore] = None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.store = store
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        """
+        Return the session with the given id, creating it if needed.
+        """
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            session_id = session_id or uuid.uuid4().hex
+            session = self._refresh(session_id, self._sessions.get(session_id))
+            if session is None:
+                session = ChatSession(session_id)
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            session.last_used = now
+            return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            session = self._refresh(session_id, self._sessions.get(session_id))
+            if session is not None:
+                self._sessions[session_id] = session
+            return session
+
+    def save(self, session: ChatSession):
+        """
+        Publish a session to the other workers; call with session.lock held.
+        """
+        if self.store is None:
+            return
+        session.version += 1
+        self.store.set(self.NAMESPACE, session.session_id, session.to_dict(), ttl=self.ttl)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            deleted = self._sessions.pop(session_id, None) is not None
+        if self.store is not None:
+            deleted = self.store.get(self.NAMESPACE, session_id) is not None or deleted
+            self.store.delete(self.NAMESPACE, session_id)
+        return deleted
+
+    def _refresh(self, session_id: str, session: Optional[ChatSession]) -> Optional[ChatSession]:
+        # The shared copy wins when another worker saved a newer version
+        if self.store is None:
+            return session
+        data = self.store.get(self.NAMESPACE, session_id)
+        if data is None:
+            # Saved before but gone from the store: deleted or expired elsewhere
+            return None if session is not None and session.version else session
+        if session is None:
+            session = ChatSession(session_id)
+        if data["version"] > session.version:
+            session.load(data)
+        return session
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict_expired(self, now: float):
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_used <= self.ttl:
+                break
+            del self._sessions[oldest_id]
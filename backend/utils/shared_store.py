@@ -0,0 +1,94 @@
+from typing import Any, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def default_store_path() -> str:
+    """
+    Location of the shared cache database (VESWO_CACHE_DB overrides it).
+    """
+    path = os.environ.get("VESWO_CACHE_DB")
+    if path:
+        return path
+    return os.path.join(os.path.expanduser("~"), ".cache", "veswo", "shared.sqlite3")
+
+
+class SharedStore:
+    """
+    SQLite-backed key/value store shared by every backend worker process.
+
+    Values are stored as JSON under a (namespace, key) pair with an optional
+    expiry. The database runs in WAL mode so readers in one worker never
+    block writers in another. Expired entries are hidden on read and
+    deleted by purge_expired().
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_store_path()
+        if self.path == ":memory:":
+            # Each thread opens its own connection, which would get its own empty database
+            raise ValueError("SharedStore needs a database file, not ':memory:'")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(namespace, key)
+            return default
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), expires_at)
+        )
+
+    def delete(self, namespace: str, key: str):
+        self._connection().execute(
+            "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def clear(self, namespace: str):
+        self._connection().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def purge_expired(self) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
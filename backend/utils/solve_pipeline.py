@@ -0,0 +1,121 @@
+from typing import Any, Dict, Iterator, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import os
+import re
+import time
+from .generation import CancelToken
+from .profiling import profiled
+from .intent_router import IntentRouter
+
+# Characters OCR returns in place of the ASCII operators
+OCR_SYMBOLS = {
+    '×': '*', '·': '*', '•': '*', '÷': '/',
+    '−': '-', '–': '-', '—': '-',
+    '²': '**2', '³': '**3', '^': '**',
+    '“': '', '”': '', '‘': '', '’': '',
+}
+# (pattern, replacement) fixes for letters read instead of digits and operators
+OCR_CONFUSIONS = [
+    (re.compile(r'(?<=\d)[oO](?![a-zA-Z])'), '0'),        # 1o -> 10
+    (re.compile(r'(?<![a-zA-Z])[oO](?=\d)'), '0'),        # O5 -> 05
+    (re.compile(r'(?<=\d)[lI|](?=\d)'), '1'),             # 2l3 -> 213
+    (re.compile(r'(?<![a-zA-Z\d])[lI|](?=\d)'), '1'),     # l2 -> 12
+    (re.compile(r'(?<=\d)[sS](?=\d)'), '5'),              # 2S0 -> 250
+    (re.compile(r'(?<=\d)\s+[xX]\s+(?=\d)'), '*'),        # 3 x 4 -> 3*4
+    (re.compile(r'(?<=\d),(?=\d{3}(?!\d))'), ''),         # 1,000 -> 1000
+    (re.compile(r'={2,}'), '='),
+]
+# Worksheet numbering such as "1.", "2)", "(a)" or "b)"
+LIST_MARKER = re.compile(r'^\s*(\(?[a-zA-Z0-9]{1,2}\)|[0-9]{1,2}\.)\s+')
+TRAILING_EQUALS = re.compile(r'\s*=\s*\??\s*$')
+
+
+def normalize_ocr_line(line: str, question_prefix: Optional[re.Pattern] = None) -> str:
+    """
+    Clean an OCR'd line up into an expression the solver can parse.
+
+    Args:
+        line: One line of OCR output
+        question_prefix: Optional pattern for leading words like "Solve:"
+
+    Returns:
+        The line with numbering, prompts and OCR confusions removed
+    """
+    text = LIST_MARKER.sub('', line.strip())
+    if question_prefix is not None:
+        text = question_prefix.sub('', text)
+    for symbol, replacement in OCR_SYMBOLS.items():
+        text = text.replace(symbol, replacement)
+    for pattern, replacement in OCR_CONFUSIONS:
+        text = pattern.sub(replacement, text)
+    # "2 + 2 = ?" asks for the value of the left-hand side
+    text = TRAILING_EQUALS.sub('', text.rstrip('?.!, '))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class SolvePipeline:
+    """
+    Solve the math lines of OCR output in parallel, one result per line.
+
+    Each line is normalized, then parsed and solved once by the
+    IntentRouter in a worker thread, so results can be streamed back in
+    completion order without another round trip per equation.
+    """
+
+    def __init__(self, intent_router: IntentRouter, max_workers: Optional[int] = None):
+        self.intent_router = intent_router
+        self.max_workers = max_workers or int(os.environ.get("VESWO_SOLVE_WORKERS", str(os.cpu_count() or 2)))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="solve")
+
+    def submit(self, lines: List[str], cancel: Optional[CancelToken] = None,
+               start: int = 0) -> List[Future]:
+        """
+        Queue every line for solving.
+
+        Args:
+            lines: Lines of text to solve
+            cancel: Optional cancellation token shared by every line
+            start: Number of the first line, when solving a slice of a worksheet
+
+        Returns:
+            One future per line, resolving to that line's result dict
+        """
+        cancel = cancel or CancelToken()
+        task = profiled(self._solve_line)
+        return [
+            self.executor.submit(task, index, line, cancel)
+            for index, line in enumerate(lines, start)
+        ]
+
+    def run(self, lines: List[str], cancel: Optional[CancelToken] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Solve the lines and yield each result as soon as it is ready.
+        """
+        futures = self.submit(lines, cancel)
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _solve_line(self, index: int, line: str, cancel: CancelToken) -> Dict[str, Any]:
+        cancel.raise_if_cancelled()
+        started = time.perf_counter()
+        result = {"line": index, "text": line}
+        try:
+            expression = normalize_ocr_line(line, self.intent_router.question_prefix)
+            result["expression"] = expression
+            answer = self.intent_router.answer_normalized(expression)
+            if answer is None:
+                result["error"] = "Could not solve this line"
+            else:
+                result["answer"] = answer.response
+                result["method"] = answer.method
+        except Exception as e:
+            result["error"] = str(e)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
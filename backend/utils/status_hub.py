@@ -0,0 +1,102 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+from .responses import dumps
+
+
+class StatusHub:
+    """
+    One shared source of truth for backend status, pushed to every
+    subscriber as Server-Sent Events.
+
+    A single task takes a snapshot every `interval` seconds (or right away
+    after notify()) and broadcasts it only when it changed, so the server's
+    work does not grow with the number of open clients.
+    """
+
+    def __init__(self, snapshot: Callable[[], Dict[str, Any]], interval: float = 1.0,
+                 heartbeat: float = 15.0):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.current: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self.subscribers = 0
+        self._changed: Optional[asyncio.Event] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """
+        Start the snapshot task on the running event loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._wake = asyncio.Event()
+        self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        """
+        Take a new snapshot as soon as possible. Safe to call from any thread.
+        """
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def refresh(self) -> bool:
+        """
+        Take a snapshot and wake the subscribers if it changed.
+        """
+        snapshot = self.snapshot()
+        if snapshot == self.current:
+            return False
+        self.current = snapshot
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Status snapshot failed: {str(e)}")
+
+    async def events(self, is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[bytes]:
+        """
+        Yield SSE messages: the current status right away, then every change,
+        with a comment line as heartbeat so proxies keep the stream open.
+
+        Args:
+            is_disconnected: Async callable telling whether the client left
+        """
+        self.subscribers += 1
+        try:
+            yield b"retry: 2000\n\n"
+            version = 0
+            while not await is_disconnected():
+                if version != self.version:
+                    version = self.version
+                    yield b"event: status\nid: %d\ndata: %s\n\n" % (version, dumps(self.current))
+                    continue
+                try:
+                    await asyncio.wait_for(self._changed.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            self.subscribers -= 1
@@ -0,0 +1,135 @@
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import os
+from .generation import CancelToken, GenerationProfile, get_profile
+from .profiling import profiled
+from .retrieval import chunk_text
+from .sessions import estimate_tokens
+from .shared_store import SharedStore
+
+# Reply asked for when a chunk says nothing about the question
+NOTHING_RELEVANT = "NONE"
+
+
+class MapReduceSummarizer:
+    """
+    Condense long text (e.g. OCR'd pages) so it fits in a chat prompt.
+
+    The text is split into token-budgeted chunks, each chunk is summarized
+    in parallel (map), and the partial results are merged until they fit the
+    budget (reduce). The first pass ignores the question, so its summaries
+    are cached in the shared store by chunk hash and reused by every later
+    question about the same document. The question is applied by the
+    reduce rounds, which search the merged summaries for what it needs, and
+    by the chat reply that reads the condensed notes.
+
+    Args:
+        generate: Runs one stateless generation; called as
+            generate(prompt, profile=..., cancel=...) and returns the text
+        store: Optional shared store caching chunk results across workers
+        max_workers: Chunks summarized at once (VESWO_SUMMARY_WORKERS);
+            more only helps when Ollama serves requests in parallel
+            (several nodes or OLLAMA_NUM_PARALLEL)
+        chunk_tokens: Token budget of each chunk sent to the model
+        cache_ttl: Seconds chunk results stay cached
+        max_rounds: Map passes before over-budget notes are truncated
+    """
+
+    def __init__(self, generate: Callable[..., str], store: Optional[SharedStore] = None,
+                 max_workers: Optional[int] = None, chunk_tokens: int = 1500,
+                 cache_ttl: float = 7 * 24 * 3600, max_rounds: int = 3):
+        self.generate = generate
+        self.store = store
+        self.max_workers = max_workers or int(os.environ.get("VESWO_SUMMARY_WORKERS", "4"))
+        self.chunk_tokens = chunk_tokens
+        self.cache_ttl = cache_ttl
+        self.max_rounds = max_rounds
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="summarize")
+
+    def _map_prompt(self, chunk: str, question: Optional[str]) -> str:
+        if question:
+            return (
+                "Below is one part of a longer document. Copy out or briefly restate every fact, "
+                "number, definition and equation in it that helps answer the question. "
+                f"If nothing in it is relevant, reply only {NOTHING_RELEVANT}.\n\n"
+                f"Question: {question}\n\nDocument part:\n{chunk}"
+            )
+        return (
+            "Summarize this part of a longer document in a few sentences, keeping names, "
+            f"numbers, definitions and equations.\n\nDocument part:\n{chunk}"
+        )
+
+    def _map_chunk(self, chunk: str, question: Optional[str], profile: GenerationProfile,
+                   cancel: CancelToken) -> str:
+        cancel.raise_if_cancelled()
+        prompt = self._map_prompt(chunk, question)
+        key = hashlib.sha256(
+            f"{sorted(profile.ollama_options(prompt).items())}\0{question or ''}\0{chunk}".encode()
+        ).hexdigest()
+        if self.store is not None:
+            cached = self.store.get("summaries", key)
+            if cached is not None:
+                return cached
+        result = self.generate(prompt, profile=profile, cancel=cancel).strip()
+        if self.store is not None and not cancel.expired:
+            self.store.set("summaries", key, result, ttl=self.cache_ttl)
+        return result
+
+    def _map(self, chunks: List[str], question: Optional[str], profile: GenerationProfile,
+             cancel: CancelToken) -> List[str]:
+        task = profiled(self._map_chunk)
+        futures: List[Future] = [
+            self.executor.submit(task, chunk, question, profile, cancel) for chunk in chunks
+        ]
+        try:
+            results = [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+        return [
+            result for result in results
+            if result and result.strip(" .").upper() != NOTHING_RELEVANT
+        ]
+
+    def condense(self, text: str, question: Optional[str] = None, token_budget: int = 1500,
+                 profile: Optional[GenerationProfile] = None,
+                 cancel: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """
+        Shrink text to at most about `token_budget` tokens.
+
+        Text that already fits is returned unchanged. Otherwise the chunks
+        are mapped in parallel and the partial results are merged, mapping
+        again over the merged notes while they are still over budget.
+
+        Args:
+            text: The long input
+            question: Optional question; once the first pass has summarized
+                the chunks, later rounds keep only what it needs
+            token_budget: Size the result must fit in
+            profile: Generation profile for each model call (default "summarize")
+            cancel: Cancellation token shared by every model call
+
+        Returns:
+            Dict with the condensed "text", the number of "chunks" and of map
+            "rounds" (0 when the text already fit)
+        """
+        profile = profile or get_profile("summarize")
+        cancel = cancel or profile.cancel_token()
+        notes = text.strip()
+        chunks = rounds = 0
+        while estimate_tokens(notes) > token_budget:
+            if rounds >= self.max_rounds:
+                # Notes the model will not shrink any further are cut rather than looped on
+                notes = notes[:token_budget * 4]
+                break
+            pieces = chunk_text(notes, max_tokens=self.chunk_tokens, overlap=min(100, self.chunk_tokens // 10))
+            # Only the question-free first pass is shared between questions
+            partials = self._map(pieces, question if rounds else None, profile, cancel)
+            chunks = chunks or len(pieces)
+            rounds += 1
+            notes = "\n\n".join(partials)
+        return {"text": notes, "chunks": chunks, "rounds": rounds}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
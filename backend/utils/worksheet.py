@@ -0,0 +1,264 @@
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+import csv
+import json
+import os
+import signal
+import threading
+import time
+from .problem_solver import ProblemSolver
+
+TEXT_FIELDS = ("problem", "question", "text")
+
+# (row number, id, problem text)
+Row = Tuple[int, Any, str]
+
+
+def read_problems(path: str, field: Optional[str] = None, id_field: str = "id",
+                  skip: int = 0) -> Iterator[Row]:
+    """
+    Stream problems from a JSONL, CSV or plain text file (one per line).
+
+    Args:
+        path: Input file; the format is picked by extension
+        field: Column holding the problem text; defaults to the first of
+            "problem", "question" or "text" present
+        id_field: Column with an id to copy to the results
+        skip: Number of leading problems to skip (when resuming)
+
+    Yields:
+        (row number, id, problem text) tuples
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="" if extension == ".csv" else None, encoding="utf-8") as f:
+        if extension == ".csv":
+            records: Iterable[Any] = csv.DictReader(f)
+        elif extension in (".jsonl", ".ndjson"):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = ({"text": line.rstrip("\n")} for line in f if line.strip())
+
+        for number, record in enumerate(records):
+            if number < skip:
+                continue
+            name = field or next((key for key in TEXT_FIELDS if key in record), None)
+            if name is None or name not in record:
+                raise ValueError(f"Row {number} has no problem text (use --field)")
+            yield number, record.get(id_field), str(record[name])
+
+
+_solver: Optional[ProblemSolver] = None
+
+
+class _BatchTimeout(BaseException):
+    # BaseException so the per-row `except Exception` cannot swallow it
+    pass
+
+
+def _init_worker():
+    global _solver
+    _solver = ProblemSolver()
+
+
+def _raise_timeout(signum, frame):
+    raise _BatchTimeout()
+
+
+def _row_result(number: int, row_id: Any) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"row": number}
+    if row_id is not None:
+        result["id"] = row_id
+    return result
+
+
+def _timed_out(batch: List[Row], timeout: float) -> List[Dict[str, Any]]:
+    return [
+        {**_row_result(number, row_id), "error": f"Timed out after {timeout:g}s"}
+        for number, row_id, _ in batch
+    ]
+
+
+def solve_batch(batch: List[Row], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Parse and solve a batch of problems (run inside a pool worker).
+
+    Args:
+        batch: Rows to solve
+        timeout: Seconds the whole batch may take; rows not finished by then
+            get an error result. Enforced with SIGALRM, so only on POSIX
+            and in the main thread (pool workers always are).
+    """
+    if _solver is None:
+        _init_worker()
+    alarm = (timeout and hasattr(signal, "setitimer")
+             and threading.current_thread() is threading.main_thread())
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    results = []
+    try:
+        for number, row_id, text in batch:
+            started = time.perf_counter()
+            result = _row_result(number, row_id)
+            try:
+                problem = _solver.parse_problem(text)
+                result.update(_solver.solve_problem(problem))
+                result["type"] = problem.type.value
+                result["unknowns"] = problem.unknown_variables
+            except Exception as e:
+                result["error"] = str(e)
+            result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            results.append(result)
+    except _BatchTimeout:
+        results.extend(_timed_out(batch[len(results):], timeout))
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return results
+
+
+class _Inline(Executor):
+    # Runs batches in the calling process (workers=0), for debugging and tests
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def _collect(batch: List[Row], future: Future, timeout: Optional[float]) -> List[Dict[str, Any]]:
+    # The worker's own alarm normally ends the batch first; waiting twice as
+    # long covers workers that cannot use one (e.g. on Windows)
+    try:
+        return future.result(timeout=2 * timeout if timeout else None)
+    except FutureTimeout:
+        future.cancel()
+        return _timed_out(batch, timeout)
+
+
+def solve_stream(rows: Iterable[Row], executor: Executor, batch_size: int = 64,
+                 window: int = 8, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Solve problems in parallel batches, yielding results in input order.
+
+    At most `window` batches are in flight, so memory use does not grow
+    with the size of the input. Rows of a batch that runs past `timeout`
+    seconds are yielded as error results instead of stalling the run.
+    """
+    pending: Deque[Tuple[List[Row], Future]] = deque()
+    batch: List[Row] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            pending.append((batch, executor.submit(solve_batch, batch, timeout)))
+            batch = []
+            if len(pending) >= window:
+                yield from _collect(*pending.popleft(), timeout)
+    if batch:
+        pending.append((batch, executor.submit(solve_batch, batch, timeout)))
+    while pending:
+        yield from _collect(*pending.popleft(), timeout)
+
+
+class Checkpoint:
+    """
+    Progress of a run: rows written and the output size at that point.
+
+    Saved atomically next to the output, so an interrupted run can cut the
+    output back to the last checkpoint and continue from the next row.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Tuple[int, int]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return data["rows"], data["offset"]
+        except FileNotFoundError:
+            return 0, 0
+
+    def save(self, rows: int, offset: int):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"rows": rows, "offset": offset, "saved_at": time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_worksheet(input_path: str, output_path: str, field: Optional[str] = None,
+                  workers: Optional[int] = None, batch_size: int = 64, checkpoint_every: float = 10.0,
+                  resume: bool = True, timeout: Optional[float] = 300.0,
+                  on_progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+    """
+    Solve every problem in a file, appending results to a JSONL file.
+
+    Args:
+        input_path: JSONL, CSV or text file of problems
+        output_path: JSONL file receiving one result per problem, in input order
+        field: Column holding the problem text
+        workers: Worker processes (default: CPU count; 0 solves in this process)
+        batch_size: Problems sent to a worker at a time
+        checkpoint_every: Seconds between checkpoints
+        resume: Continue from the checkpoint of an interrupted run
+        timeout: Seconds a batch may take before its unfinished rows are
+            recorded as errors (None for no limit)
+        on_progress: Called with (rows done, rows per second) at each checkpoint
+
+    Returns:
+        Summary with the number of rows solved, failed and skipped
+    """
+    checkpoint = Checkpoint(f"{output_path}.checkpoint")
+    done, offset = checkpoint.load() if resume else (0, 0)
+    skipped = done
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers else _Inline()
+
+    started = time.perf_counter()
+    solved = unsolved = 0
+    with open(output_path, "ab") as output:
+        # Drop anything written after the last checkpoint; those rows run again
+        output.truncate(offset)
+        output.seek(offset)
+        last_checkpoint = time.monotonic()
+        try:
+            rows = read_problems(input_path, field, skip=done)
+            for result in solve_stream(rows, executor, batch_size, window=max(2, workers * 2),
+                                       timeout=timeout):
+                output.write(json.dumps(result, default=str).encode() + b"\n")
+                done += 1
+                if "error" in result or not result.get("solution"):
+                    unsolved += 1
+                else:
+                    solved += 1
+                if time.monotonic() - last_checkpoint >= checkpoint_every:
+                    output.flush()
+                    os.fsync(output.fileno())
+                    checkpoint.save(done, output.tell())
+                    last_checkpoint = time.monotonic()
+                    if on_progress is not None:
+                        on_progress(done, (done - skipped) / (time.perf_counter() - started))
+        finally:
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint.save(done, output.tell())
+            executor.shutdown(cancel_futures=True)
+
+    checkpoint.clear()
+    return {
+        "rows": done,
+        "resumed_from": skipped,
+        "solved": solved,
+        "unsolved": unsolved,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
@@ -0,0 +1,173 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import json
+from functools import partial
+from pydantic import BaseModel
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from .generation import CancelToken, GenerationCancelled
+from .rate_limit import RateLimiter
+from .responses import dumps
+
+MAX_IN_FLIGHT = 8
+
+
+class GatewayRequest:
+    """
+    One request multiplexed over a gateway connection.
+
+    Handlers send intermediate events with emit() (or emit_threadsafe()
+    from worker threads) and return the final payload.
+    """
+
+    def __init__(self, request_id: Any, connection: "_Connection"):
+        self.id = request_id
+        self.cancel = CancelToken()
+        self._connection = connection
+
+    def bind(self, cancel: CancelToken) -> CancelToken:
+        """
+        Make `cancel` (e.g. a profile's token with its deadline) the one a
+        cancel message or disconnect will trip.
+        """
+        if self.cancel.cancelled:
+            cancel.cancel(self.cancel.reason)
+        self.cancel = cancel
+        return cancel
+
+    def emit(self, event: str, **data):
+        self._connection.send({"id": self.id, "event": event, **data})
+
+    def emit_threadsafe(self, event: str, **data):
+        self._connection.loop.call_soon_threadsafe(partial(self.emit, event, **data))
+
+
+Handler = Callable[[Dict[str, Any], GatewayRequest], Awaitable[Any]]
+
+
+class _Connection:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.loop = asyncio.get_running_loop()
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.requests: Dict[Any, GatewayRequest] = {}
+        self.tasks: Dict[Any, asyncio.Task] = {}
+
+    def send(self, frame: Dict[str, Any]):
+        self.outbox.put_nowait(frame)
+
+    async def write(self):
+        # The only task writing to the socket, so frames never interleave
+        while True:
+            frame = await self.outbox.get()
+            await self.websocket.send_text(dumps(frame).decode())
+
+
+class WebSocketGateway:
+    """
+    Serve chat, OCR and solve requests over one persistent WebSocket.
+
+    Client frames are JSON objects {"id": ..., "type": "<handler>", ...};
+    {"id": ..., "type": "cancel"} stops a request. The server answers with
+    {"id": ..., "event": ...} frames: any number of intermediate events
+    (e.g. "token"), then exactly one of "result", "error" or "cancelled".
+    Requests on one connection run concurrently.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, max_in_flight: int = MAX_IN_FLIGHT):
+        self.limiter = limiter
+        self.max_in_flight = max_in_flight
+        self.handlers: Dict[str, Handler] = {}
+
+    def handler(self, name: str) -> Callable[[Handler], Handler]:
+        """
+        Register an async handler(message, request) for frames of this type.
+        """
+        def register(func: Handler) -> Handler:
+            self.handlers[name] = func
+            return func
+        return register
+
+    async def serve(self, websocket: WebSocket):
+        await websocket.accept()
+        connection = _Connection(websocket)
+        client = self.limiter.client_key(websocket.scope) if self.limiter else None
+        writer = asyncio.create_task(connection.write())
+        try:
+            while True:
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                # receive_text() would fail with KeyError on a binary frame
+                if frame.get("text") is None:
+                    connection.send({"id": None, "event": "error", "error": "Expected a text frame"})
+                    continue
+                try:
+                    message = json.loads(frame["text"])
+                except json.JSONDecodeError:
+                    connection.send({"id": None, "event": "error", "error": "Invalid JSON"})
+                    continue
+                self._dispatch(connection, client, message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for request in connection.requests.values():
+                request.cancel.cancel("client disconnected")
+            for task in connection.tasks.values():
+                task.cancel()
+            writer.cancel()
+
+    def _dispatch(self, connection: _Connection, client: Optional[str], message: Any):
+        if not isinstance(message, dict):
+            connection.send({"id": None, "event": "error", "error": "Expected a JSON object"})
+            return
+        request_id = message.get("id")
+        kind = message.get("type")
+
+        if kind == "cancel":
+            request = connection.requests.get(request_id)
+            if request is not None:
+                request.cancel.cancel("cancelled by client")
+            return
+
+        error = None
+        if request_id is None or request_id in connection.requests:
+            error = "Every request needs a unique id"
+        elif kind not in self.handlers:
+            error = f"Unsupported request type: {kind}"
+        elif len(connection.requests) >= self.max_in_flight:
+            error = f"Too many requests in flight (limit {self.max_in_flight})"
+        elif self.limiter is not None:
+            retry_after = self.limiter.acquire(client, self.limiter.cost("POST", f"/api/{kind}"))
+            if retry_after:
+                connection.send({"id": request_id, "event": "error", "error": "Rate limit exceeded",
+                                 "retry_after": round(retry_after, 2)})
+                return
+        if error:
+            connection.send({"id": request_id, "event": "error", "error": error})
+            return
+
+        request = GatewayRequest(request_id, connection)
+        connection.requests[request_id] = request
+        connection.tasks[request_id] = asyncio.create_task(
+            self._run(connection, self.handlers[kind], message, request)
+        )
+
+    async def _run(self, connection: _Connection, handler: Handler, message: Dict[str, Any],
+                   request: GatewayRequest):
+        try:
+            result = await handler(message, request)
+            if isinstance(result, BaseModel):
+                result = result.model_dump(exclude_none=True)
+            if request.cancel.cancelled:
+                request.emit("cancelled")
+            elif result and "error" in result:
+                request.emit("error", **result)
+            else:
+                request.emit("result", **(result or {}))
+        except GenerationCancelled:
+            request.emit("cancelled")
+        except Exception as e:
+            request.emit("error", error=str(e))
+        finally:
+            connection.requests.pop(request.id, None)
+            connection.tasks.pop(request.id, None)
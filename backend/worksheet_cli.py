@@ -0,0 +1,57 @@
+"""
+Solve a large file of problems offline, e.g. for grading.
+
+    python backend/worksheet_cli.py problems.jsonl -o results.jsonl
+
+Problems are streamed from the input and solved in parallel worker
+processes, and results are appended to the output in input order, so
+memory use stays flat however large the input is. Progress is
+checkpointed next to the output; running the same command again after
+an interruption continues where it stopped.
+"""
+import argparse
+import json
+import sys
+from concurrent.futures.process import BrokenProcessPool
+from utils.worksheet import run_worksheet
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Solve a JSONL, CSV or text file of problems")
+    parser.add_argument("input", help="JSONL, CSV or text file (one problem per line)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file for the results")
+    parser.add_argument("--field", help="Column with the problem text (default: problem, question or text)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count; 0 runs in this process)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Problems per worker task")
+    parser.add_argument("--checkpoint-every", type=float, default=10.0, help="Seconds between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    parser.add_argument("--timeout", type=float, default=300.0,
+                        help="Seconds a batch may take before its unfinished problems are marked as errors")
+    args = parser.parse_args(argv)
+
+    def report(rows: int, rate: float):
+        print(f"{rows} problems done ({rate:.0f}/s)", file=sys.stderr)
+
+    try:
+        summary = run_worksheet(args.input, args.output, field=args.field, workers=args.workers,
+                                batch_size=args.batch_size, checkpoint_every=args.checkpoint_every,
+                                resume=not args.restart, timeout=args.timeout or None,
+                                on_progress=report)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        return 130
+    except BrokenProcessPool as e:
+        # A worker was killed (e.g. out of memory); progress up to the checkpoint is kept
+        print(f"Worksheet run failed: a worker process died ({str(e)}); "
+              "run the same command again to resume", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Worksheet run failed: {str(e)}", file=sys.stderr)
+        return 1
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,8 +13,8 @@ use tauri::{Manager, RunEvent, WindowEvent, Window};
 use std::sync::{Arc, Mutex};
 
 #[tauri::command]
-async fn chat(message: String) -> Result<String, String> {
-    let client = reqwest::Client::new();
+async fn chat(message: String, client: tauri::State<'_, reqwest::Client>) -> Result<String, String> {
+    // The managed client keeps its connection to the backend alive between messages
     let res = client
         .post("http://localhost:8000/api/chat")
         .json(&json!({ "message": message }))
@@ -27,7 +27,11 @@ async fn chat(message: String) -> Result<String, String> {
     }
 
     let json: serde_json::Value = res.json().await.map_err(|e| e.to_string())?;
-    let response = json.get("response").cloned().unwrap_or(json!("No response found")).to_string();
+    let response = json
+        .get("response")
+        .and_then(|value| value.as_str())
+        .unwrap_or("No response found")
+        .to_string();
     Ok(response)
 }
 
@@ -62,11 +66,26 @@ fn start_ollama() -> Option<std::process::Child> {
         .stderr(Stdio::null())
         .spawn()
         .expect("Failed to start Ollama server");
-    // Give Ollama a few seconds to start
-    thread::sleep(Duration::from_secs(5));
+    wait_for_ollama_ready();
     Some(ollama_process)
 }
 
+fn wait_for_ollama_ready() -> bool {
+    // Poll the Ollama API instead of sleeping a fixed time; the backend
+    // preloads the model itself once it starts
+    for _ in 0..60 {
+        if let Ok(resp) = reqwest::blocking::get("http://localhost:11434/api/tags") {
+            if resp.status().is_success() {
+                println!("Ollama is ready.");
+                return true;
+            }
+        }
+        thread::sleep(Duration::from_millis(250));
+    }
+    println!("Ollama did not become ready within 15 seconds.");
+    false
+}
+
 fn start_backend() -> std::process::Child {
     // Get the app directory
     let exe_path = std::env::current_exe()
@@ -131,7 +150,14 @@ fn main() {
     let ollama_handle_clone = ollama_handle.clone();
     let backend_handle_clone = backend_handle.clone();
 
+    let http_client = reqwest::Client::builder()
+        .pool_idle_timeout(Duration::from_secs(90))
+        .tcp_keepalive(Duration::from_secs(60))
+        .build()
+        .expect("Failed to build HTTP client");
+
     tauri::Builder::default()
+        .manage(http_client)
         .invoke_handler(tauri::generate_handler![chat, set_glass_mode])
         .setup(|app| {
             let app_handle = app.handle();
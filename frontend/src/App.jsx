@@ -13,6 +13,7 @@ import {
 } from '@heroicons/react/24/outline';
 import 'katex/dist/katex.min.css';
 import { InlineMath, BlockMath } from 'react-katex';
+import { createGateway } from './gateway';
 
 function VeswoMessage({ content }) {
   // Try to render LaTeX if present, fallback to plain text
@@ -58,6 +59,9 @@ function App() {
   const [darkMode, setDarkMode] = useState(false);
   const [glassMode, setGlassMode] = useState(false);
   const chatContainerRef = useRef(null);
+  // Server-side conversation session, so history does not have to be resent
+  const sessionIdRef = useRef(crypto.randomUUID());
+  const gatewayRef = useRef(null);
 
   useEffect(() => {
     // Listen for global shortcut
@@ -70,7 +74,12 @@ function App() {
     return () => { unlisten.then(fn => fn()); };
   }, []);
 
-  useEffect(() => { checkGemmaStatus(); }, []);
+  useEffect(() => subscribeToStatus(), []);
+  useEffect(() => {
+    // One persistent connection for all chat requests
+    gatewayRef.current = createGateway('ws://localhost:8000/ws');
+    return () => gatewayRef.current.close();
+  }, []);
   useEffect(() => {
     if (darkMode) {
       document.documentElement.classList.add('dark');
@@ -88,20 +97,21 @@ function App() {
     invoke('set_glass_mode', { enable: glassMode });
   }, [glassMode]);
 
-  const checkGemmaStatus = async () => {
-    try {
-      const response = await fetch('http://localhost:8000/api/status');
-      const data = await response.json();
+  const subscribeToStatus = () => {
+    // The backend pushes status changes; EventSource reconnects on its own
+    const source = new EventSource('http://localhost:8000/api/status/stream');
+    source.addEventListener('status', (event) => {
+      const data = JSON.parse(event.data);
       if (data.gemma_ready) {
         setGemmaStatus({ ready: true, loading: false, error: null });
       } else {
-        setGemmaStatus({ ready: false, loading: true, error: data.error });
-        setTimeout(checkGemmaStatus, 2000);
+        setGemmaStatus({ ready: false, loading: true, error: data.model.last_error || `Model is ${data.model.state}` });
       }
-    } catch (error) {
+    });
+    source.onerror = () => {
       setGemmaStatus({ ready: false, loading: true, error: 'Cannot connect to backend' });
-      setTimeout(checkGemmaStatus, 2000);
-    }
+    };
+    return () => source.close();
   };
 
   const handleSubmit = async (e) => {
@@ -110,17 +120,32 @@ function App() {
     const userMessage = input.trim();
     setInput('');
     setIsProcessing(true);
-    setMessages(prev => [...prev, { role: 'user', content: userMessage }]);
+    setMessages(prev => [...prev, { role: 'user', content: userMessage }, { role: 'assistant', content: '' }]);
+    const updateReply = (reply) => setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], ...reply }]);
+    const body = { message: userMessage, session_id: sessionIdRef.current };
     try {
-      const response = await fetch('http://localhost:8000/api/chat', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: userMessage })
-      });
-      const data = await response.json();
-      setMessages(prev => [...prev, { role: 'assistant', content: data.response, method: data.method }]);
+      let data;
+      try {
+        // Stream tokens over the gateway as they are generated
+        let streamed = '';
+        data = await gatewayRef.current.request('chat', body, (frame) => {
+          if (frame.event === 'token') {
+            streamed += frame.token;
+            updateReply({ content: streamed });
+          }
+        }).promise;
+      } catch (error) {
+        if (error.message !== 'Gateway not connected') throw error;
+        const response = await fetch('http://localhost:8000/api/chat', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(body)
+        });
+        data = await response.json();
+      }
+      updateReply({ content: data.response, method: data.method });
     } catch (error) {
-      setMessages(prev => [...prev, { role: 'assistant', content: 'Sorry, I encountered an error. Please try again.' }]);
+      updateReply({ content: 'Sorry, I encountered an error. Please try again.' });
     } finally {
       setIsProcessing(false);
     }
@@ -0,0 +1,51 @@
+// Client for the backend's /ws gateway: one persistent WebSocket carrying
+// many concurrent requests, matched to their responses by id.
+export function createGateway(url) {
+  let socket = null;
+  let closed = false;
+  let nextId = 1;
+  const pending = new Map();
+
+  const connect = () => {
+    socket = new WebSocket(url);
+    socket.onmessage = (message) => {
+      const frame = JSON.parse(message.data);
+      const request = pending.get(frame.id);
+      if (!request) return;
+      if (frame.event === 'result') {
+        pending.delete(frame.id);
+        request.resolve(frame);
+      } else if (frame.event === 'error' || frame.event === 'cancelled') {
+        pending.delete(frame.id);
+        request.reject(new Error(frame.error || 'Request cancelled'));
+      } else if (request.onEvent) {
+        request.onEvent(frame);
+      }
+    };
+    socket.onclose = () => {
+      for (const request of pending.values()) request.reject(new Error('Connection closed'));
+      pending.clear();
+      if (!closed) setTimeout(connect, 1000);
+    };
+  };
+  connect();
+
+  return {
+    // Resolves with the "result" frame; onEvent receives "token"/"line" frames
+    request(type, payload, onEvent) {
+      if (!socket || socket.readyState !== WebSocket.OPEN) {
+        return { promise: Promise.reject(new Error('Gateway not connected')), cancel: () => {} };
+      }
+      const id = nextId++;
+      const promise = new Promise((resolve, reject) => {
+        pending.set(id, { resolve, reject, onEvent });
+      });
+      socket.send(JSON.stringify({ ...payload, id, type }));
+      return { promise, cancel: () => socket.send(JSON.stringify({ id, type: 'cancel' })) };
+    },
+    close() {
+      closed = true;
+      socket.close();
+    },
+  };
+}
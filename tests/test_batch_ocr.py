@@ -0,0 +1,49 @@
+import unittest
+from io import BytesIO
+from PIL import Image
+from backend.utils.batch_ocr import BatchOCR, split_document
+from backend.utils.ocr_cache import OCRCache
+from backend.utils.screen_recognizer import ScreenRecognizer
+from backend.utils.capture_backends import FrameBufferCaptureBackend
+
+def encode(image, **kwargs):
+    buffer = BytesIO()
+    image.save(buffer, **kwargs)
+    return buffer.getvalue()
+
+class TestBatchOCR(unittest.TestCase):
+    def setUp(self):
+        self.recognizer = ScreenRecognizer(capture_backend=FrameBufferCaptureBackend())
+        self.batch = BatchOCR(self.recognizer, max_workers=2)
+    
+    def tearDown(self):
+        self.batch.shutdown()
+    
+    def test_split_multi_frame_tiff(self):
+        """Test multi-frame documents are split into one image per page"""
+        frames = [Image.new("RGB", (20, 20), color) for color in ("red", "green", "blue")]
+        tiff = encode(frames[0], format="TIFF", save_all=True, append_images=frames[1:])
+        
+        pages = split_document(tiff)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(Image.open(BytesIO(pages[2])).getpixel((0, 0)), (0, 0, 255))
+        
+        single = encode(frames[0], format="PNG")
+        self.assertEqual(split_document(single), [single])
+    
+    def test_results_per_page(self):
+        """Test every page gets a result with its timing"""
+        pages = [encode(Image.new("RGB", (10, 10), (i, i, i)), format="PNG") for i in range(4)]
+        for i, page in enumerate(pages[:3]):
+            self.recognizer.ocr_cache.put(OCRCache.make_key(page, self.recognizer.ocr_config), f"page {i}")
+        pages[3] = b"not an image"
+        
+        results = sorted(self.batch.run(pages), key=lambda result: result["page"])
+        
+        self.assertEqual([result.get("text") for result in results[:3]], ["page 0", "page 1", "page 2"])
+        self.assertIn("error", results[3])
+        for result in results:
+            self.assertIn("elapsed_ms", result)
+
+if __name__ == '__main__':
+    unittest.main()
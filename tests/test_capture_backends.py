@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+from backend.utils.capture_backends import (
+    FrameBufferCaptureBackend,
+    bgra_to_rgb,
+    get_capture_backend,
+)
+from backend.utils.screen_recognizer import ScreenRecognizer
+
+class TestCaptureBackends(unittest.TestCase):
+    def setUp(self):
+        frame = np.zeros((120, 200, 3), dtype=np.uint8)
+        frame[10:20, 30:40] = (255, 0, 0)
+        self.backend = FrameBufferCaptureBackend(frame)
+    
+    def test_framebuffer_region(self):
+        """Test region captures from the virtual framebuffer"""
+        capture = self.backend.grab((30, 10, 10, 10))
+        
+        self.assertEqual(capture.shape, (10, 10, 3))
+        self.assertTrue((capture == (255, 0, 0)).all())
+        self.assertEqual(self.backend.screen_size(), (200, 120))
+    
+    def test_bgra_conversion_is_zero_copy(self):
+        """Test BGRA buffers are viewed as RGB without copying"""
+        raw = bytearray([1, 2, 3, 255] * 6)
+        rgb = bgra_to_rgb(raw, 3, 2)
+        
+        self.assertEqual(rgb.shape, (2, 3, 3))
+        self.assertEqual(tuple(rgb[0, 0]), (3, 2, 1))
+        self.assertTrue(np.shares_memory(rgb, np.frombuffer(raw, dtype=np.uint8)))
+    
+    def test_recognizer_uses_backend(self):
+        """Test ScreenRecognizer captures through its backend"""
+        recognizer = ScreenRecognizer(capture_backend=self.backend)
+        capture = recognizer.capture_screen((0, 0, 50, 40))
+        
+        self.assertEqual(capture.shape, (40, 50, 3))
+    
+    def test_unknown_backend(self):
+        """Test selecting an unsupported backend fails"""
+        with self.assertRaises(ValueError):
+            get_capture_backend("nonexistent")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from backend.utils.cascade import ModelCascade, escalation_reason
+from backend.utils.generation import get_profile
+
+class FakeModels:
+    """Answers from canned replies per model and records every call"""
+    def __init__(self, small, large="A careful, complete answer from the large model."):
+        self.replies = {"small": small, "large": large}
+        self.calls = []
+
+    def __call__(self, prompt, model=None, profile=None, cancel=None, on_token=None):
+        self.calls.append((model, prompt))
+        reply = self.replies[model]
+        text = reply(prompt) if callable(reply) else reply
+        if on_token is not None:
+            on_token(text)
+        return {"response": text, "done_reason": "stop"}
+
+class TestModelCascade(unittest.TestCase):
+    def setUp(self):
+        self.profile = get_profile("chat")
+
+    def make_cascade(self, models):
+        return ModelCascade(models, "small", "large")
+
+    def test_accepts_good_draft(self):
+        """Test a confident draft is returned without calling the large model"""
+        models = FakeModels("Paris is the capital of France.")
+        tokens = []
+        result = self.make_cascade(models).answer("What is the capital of France?", self.profile,
+                                                  self.profile.cancel_token(), tokens.append)
+
+        self.assertEqual(result, {"response": "Paris is the capital of France.", "model": "small"})
+        self.assertEqual([model for model, _ in models.calls], ["small"])
+        self.assertEqual(tokens, ["Paris is the capital of France."])
+
+    def test_escalates_weak_draft(self):
+        """Test an uncertain draft is redone by the large model and only its text streams"""
+        models = FakeModels("I'm not sure, maybe 42?")
+        cascade = self.make_cascade(models)
+        tokens = []
+        result = cascade.answer("What is the airspeed of a swallow?", self.profile,
+                                self.profile.cancel_token(), tokens.append)
+
+        self.assertEqual(result["model"], "large")
+        self.assertEqual(result["reason"], "uncertain")
+        self.assertEqual(tokens, [models.replies["large"]])
+        self.assertEqual(cascade.stats(), {"drafted": 1, "accepted": 0, "escalated": 1, "refined": 0})
+
+    def test_explicit_escalation_skips_draft(self):
+        """Test escalate=True goes straight to the large model"""
+        models = FakeModels("unused")
+        result = self.make_cascade(models).answer("Hi", self.profile, self.profile.cancel_token(),
+                                                  escalate=True)
+        self.assertEqual(result["reason"], "requested")
+        self.assertEqual([model for model, _ in models.calls], ["large"])
+
+    def test_escalation_heuristics(self):
+        """Test the draft checks flag empty, cut-off, looping and too-short answers"""
+        self.assertEqual(escalation_reason("Hi", "  "), "empty")
+        self.assertEqual(escalation_reason("Hi", "Hello", {"done_reason": "length"}), "truncated")
+        self.assertEqual(escalation_reason("Hi", "the cat sat " * 20), "repetitive")
+        self.assertEqual(escalation_reason("Explain photosynthesis", "Plants eat light."), "too_short")
+        self.assertIsNone(escalation_reason("Hi", "Hello! How can I help?"))
+
+    def test_essay_refines_key_sections(self):
+        """Test the small model drafts every section and the large one refines only key ones"""
+        draft = " ".join(f"word{i}" for i in range(40))
+        models = FakeModels(small=lambda prompt: draft, large="A refined section.")
+        sections = ["Introduction", "First point", "Second point", "Conclusion"]
+        finished = []
+        result = self.make_cascade(models).essay("Rivers", sections, 400, get_profile("essay"),
+                                                 get_profile("essay").cancel_token(),
+                                                 on_token=finished.append)
+
+        self.assertEqual([model for model, _ in models.calls],
+                         ["small", "large", "small", "small", "small", "large"])
+        self.assertEqual(result["drafted"], 4)
+        self.assertEqual(result["refined"], 2)
+        self.assertEqual(result["essay"].split("\n\n"),
+                         ["A refined section.", draft, draft, "A refined section."])
+        self.assertEqual("".join(finished), result["essay"])
+        # Later sections see the end of the essay so far
+        self.assertIn("ends with: ...A refined section.", models.calls[2][1])
+
+if __name__ == '__main__':
+    unittest.main()
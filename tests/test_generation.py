@@ -0,0 +1,46 @@
+import unittest
+from backend.utils.generation import (
+    DEFAULT_NUM_CTX,
+    MAX_NUM_PREDICT,
+    CancelToken,
+    GenerationCancelled,
+    get_profile,
+)
+
+class TestGenerationProfiles(unittest.TestCase):
+    def test_profiles_have_budgets(self):
+        """Test every endpoint profile bounds its output"""
+        for name in ["chat", "essay", "code", "solve"]:
+            options = get_profile(name).ollama_options("hello")
+            self.assertLessEqual(options["num_predict"], MAX_NUM_PREDICT)
+            self.assertEqual(options["num_ctx"], DEFAULT_NUM_CTX)
+    
+    def test_overrides_are_clamped(self):
+        """Test request overrides are validated and clamped"""
+        profile = get_profile("chat", {"num_predict": 10 ** 6, "stop": "###", "temperature": 9})
+        self.assertEqual(profile.num_predict, MAX_NUM_PREDICT)
+        self.assertEqual(profile.stop, ["###"])
+        self.assertEqual(profile.temperature, 2.0)
+        
+        with self.assertRaises(ValueError):
+            get_profile("chat", {"seed": 1})
+        with self.assertRaises(ValueError):
+            get_profile("poem")
+    
+    def test_context_window_grows_for_long_prompts(self):
+        """Test num_ctx grows only when the prompt would not fit"""
+        options = get_profile("chat").ollama_options("word " * 20000)
+        self.assertGreater(options["num_ctx"], DEFAULT_NUM_CTX)
+    
+    def test_cancel_token(self):
+        """Test cancellation and deadlines"""
+        token = CancelToken(deadline=0.0001)
+        self.assertFalse(token.cancelled)
+        while not token.expired:
+            pass
+        token.cancel("client disconnected")
+        with self.assertRaises(GenerationCancelled):
+            token.raise_if_cancelled()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from backend.utils.intent_router import IntentRouter
+
+class TestIntentRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = IntentRouter()
+    
+    def test_arithmetic(self):
+        """Test arithmetic is evaluated locally"""
+        answer = self.router.answer("2+3")
+        self.assertEqual(answer.response, "2+3 = 5")
+        self.assertEqual(answer.method, "Direct Evaluation")
+        
+        self.assertEqual(self.router.answer("What is 2^10?").response, "2^10 = 1024")
+        self.assertIsNone(self.router.answer("1/0"))
+        self.assertIsNone(self.router.answer("9**99999"))
+        # Every exponent is small but the result has tens of thousands of digits
+        self.assertIsNone(self.router.answer("((9^64)^64)^2"))
+        # Not printed as a bare Python complex or inf
+        self.assertIsNone(self.router.answer("(-8)^(1/3)"))
+        self.assertIsNone(self.router.answer("99.0^60 * 99.0^60 * 99.0^60"))
+    
+    def test_equations(self):
+        """Test single-unknown equations go to the problem solver"""
+        answer = self.router.answer("Solve for x: 2x + 5 = 13")
+        self.assertEqual(answer.response, "x = 4")
+        self.assertEqual(answer.method, "Problem Solver")
+        self.assertEqual(self.router.answer("3(y-1)=9").response, "y = 4")
+        # sympy turns x/0 into zoo*x, which must not "solve" to x = 0
+        self.assertIsNone(self.router.answer("solve x/0=1"))
+    
+    def test_open_ended_prompts_fall_through(self):
+        """Test everything else is left to the LLM"""
+        for prompt in ["hello", "Explain 2+2 to a child", "exit()=1", "x.n()=1"]:
+            self.assertIsNone(self.router.answer(prompt))
+
+if __name__ == '__main__':
+    unittest.main()
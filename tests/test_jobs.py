@@ -0,0 +1,126 @@
+import os
+import tempfile
+import time
+import unittest
+from backend.utils.jobs import JobQueue
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "jobs.sqlite3")
+        self.queue = self.make_queue()
+
+    def tearDown(self):
+        self.queue.stop()
+        self.queue.close()
+        self.tmpdir.cleanup()
+
+    def make_queue(self, **kwargs):
+        queue = JobQueue(self.path, workers=1, heartbeat=0.05, **kwargs)
+
+        @queue.handler("add")
+        def add(job):
+            job.checkpoint()
+            job.progress(1, 1)
+            return {"sum": job.payload["a"] + job.payload["b"]}
+
+        @queue.handler("generate", preemptible=True)
+        def generate(job):
+            deadline = time.time() + job.payload["seconds"]
+            while time.time() < deadline:
+                job.cancel.raise_if_cancelled()
+                time.sleep(0.01)
+            return {"attempt": job.preemptions}
+
+        return queue
+
+    def wait_for(self, job_id, state, timeout=5.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            record = self.queue.get(job_id)
+            if record["state"] == state:
+                return record
+            time.sleep(0.01)
+        self.fail(f"Job {job_id} never reached {state}: {record}")
+
+    def test_runs_jobs_in_priority_order(self):
+        """Test high priority jobs are claimed before older normal ones"""
+        normal = self.queue.submit("add", {"a": 1, "b": 2})
+        high = self.queue.submit("add", {"a": 3, "b": 4}, priority="high")
+
+        self.assertEqual(self.queue.claim().id, high["job_id"])
+        self.assertEqual(self.queue.claim().id, normal["job_id"])
+        self.assertIsNone(self.queue.claim())
+
+    def test_job_result_and_progress(self):
+        """Test a worker runs a job and stores its result"""
+        self.queue.start()
+        job = self.queue.submit("add", {"a": 1, "b": 2})
+        record = self.wait_for(job["job_id"], "done")
+
+        self.assertEqual(record["result"], {"sum": 3})
+        self.assertEqual((record["done"], record["total"]), (1, 1))
+
+    def test_rejects_unknown_types_and_priorities(self):
+        """Test invalid submissions raise ValueError"""
+        with self.assertRaises(ValueError):
+            self.queue.submit("missing", {})
+        with self.assertRaises(ValueError):
+            self.queue.submit("add", {}, priority="urgent")
+
+    def test_cancel(self):
+        """Test queued and running jobs can be cancelled"""
+        queued = self.queue.submit("add", {"a": 1, "b": 2})
+        self.assertTrue(self.queue.cancel(queued["job_id"]))
+        self.assertEqual(self.queue.get(queued["job_id"])["state"], "cancelled")
+        self.assertFalse(self.queue.cancel(queued["job_id"]))
+
+        self.queue.start()
+        running = self.queue.submit("generate", {"seconds": 10})
+        self.wait_for(running["job_id"], "running")
+        self.assertTrue(self.queue.cancel(running["job_id"]))
+        self.wait_for(running["job_id"], "cancelled")
+
+    def test_interactive_requests_preempt_jobs(self):
+        """Test a preemptible job is requeued and rerun after an interactive request"""
+        self.queue.start()
+        job = self.queue.submit("generate", {"seconds": 0.3})
+        self.wait_for(job["job_id"], "running")
+
+        with self.queue.interactive():
+            self.wait_for(job["job_id"], "queued")
+            time.sleep(0.2)
+            # Nothing starts while the interactive request is running
+            self.assertEqual(self.queue.get(job["job_id"])["state"], "queued")
+
+        record = self.wait_for(job["job_id"], "done")
+        self.assertEqual(record["preemptions"], 1)
+        self.assertEqual(record["result"], {"attempt": 1})
+
+    def test_cancel_wins_over_preemption(self):
+        """Test a job cancelled after being preempted is cancelled, not requeued"""
+        job = self.queue.submit("generate", {"seconds": 10})
+        claimed = self.queue.claim()
+        with self.queue.interactive():
+            self.assertEqual(claimed.cancel.reason, "preempted by interactive request")
+            self.assertTrue(self.queue.cancel(job["job_id"]))
+            self.queue.run(claimed)
+
+        record = self.queue.get(job["job_id"])
+        self.assertEqual(record["state"], "cancelled")
+        self.assertEqual(record["error"], "cancelled by client")
+
+    def test_jobs_survive_restart(self):
+        """Test queued jobs and jobs of a dead worker run after a restart"""
+        queued = self.queue.submit("add", {"a": 1, "b": 2})
+        orphan = self.queue.submit("add", {"a": 2, "b": 2}, priority="high")
+        self.queue.claim()  # Claimed by a worker that then dies
+        self.queue.close()
+
+        self.queue = self.make_queue(stale_after=0.1)
+        self.queue.start()
+        self.assertEqual(self.wait_for(queued["job_id"], "done")["result"], {"sum": 3})
+        self.assertEqual(self.wait_for(orphan["job_id"], "done")["result"], {"sum": 4})
+
+if __name__ == '__main__':
+    unittest.main()
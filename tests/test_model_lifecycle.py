@@ -0,0 +1,36 @@
+import datetime
+import unittest
+from backend.utils.model_lifecycle import ModelLifecycle
+from backend.utils.model_router import ModelRouter
+
+class TestModelLifecycle(unittest.TestCase):
+    def setUp(self):
+        router = ModelRouter(["http://127.0.0.1:1"])
+        self.lifecycle = ModelLifecycle(router, ["gemma"], keep_alive="-1",
+                                        idle_keep_alive="5m", active_hours=(7, 23))
+    
+    def test_keep_alive_follows_active_hours(self):
+        """Test models are pinned during active hours only"""
+        self.assertEqual(self.lifecycle.keep_alive_value(datetime.datetime(2024, 1, 1, 9)), -1)
+        self.assertEqual(self.lifecycle.keep_alive_value(datetime.datetime(2024, 1, 1, 2)), "5m")
+        
+        self.lifecycle.active_hours = (22, 6)
+        self.assertTrue(self.lifecycle.is_active_hours(datetime.datetime(2024, 1, 1, 23)))
+        self.assertFalse(self.lifecycle.is_active_hours(datetime.datetime(2024, 1, 1, 12)))
+    
+    def test_preload_failure_reports_error(self):
+        """Test an unreachable node leaves the model in the error state"""
+        status = self.lifecycle.preload()
+        
+        self.assertEqual(status["state"], ModelLifecycle.ERROR)
+        self.assertFalse(self.lifecycle.ready)
+        self.assertIn("gemma", status["last_error"])
+    
+    def test_loaded_model_names(self):
+        """Test tagged names reported by /api/ps match untagged models"""
+        running = {"gemma:latest": "2030-01-01T00:00:00Z"}
+        self.assertEqual(self.lifecycle._find_loaded("gemma", running)["name"], "gemma:latest")
+        self.assertIsNone(self.lifecycle._find_loaded("gemma:2b", running))
+
+if __name__ == '__main__':
+    unittest.main()
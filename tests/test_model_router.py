@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from backend.utils.generation import CancelToken, GenerationTimeout
+from backend.utils.model_router import ModelRouter, normalize_backend_url
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if payload.get("prompt") == "slow prefill":
+            time.sleep(0.5)
+        if self.path == "/api/embed":
+            body = json.dumps({"embeddings": [[len(text), 1.0] for text in payload["input"]]}).encode()
+        else:
+            body = json.dumps({"response": f"{payload['model']}:{payload['prompt']}", "context": [1, 2], "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+    
+    def log_message(self, *args):
+        pass
+
+class FailingOllamaHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = b'{"error": "out of memory"}' * 100
+        self.send_response(500)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+class TestModelRouter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.failing = HTTPServer(("127.0.0.1", 0), FailingOllamaHandler)
+        cls.failing_url = f"http://127.0.0.1:{cls.failing.server_port}"
+        for server in (cls.server, cls.failing):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.failing.shutdown()
+    
+    def test_normalize_url(self):
+        """Test generate URLs are reduced to the node base URL"""
+        self.assertEqual(normalize_backend_url("http://host:11434/api/generate"), "http://host:11434")
+    
+    def test_failover_and_ejection(self):
+        """Test requests are retried on a healthy node and dead nodes ejected"""
+        router = ModelRouter(["http://127.0.0.1:1", self.url], eject_after=1)
+        for _ in range(3):
+            data, backend = router.generate(lambda b: {"model": "gemma", "prompt": "hi", "stream": False})
+            self.assertEqual(data["response"], "gemma:hi")
+            self.assertEqual(backend.url, self.url)
+        
+        dead = router.get_backend("http://127.0.0.1:1")
+        self.assertFalse(dead.status()["healthy"])
+        self.assertEqual(router.get_backend(self.url).outstanding, 0)
+    
+    def test_server_errors_are_closed_before_retrying(self):
+        """Test a 5xx response is closed, returning its connection, before failing over"""
+        router = ModelRouter([self.failing_url, self.url], eject_after=1)
+        failing = router.get_backend(self.failing_url)
+        responses = []
+        post = failing.http.post
+        failing.http.post = lambda *args, **kwargs: responses.append(post(*args, **kwargs)) or responses[-1]
+
+        data, backend = router.generate(lambda b: {"model": "gemma", "prompt": "hi"},
+                                        prefer=self.failing_url)
+        self.assertEqual(backend.url, self.url)
+        self.assertEqual(len(responses), 1)
+        self.assertTrue(responses[0].raw.closed)
+    
+    def test_deadline_before_first_byte_keeps_node_healthy(self):
+        """Test a deadline passing during a slow prefill times out without ejecting the node"""
+        router = ModelRouter([self.url], eject_after=1)
+        with self.assertRaises(GenerationTimeout):
+            router.generate(lambda b: {"model": "gemma", "prompt": "slow prefill"}, cancel=CancelToken(0.2))
+        time.sleep(0.4)  # Let the slow request finish on the single-threaded fake server
+
+        backend = router.get_backend(self.url)
+        self.assertTrue(backend.status()["healthy"])
+        self.assertEqual(backend.outstanding, 0)
+
+    def test_cheap_prompts_use_small_model(self):
+        """Test short simple prompts are routed to the small model"""
+        router = ModelRouter([self.url], model="gemma", small_model="gemma:2b")
+        self.assertEqual(router.select_model("hi there"), "gemma:2b")
+        self.assertEqual(router.select_model("Explain photosynthesis"), "gemma")
+
+    def test_embed(self):
+        """Test embeddings are fetched in one batch, failing over like generation"""
+        router = ModelRouter(["http://127.0.0.1:1", self.url], eject_after=1)
+        self.assertEqual(router.embed(["a", "abc"], "nomic-embed-text"), [[1, 1.0], [3, 1.0]])
+        self.assertEqual(router.outstanding(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
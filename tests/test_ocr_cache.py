@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from backend.utils.ocr_cache import OCRCache
+from backend.utils.shared_store import SharedStore
+from backend.utils.screen_recognizer import ScreenRecognizer
+from backend.utils.capture_backends import FrameBufferCaptureBackend
+
+class TestOCRCache(unittest.TestCase):
+    def setUp(self):
+        self.config = {'lang': 'eng', 'config': '--psm 6'}
+    
+    def test_key_depends_on_content_and_config(self):
+        """Test keys change with image content, shape and OCR settings"""
+        image = np.zeros((10, 20, 3), dtype=np.uint8)
+        key = OCRCache.make_key(image, self.config)
+        
+        self.assertEqual(key, OCRCache.make_key(image.copy(), self.config))
+        self.assertNotEqual(key, OCRCache.make_key(image.reshape(20, 10, 3), self.config))
+        self.assertNotEqual(key, OCRCache.make_key(image, {'lang': 'deu', 'config': '--psm 6'}))
+        self.assertNotEqual(key, OCRCache.make_key(b"png bytes", self.config))
+    
+    def test_lru_eviction_by_memory(self):
+        """Test the least recently used entries are evicted past the byte budget"""
+        cache = OCRCache(max_bytes=600)
+        cache.put("a", "x" * 100)
+        cache.put("b", "y" * 100)
+        cache.get("a")
+        cache.put("c", "z" * 200)
+        
+        self.assertEqual(cache.get("a"), "x" * 100)
+        self.assertIsNone(cache.get("b"))
+        self.assertLessEqual(cache.stats()["bytes"], 600)
+    
+    def test_persistent_store(self):
+        """Test results survive in the persistent store"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SharedStore(os.path.join(tmpdir, "cache.sqlite3"))
+            OCRCache(store=store).put("key", "hello")
+            
+            self.assertEqual(OCRCache(store=store).get("key"), "hello")
+            store.close()
+    
+    def test_persisted_results_expire(self):
+        """Test results in the persistent store are dropped after the TTL"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SharedStore(os.path.join(tmpdir, "cache.sqlite3"))
+            OCRCache(store=store, ttl=0.05).put("key", "private text")
+            time.sleep(0.1)
+            
+            self.assertIsNone(OCRCache(store=store).get("key"))
+            store.close()
+    
+    def test_recognizer_uses_cache(self):
+        """Test extract_text answers repeated images from the cache"""
+        image = np.full((40, 60, 3), 255, dtype=np.uint8)
+        recognizer = ScreenRecognizer(capture_backend=FrameBufferCaptureBackend(image))
+        recognizer.ocr_cache.put(OCRCache.make_key(image, recognizer.ocr_config), "cached text")
+        
+        self.assertEqual(recognizer.extract_text(image), "cached text")
+        self.assertEqual(recognizer.ocr_cache.stats()["hits"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import sys
+import threading
+import time
+import types
+import unittest
+import numpy as np
+from PIL import Image
+from backend.utils.ocr_engine import (
+    OCREngine, PytesseractEngine, TesserocrEngine, get_ocr_engine, parse_tesseract_config
+)
+from backend.utils.ocr_cache import OCRCache
+from backend.utils.screen_recognizer import ScreenRecognizer
+from backend.utils.capture_backends import FrameBufferCaptureBackend
+
+class CountingEngine(OCREngine):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+
+    def image_to_string(self, image, lang="eng", config=""):
+        self.calls.append((image.size, lang, config))
+        return " recognized \n"
+
+    def close(self):
+        self.closed = True
+
+class FakeTessBaseAPI:
+    """Stands in for tesserocr.PyTessBaseAPI and records its lifecycle"""
+    created = []
+
+    def __init__(self, lang="eng", psm=None, oem=None, variables=None):
+        if lang == "broken":
+            raise RuntimeError("Failed to init API")
+        self.kwargs = {"lang": lang, "psm": psm, "oem": oem, "variables": variables}
+        self.ended = False
+        FakeTessBaseAPI.created.append(self)
+
+    def SetImage(self, image):
+        self.image = image
+
+    def GetUTF8Text(self):
+        assert not self.ended, "used after End()"
+        return f"text from {self.kwargs['lang']}"
+
+    def End(self):
+        self.ended = True
+
+class TestTesserocrEngine(unittest.TestCase):
+    def setUp(self):
+        FakeTessBaseAPI.created = []
+        previous = sys.modules.get("tesserocr")
+        sys.modules["tesserocr"] = types.SimpleNamespace(PyTessBaseAPI=FakeTessBaseAPI)
+        self.addCleanup(self.restore_module, previous)
+        self.engine = TesserocrEngine(pool_size=1)
+        self.image = Image.new("RGB", (20, 10))
+
+    @staticmethod
+    def restore_module(previous):
+        if previous is None:
+            sys.modules.pop("tesserocr", None)
+        else:
+            sys.modules["tesserocr"] = previous
+
+    def test_handles_are_reused(self):
+        """Test repeated calls share one warm handle"""
+        self.assertEqual(self.engine.image_to_string(self.image), "text from eng")
+        self.engine.image_to_string(self.image)
+        self.assertEqual(len(FakeTessBaseAPI.created), 1)
+
+    def test_pools_are_per_configuration(self):
+        """Test each lang/psm/variables combination gets its own handle"""
+        self.engine.image_to_string(self.image, "eng", "--psm 6 -c a=1 -c b=2")
+        self.engine.image_to_string(self.image, "eng", "--psm 6 -c b=2 -c a=1")
+        self.engine.image_to_string(self.image, "deu", "--psm 6 -c a=1 -c b=2")
+        self.assertEqual([api.kwargs for api in FakeTessBaseAPI.created], [
+            {"lang": "eng", "psm": 6, "oem": None, "variables": {"a": "1", "b": "2"}},
+            {"lang": "deu", "psm": 6, "oem": None, "variables": {"a": "1", "b": "2"}},
+        ])
+
+    def test_full_pool_waits_for_a_handle(self):
+        """Test callers past pool_size wait for a released handle instead of creating one"""
+        key = self.engine._key("eng", "")
+        api = self.engine._acquire(key)
+        waiter = threading.Thread(target=self.engine.image_to_string, args=(self.image,))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertTrue(waiter.is_alive())
+
+        self.engine._release(key, api)
+        waiter.join(timeout=1)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(len(FakeTessBaseAPI.created), 1)
+
+    def test_failed_creation_frees_the_slot(self):
+        """Test a handle that fails to load does not count against the pool"""
+        with self.assertRaises(RuntimeError):
+            self.engine.image_to_string(self.image, "broken")
+        self.assertEqual(self.engine._created[self.engine._key("broken", "")], 0)
+
+    def test_close_ends_idle_handles_and_busy_ones_on_release(self):
+        """Test close() never ends a handle in use, and releasing it later is safe"""
+        self.engine.image_to_string(self.image, "deu")
+        key = self.engine._key("eng", "")
+        busy = self.engine._acquire(key)
+        idle = FakeTessBaseAPI.created[0]
+
+        self.engine.close()
+        self.assertTrue(idle.ended)
+        self.assertFalse(busy.ended)
+
+        self.engine._release(key, busy)
+        self.assertTrue(busy.ended)
+        # The engine keeps working with fresh handles
+        self.assertEqual(self.engine.image_to_string(self.image), "text from eng")
+        self.assertEqual(len(FakeTessBaseAPI.created), 3)
+
+    def test_close_wakes_waiting_threads(self):
+        """Test threads waiting on a full pool are not left hanging by close()"""
+        key = self.engine._key("eng", "")
+        busy = self.engine._acquire(key)
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(self.engine.image_to_string(self.image)))
+        waiter.start()
+        time.sleep(0.05)
+
+        self.engine.close()
+        waiter.join(timeout=1)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(results, ["text from eng"])
+        self.engine._release(key, busy)
+        self.assertTrue(busy.ended)
+
+class TestOCREngine(unittest.TestCase):
+    def test_parse_tesseract_config(self):
+        """Test psm, oem and -c variables are split out of a config string"""
+        psm, oem, variables = parse_tesseract_config(
+            "--psm 6 --oem 1 -c tessedit_char_whitelist=0123456789"
+        )
+        self.assertEqual(psm, 6)
+        self.assertEqual(oem, 1)
+        self.assertEqual(variables, {"tessedit_char_whitelist": "0123456789"})
+        self.assertEqual(parse_tesseract_config(""), (None, None, {}))
+
+    def test_get_engine_by_name(self):
+        """Test engines are selected by name and unknown names are rejected"""
+        self.assertIsInstance(get_ocr_engine("pytesseract"), PytesseractEngine)
+        with self.assertRaises(ValueError):
+            get_ocr_engine("nonexistent")
+
+    def test_recognizer_uses_injected_engine(self):
+        """Test the recognizer runs OCR through its engine and closes it"""
+        engine = CountingEngine()
+        recognizer = ScreenRecognizer(
+            capture_backend=FrameBufferCaptureBackend(size=(64, 32)),
+            ocr_cache=OCRCache(), ocr_engine=engine
+        )
+        image = np.zeros((32, 64, 3), dtype=np.uint8)
+
+        self.assertEqual(recognizer.extract_text(image), "recognized")
+        self.assertEqual(engine.calls, [((64, 32), "eng", "--psm 6")])
+
+        recognizer.close()
+        self.assertTrue(engine.closed)
+
+if __name__ == '__main__':
+    unittest.main()
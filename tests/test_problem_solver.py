@@ -0,0 +1,43 @@
+import unittest
+from backend.utils.problem_solver import ProblemSolver
+
+class TestProblemSolver(unittest.TestCase):
+    def setUp(self):
+        self.solver = ProblemSolver()
+
+    def test_variables_come_from_equations(self):
+        """Test words around the equation never become unknowns"""
+        problem = self.solver.parse_problem(
+            "A student has to solve for x in this homework problem from the textbook: 3x + 7 = 22"
+        )
+        self.assertEqual(list(problem.variables), ['x'])
+        self.assertEqual(problem.unknown_variables, ['x'])
+        self.assertEqual(self.solver.solve_problem(problem)['solution'], {'x': 5.0})
+
+    def test_coefficients_are_not_known_values(self):
+        """Test the 2 in 2x is not taken as the value of x"""
+        problem = self.solver.parse_problem("Solve for x: 2x + 5 = 13")
+        self.assertNotIn('x', problem.known_values)
+
+    def test_givens_on_their_own_lines(self):
+        """Test a given such as "y = 4" below the equation is used as a known value"""
+        problem = self.solver.parse_problem("Solve for x:\n2*x + y = 10\ny = 4")
+        self.assertEqual(len(problem.equations), 2)
+        self.assertEqual(problem.known_values, {'y': 4.0})
+        self.assertEqual(problem.unknown_variables, ['x'])
+        self.assertEqual(self.solver.solve_problem(problem)['solution'], {'x': 3.0})
+
+    def test_solve_for_target_keeps_parameters_symbolic(self):
+        """Test only the requested variable is solved for"""
+        problem = self.solver.parse_problem("Solve for x: a*x + b = c")
+        self.assertEqual(problem.unknown_variables, ['x'])
+        self.assertEqual(self.solver.solve_problem(problem)['solution'], {'x': '(-b + c)/a'})
+
+    def test_stop_words_are_not_targets(self):
+        """Test "what is the" does not name a variable to solve for"""
+        variables = {'x': self.solver._parse_side('x')}
+        self.assertEqual(self.solver._extract_targets("What is the answer if x + 1 = 2", variables), [])
+        self.assertEqual(self.solver._extract_targets("Find the value of x", variables), ['x'])
+
+if __name__ == '__main__':
+    unittest.main()
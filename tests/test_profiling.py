@@ -0,0 +1,44 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from backend.utils import profiling
+from backend.utils.profiling import ProfilingMiddleware, SamplingProfiler, profiled
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+class TestProfiling(unittest.TestCase):
+    def test_profiled_is_free_when_not_profiling(self):
+        """Test work is passed through unwrapped outside a profiled request"""
+        self.assertIs(profiled(busy_work), busy_work)
+
+    def test_samples_worker_threads(self):
+        """Test work handed to a pool is sampled and exported"""
+        profiler = SamplingProfiler(interval=0.001)
+        token = profiling._current.set(profiler)
+        profiler.start()
+        try:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pool.submit(profiled(busy_work), 0.1).result()
+        finally:
+            profiler.stop()
+            profiling._current.reset(token)
+
+        speedscope = profiler.to_speedscope("test")
+        self.assertEqual(len(speedscope["profiles"]), 1)
+        names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+        self.assertIn("busy_work", names)
+        self.assertGreater(len(speedscope["profiles"][0]["samples"]), 10)
+        self.assertIn(";busy_work", profiler.to_collapsed())
+
+    def test_request_flag(self):
+        """Test profiling is requested by header or query parameter"""
+        self.assertTrue(ProfilingMiddleware.requested({"headers": [(b"x-profile", b"1")]}))
+        self.assertTrue(ProfilingMiddleware.requested({"query_string": b"fields=answer&profile=1"}))
+        self.assertFalse(ProfilingMiddleware.requested({"headers": [(b"x-profile", b"0")]}))
+        self.assertFalse(ProfilingMiddleware.requested({"query_string": b"profile=10"}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from backend.utils.rate_limit import RateLimiter, parse_quotas
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter(rate=2.0, burst=10.0, costs={"POST /api/chat": 5, "POST /api/jobs": 25})
+
+    def test_bucket_empties_and_refills(self):
+        """Test requests spend tokens and are told when to retry"""
+        self.assertEqual(self.limiter.acquire("ip:a", 5, now=0.0), 0.0)
+        self.assertEqual(self.limiter.acquire("ip:a", 5, now=0.0), 0.0)
+        self.assertAlmostEqual(self.limiter.acquire("ip:a", 5, now=0.0), 2.5)
+        # 2 tokens per second refill the bucket
+        self.assertEqual(self.limiter.acquire("ip:a", 5, now=2.5), 0.0)
+        # Other clients have their own bucket
+        self.assertEqual(self.limiter.acquire("ip:b", 5, now=0.0), 0.0)
+
+    def test_endpoint_costs(self):
+        """Test endpoints cost their configured weight, others cost one token"""
+        self.assertEqual(self.limiter.cost("POST", "/api/chat"), 5)
+        self.assertEqual(self.limiter.cost("post", "/api/chat/"), 5)
+        self.assertEqual(self.limiter.cost("GET", "/api/status"), 1)
+        # Polling a list costs less than submitting to it
+        self.assertEqual(self.limiter.cost("POST", "/api/jobs"), 25)
+        self.assertEqual(self.limiter.cost("GET", "/api/jobs"), 1)
+
+    def test_api_key_quotas(self):
+        """Test API keys with a quota get their own rate and burst"""
+        limiter = RateLimiter(rate=1.0, burst=1.0, quotas=parse_quotas("team=10/50, bad"))
+        key = limiter.key_for_api_key("team")
+        for _ in range(10):
+            self.assertEqual(limiter.acquire(key, 5, now=0.0), 0.0)
+        self.assertGreater(limiter.acquire(key, 5, now=0.0), 0.0)
+        self.assertNotIn("team", key)
+
+    def test_unknown_api_keys_share_the_address_bucket(self):
+        """Test only API keys with a quota get their own bucket"""
+        limiter = RateLimiter(rate=1.0, burst=1.0, quotas=parse_quotas("team=10/50"))
+        scope = lambda key: {"headers": [(b"x-api-key", key)], "client": ("10.0.0.1", 1234)}
+        self.assertEqual(limiter.client_key(scope(b"team")), limiter.key_for_api_key("team"))
+        self.assertEqual(limiter.client_key(scope(b"random-1")), "ip:10.0.0.1")
+        self.assertEqual(limiter.client_key(scope(b"random-2")), "ip:10.0.0.1")
+
+    def test_prune_keeps_memory_bounded(self):
+        """Test idle clients are forgotten once max_clients is reached"""
+        limiter = RateLimiter(rate=1.0, burst=10.0, max_clients=4)
+        for i in range(20):
+            limiter.acquire(f"ip:{i}", 1, now=float(i) * 100)
+        self.assertLessEqual(len(limiter._buckets), 4)
+
+if __name__ == '__main__':
+    unittest.main()
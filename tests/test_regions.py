@@ -0,0 +1,140 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from backend.utils.capture_backends import FrameBufferCaptureBackend
+from backend.utils import regions
+from backend.utils.regions import _x11_front_window, clip_region, coverage, find_text_regions
+from backend.utils.screen_recognizer import ScreenRecognizer
+from backend.utils.shared_store import SharedStore
+
+# Window 0x3 is minimized, 0x2 is the assistant on top of the editor 0x1
+FAKE_XPROP = """#!/bin/sh
+echo "_NET_CLIENT_LIST_STACKING(WINDOW): window id # 0x1, 0x2, 0x3"
+"""
+FAKE_XDOTOOL = """#!/bin/sh
+case "$1" in
+  search) printf "1\\n2\\n" ;;
+  getactivewindow) echo 2 ;;
+  getwindowname) [ "$2" = 2 ] && echo "Veswo Assistant" || echo "editor.py - Code" ;;
+  getwindowgeometry) printf "WINDOW=$3\\nX=${3}0\\nY=20\\nWIDTH=800\\nHEIGHT=600\\n" ;;
+esac
+"""
+
+def page_with_text(size=(1920, 1080), origin=(1400, 900)):
+    frame = np.full((size[1], size[0], 3), 255, dtype=np.uint8)
+    for line in range(3):
+        cv2.putText(frame, f"2x + {line} = 13", (origin[0], origin[1] + line * 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    return frame
+
+class TestTextRegions(unittest.TestCase):
+    def test_finds_text_block(self):
+        """Test the pre-scan finds the text in a corner of a large capture"""
+        frame = page_with_text()
+        regions = find_text_regions(frame)
+
+        self.assertTrue(regions)
+        left, top, width, height = regions[0]
+        self.assertLessEqual(left, 1400)
+        self.assertLessEqual(top, 900 - 25)
+        self.assertGreaterEqual(top + height, 980)
+        self.assertLess(coverage(regions, (1920, 1080)), 0.1)
+
+    def test_blocks_past_the_cap_are_not_dropped(self):
+        """Test more separate blocks than max_regions come back as one covering region"""
+        frame = np.full((1080, 1920, 3), 255, dtype=np.uint8)
+        for line in range(16):
+            column, row = divmod(line, 8)
+            cv2.putText(frame, f"x + {line} = 20", (100 + column * 900, 60 + row * 130),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+        regions = find_text_regions(frame, max_regions=8)
+
+        self.assertEqual(len(regions), 1)
+        left, top, width, height = regions[0]
+        self.assertLessEqual(top, 60 - 25)
+        self.assertGreaterEqual(top + height, 60 + 7 * 130)
+        self.assertGreaterEqual(left + width, 1000 + 150)
+
+    def test_blank_capture_has_no_regions(self):
+        """Test a blank capture yields no regions"""
+        self.assertEqual(find_text_regions(np.full((1080, 1920, 3), 255, dtype=np.uint8)), [])
+
+    @unittest.skipIf(sys.platform == "win32", "needs a POSIX shell")
+    def test_x11_skips_ignored_windows(self):
+        """Test the X11 lookup walks the stacking order past the assistant's own window"""
+        regions._x11_lookup = (float("-inf"), None)
+        with tempfile.TemporaryDirectory() as bin_dir:
+            for name, script in (("xprop", FAKE_XPROP), ("xdotool", FAKE_XDOTOOL)):
+                path = os.path.join(bin_dir, name)
+                with open(path, "w") as f:
+                    f.write(script)
+                os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+            old_path = os.environ["PATH"]
+            os.environ["PATH"] = bin_dir + os.pathsep + old_path
+            try:
+                self.assertEqual(_x11_front_window(), (10, 20, 800, 600))
+            finally:
+                os.environ["PATH"] = old_path
+        # Back-to-back captures reuse the lookup instead of running the tools again
+        self.assertEqual(_x11_front_window(), (10, 20, 800, 600))
+
+    def test_clip_region(self):
+        """Test regions are clipped to the screen"""
+        self.assertEqual(clip_region((-10, 50, 200, 100), (100, 100)), (0, 50, 100, 50))
+        self.assertIsNone(clip_region((200, 0, 50, 50), (100, 100)))
+
+class TestRegionSelection(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = SharedStore(os.path.join(self.tmpdir.name, "store.sqlite3"))
+        self.backend = FrameBufferCaptureBackend(size=(640, 480))
+        self.window = (100, 100, 800, 300)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def make_recognizer(self):
+        return ScreenRecognizer(capture_backend=self.backend, store=self.store,
+                                window_tracker=lambda: self.window)
+
+    def test_region_precedence(self):
+        """Test explicit regions beat the pinned region, which beats the focused window"""
+        recognizer = self.make_recognizer()
+        self.assertEqual(recognizer.resolve_region(), (100, 100, 540, 300))
+
+        recognizer.pin_region((0, 0, 50, 50))
+        self.assertEqual(recognizer.resolve_region(), (0, 0, 50, 50))
+        self.assertEqual(recognizer.resolve_region((10, 10, 20, 20)), (10, 10, 20, 20))
+        self.assertEqual(recognizer.capture_screen().shape, (50, 50, 3))
+
+        self.window = None
+        recognizer.pin_region(None)
+        self.assertIsNone(recognizer.resolve_region())
+        self.assertEqual(recognizer.capture_screen().shape, (480, 640, 3))
+
+    def test_pinned_region_persists(self):
+        """Test a pinned region survives a new recognizer on the same store"""
+        self.make_recognizer().pin_region((5, 6, 70, 80))
+        self.assertEqual(self.make_recognizer().screen_region, (5, 6, 70, 80))
+
+    def test_pin_applies_to_other_recognizers(self):
+        """Test a pin set or cleared through one worker is seen by the others"""
+        first, second = self.make_recognizer(), self.make_recognizer()
+        first.pin_region((1, 2, 30, 40))
+        self.assertEqual(second.resolve_region(), (1, 2, 30, 40))
+        first.pin_region(None)
+        self.assertEqual(second.resolve_region(), (100, 100, 540, 300))
+
+    def test_blank_screen_skips_ocr(self):
+        """Test a capture without text is answered without running OCR"""
+        recognizer = self.make_recognizer()
+        recognizer._run_ocr = lambda image, config: self.fail("OCR should not run")
+        self.assertEqual(recognizer.read_screen(), "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import unittest
+import numpy as np
+import sympy
+from backend.utils.responses import FastJSONResponse, dumps, parse_fields, select_fields
+from backend.utils.schemas import ChatResponse, SolveResponse
+from backend.utils.problem_solver import Problem, ProblemSolver, ProblemType
+
+class TestResponses(unittest.TestCase):
+    def test_dumps_solver_values(self):
+        """Test sympy and numpy values serialize to plain JSON"""
+        x = sympy.Symbol("x")
+        data = json.loads(dumps({"int": sympy.Integer(4), "float": sympy.Float(0.5),
+                                 "symbol": x, "expr": x + 1, "np": np.int64(3)}))
+        self.assertEqual(data, {"int": 4, "float": 0.5, "symbol": "x", "expr": "x + 1", "np": 3})
+
+    def test_solver_solution_keys_are_names(self):
+        """Test solutions returned as a sympy dict are keyed by variable name"""
+        x, y = sympy.symbols("x y")
+        problem = Problem(
+            text="x + y = 3, x - y = 1",
+            type=ProblemType.MATH,
+            variables={"x": x, "y": y},
+            equations=[sympy.Eq(x + y, 3), sympy.Eq(x - y, 1)],
+            known_values={},
+            unknown_variables=["x", "y"]
+        )
+        result = ProblemSolver().solve_problem(problem)
+        self.assertEqual(json.loads(dumps(result["solution"])), {"x": 2.0, "y": 1.0})
+
+    def test_response_omits_unset_fields(self):
+        """Test None fields are left out of the response body"""
+        body = FastJSONResponse(ChatResponse(response="hi", method="gemma")).body
+        self.assertEqual(body, b'{"response":"hi","method":"gemma"}')
+
+    def test_fields_select_record_keys(self):
+        """Test ?fields= trims each record but keeps errors and the summary"""
+        fields = parse_fields("line, answer")
+        response = SolveResponse(
+            results=[
+                {"line": 0, "text": "1+1", "answer": "1+1 = 2", "elapsed_ms": 0.1},
+                {"line": 1, "text": "?", "error": "Could not solve this line", "elapsed_ms": 0.1},
+            ],
+            line_count=2,
+            elapsed_ms=0.5
+        )
+        data = json.loads(FastJSONResponse(response, fields=fields).body)
+
+        self.assertEqual(data["results"], [{"line": 0, "answer": "1+1 = 2"},
+                                           {"line": 1, "error": "Could not solve this line"}])
+        self.assertEqual(data["line_count"], 2)
+        self.assertEqual(select_fields({"line": 0, "text": "x"}, fields), {"line": 0})
+        self.assertIsNone(parse_fields(""))
+
+if __name__ == '__main__':
+    unittest.main()
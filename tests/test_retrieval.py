@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+import zlib
+import numpy as np
+from backend.utils.retrieval import Retriever, VectorIndex, chunk_text
+
+def embed(texts, cancel=None):
+    """Bag-of-words vectors: texts sharing words point the same way"""
+    vectors = []
+    for text in texts:
+        vector = np.zeros(64)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.strip(".,?!").encode()) % 64] += 1
+        vectors.append(vector.tolist())
+    return vectors
+
+class TestRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = VectorIndex(os.path.join(self.tmpdir.name, "notes"), initial_capacity=4)
+        self.retriever = Retriever(embed, self.index, chunk_tokens=20, overlap=5)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmpdir.cleanup()
+
+    def test_chunking_respects_budget_and_overlaps(self):
+        """Test chunks stay near the token budget and repeat boundary sentences"""
+        text = " ".join(f"Sentence number {i} is here." for i in range(20))
+        chunks = chunk_text(text, max_tokens=20, overlap=8)
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(all(len(chunk) <= 28 * 4 for chunk in chunks))
+        self.assertIn(chunks[0].split(". ")[-1].rstrip("."), chunks[1])
+
+    def test_search_finds_relevant_chunk(self):
+        """Test the closest chunk ranks first and the index grows past its capacity"""
+        self.retriever.add_document("Mitochondria are the powerhouse of the cell.", title="Biology")
+        self.retriever.add_document("The French revolution began in 1789.", title="History")
+        for i in range(6):
+            self.retriever.add_document(f"Filler note {i} about nothing much.")
+
+        hits = self.retriever.search("powerhouse of the cell", k=2)
+        self.assertEqual(hits[0]["title"], "Biology")
+        self.assertGreater(hits[0]["score"], hits[1]["score"])
+
+        prompt, sources = self.retriever.augment("When did the French revolution begin?", k=1)
+        self.assertIn("1789", prompt)
+        self.assertEqual(sources[0]["title"], "History")
+
+    def test_non_positive_k_returns_nothing(self):
+        """Test k below 1 never turns into a slice of the whole corpus"""
+        for i in range(5):
+            self.retriever.add_document(f"Note {i} about cells.")
+        self.assertEqual(self.retriever.search("cells", k=0), [])
+        self.assertEqual(self.retriever.search("cells", k=-3), [])
+
+    def test_remove_replace_and_reload(self):
+        """Test removed documents disappear and other processes see changes"""
+        first = self.retriever.add_document("Photosynthesis makes sugar from light.", doc_id="bio")
+        self.retriever.add_document("Photosynthesis happens in chloroplasts.", doc_id="bio")
+        self.assertEqual(first["doc_id"], "bio")
+        self.assertEqual(len(self.index.documents()), 1)
+        self.assertIn("chloroplasts", self.retriever.search("photosynthesis", k=5)[0]["text"])
+        self.assertEqual(len(self.retriever.search("photosynthesis", k=5)), 1)
+
+        other = VectorIndex(self.index.directory)
+        self.assertEqual(len(other.search(embed(["chloroplasts"])[0], k=1)), 1)
+        self.assertTrue(self.retriever.remove_document("bio"))
+        self.assertEqual(other.search(embed(["chloroplasts"])[0], k=1), [])
+        other.close()
+
+    def test_compaction_keeps_live_rows(self):
+        """Test compacting the matrix keeps the remaining chunks searchable"""
+        for i in range(10):
+            self.retriever.add_document(f"Filler note {i} about nothing.", doc_id=f"filler{i}")
+        self.retriever.add_document("Volcanoes erupt molten lava.", doc_id="geo")
+        for i in range(10):
+            self.retriever.remove_document(f"filler{i}")
+        self.index.compact()
+
+        self.assertEqual(self.index.count, 1)
+        self.assertEqual(self.retriever.search("volcanoes lava", k=3)[0]["doc_id"], "geo")
+
+if __name__ == '__main__':
+    unittest.main()
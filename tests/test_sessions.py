@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from backend.utils.sessions import SessionStore
+from backend.utils.shared_store import SharedStore
+
+class TestSessions(unittest.TestCase):
+    def setUp(self):
+        self.store = SessionStore(max_sessions=2, token_budget=50, keep_recent=2)
+    
+    def test_prompt_reuses_context(self):
+        """Test follow-up turns only send new text when a context exists"""
+        session = self.store.get_or_create("abc")
+        self.assertEqual(session.build_prompt("Hi"), "Hi")
+        
+        session.add_turn("user", "Hi")
+        session.add_turn("assistant", "Hello!")
+        transcript = session.build_prompt("What is 2+2?")
+        self.assertIn("User: Hi", transcript)
+        self.assertIn("Assistant: Hello!", transcript)
+        
+        session.context = [1, 2, 3]
+        session.context_turns = len(session.turns)
+        self.assertEqual(session.build_prompt("What is 2+2?"), "What is 2+2?")
+    
+    def test_compaction_respects_budget(self):
+        """Test old turns are summarized once over the token budget"""
+        session = self.store.get_or_create("abc")
+        for i in range(6):
+            session.add_turn("user", f"question {i} " * 10)
+            session.add_turn("assistant", f"answer {i} " * 10)
+        session.context = [0] * 500
+        
+        session.compact(self.store.token_budget, self.store.keep_recent, lambda text: "short summary")
+        
+        self.assertEqual(len(session.turns), 2)
+        self.assertEqual(session.summary, "short summary")
+        self.assertIsNone(session.context)
+        self.assertIn("short summary", session.build_prompt("next"))
+    
+    def test_store_is_bounded(self):
+        """Test least recently used sessions are evicted"""
+        self.store.get_or_create("a")
+        self.store.get_or_create("b")
+        self.store.get_or_create("a")
+        self.store.get_or_create("c")
+        
+        self.assertIsNone(self.store.get("b"))
+        self.assertIsNotNone(self.store.get("a"))
+        self.assertEqual(len(self.store), 2)
+
+    def test_sessions_are_shared_between_workers(self):
+        """Test a session saved by one worker continues on another, context included"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            shared = SharedStore(os.path.join(tmpdir, "shared.sqlite3"))
+            first, second = SessionStore(store=shared), SessionStore(store=shared)
+
+            session = first.get_or_create("abc")
+            with session.lock:
+                session.add_turn("user", "Hi")
+                session.add_turn("assistant", "Hello!")
+                session.context, session.context_turns = [1, 2, 3], 2
+                session.backend = "http://node-a:11434"
+                first.save(session)
+
+            other = second.get_or_create("abc")
+            self.assertEqual([turn.content for turn in other.turns], ["Hi", "Hello!"])
+            self.assertEqual((other.context, other.backend), ([1, 2, 3], "http://node-a:11434"))
+
+            # A later turn on the second worker reaches the first one
+            with other.lock:
+                other.add_turn("user", "Thanks")
+                second.save(other)
+            self.assertEqual(len(first.get_or_create("abc").turns), 3)
+
+            self.assertTrue(second.delete("abc"))
+            self.assertIsNone(first.get("abc"))
+            shared.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+import unittest
+from backend.utils.shared_store import SharedStore
+from backend.utils.coordination import LeaderLock
+
+class TestSharedStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "shared.sqlite3")
+        self.store = SharedStore(self.path)
+    
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+    
+    def test_values_are_shared_between_connections(self):
+        """Test a second store on the same file sees writes"""
+        self.store.set("chat", "key", {"response": "hi"})
+        other = SharedStore(self.path)
+        
+        self.assertEqual(other.get("chat", "key"), {"response": "hi"})
+        self.assertIsNone(other.get("ocr", "key"))
+        other.close()
+    
+    def test_expiry(self):
+        """Test expired entries are not returned"""
+        self.store.set("chat", "key", "value", ttl=0.01)
+        time.sleep(0.02)
+        
+        self.assertIsNone(self.store.get("chat", "key"))
+    
+    def test_purge_expired(self):
+        """Test purge_expired deletes only expired entries"""
+        self.store.set("chat", "old", "value", ttl=0.01)
+        self.store.set("chat", "new", "value", ttl=60)
+        self.store.set("chat", "forever", "value")
+        time.sleep(0.02)
+        
+        self.assertEqual(self.store.purge_expired(), 1)
+        self.assertEqual(self.store.get("chat", "new"), "value")
+    
+    def test_memory_database_is_rejected(self):
+        """Test ':memory:' is refused since each thread would see its own empty database"""
+        with self.assertRaises(ValueError):
+            SharedStore(":memory:")
+    
+    def test_single_leader(self):
+        """Test only one lock holder becomes leader"""
+        lock_path = os.path.join(self.tmpdir.name, "leader.lock")
+        first, second = LeaderLock(lock_path), LeaderLock(lock_path)
+        
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+if __name__ == '__main__':
+    unittest.main()
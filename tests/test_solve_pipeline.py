@@ -0,0 +1,43 @@
+import unittest
+from backend.utils.intent_router import IntentRouter
+from backend.utils.solve_pipeline import SolvePipeline, normalize_ocr_line
+from backend.utils.screen_recognizer import ScreenRecognizer
+from backend.utils.capture_backends import FrameBufferCaptureBackend
+
+class TestSolvePipeline(unittest.TestCase):
+    def setUp(self):
+        self.router = IntentRouter()
+        self.pipeline = SolvePipeline(self.router, max_workers=2)
+
+    def tearDown(self):
+        self.pipeline.shutdown()
+
+    def test_normalize_ocr_confusions(self):
+        """Test numbering, typographic operators and misread digits are fixed"""
+        prefix = self.router.question_prefix
+        self.assertEqual(normalize_ocr_line("1. 2x + 5 = l3", prefix), "2x + 5 = 13")
+        self.assertEqual(normalize_ocr_line("(b) 12 × 3 = ?", prefix), "12 * 3")
+        self.assertEqual(normalize_ocr_line("Solve for y: 3(y − 1) = 9", prefix), "3(y - 1) = 9")
+        self.assertEqual(normalize_ocr_line("1,000 ÷ 2o", prefix), "1000 / 20")
+        self.assertEqual(normalize_ocr_line("x² == 4", prefix), "x**2 = 4")
+
+    def test_lines_solved_independently(self):
+        """Test every line gets its own answer or error"""
+        lines = ["1. 2x + 5 = l3", "2) 12 × 3 =", "hello + world"]
+        results = sorted(self.pipeline.run(lines), key=lambda result: result["line"])
+
+        self.assertEqual(results[0]["answer"], "x = 4")
+        self.assertEqual(results[0]["method"], IntentRouter.EQUATION_METHOD)
+        self.assertEqual(results[1]["answer"], "12 * 3 = 36")
+        self.assertIn("error", results[2])
+        for result in results:
+            self.assertIn("elapsed_ms", result)
+
+    def test_equation_lines_from_ocr_text(self):
+        """Test only lines with math operators are picked from OCR output"""
+        recognizer = ScreenRecognizer(capture_backend=FrameBufferCaptureBackend())
+        text = "Worksheet 3\n1. 2x + 5 = 13\nName: ____\n2. 12 × 3"
+        self.assertEqual(recognizer.equation_lines(text), ["1. 2x + 5 = 13", "2. 12 × 3"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import asyncio
+import json
+import unittest
+from backend.utils.status_hub import StatusHub
+
+class TestStatusHub(unittest.TestCase):
+    def test_broadcasts_only_changes(self):
+        """Test subscribers get the current status, then one event per change"""
+        state = {"ready": False}
+        calls = []
+
+        def snapshot():
+            calls.append(1)
+            return dict(state)
+
+        async def scenario():
+            hub = StatusHub(snapshot, interval=0.01, heartbeat=0.05)
+            hub.start()
+            connected = True
+
+            async def is_disconnected():
+                return not connected
+
+            async def read(count):
+                events = []
+                async for message in hub.events(is_disconnected):
+                    if message.startswith(b"event: status"):
+                        events.append(json.loads(message.split(b"data: ", 1)[1]))
+                        if len(events) == count:
+                            break
+                return events
+
+            readers = [asyncio.ensure_future(read(2)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            state["ready"] = True
+            results = await asyncio.wait_for(asyncio.gather(*readers), 1)
+            connected = False
+            await hub.stop()
+            return hub, results
+
+        hub, results = asyncio.run(scenario())
+        for events in results:
+            self.assertEqual(events, [{"ready": False}, {"ready": True}])
+        self.assertEqual(hub.version, 2)
+        self.assertEqual(hub.subscribers, 0)
+
+if __name__ == '__main__':
+    unittest.main()
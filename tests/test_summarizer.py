@@ -0,0 +1,105 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from backend.utils.shared_store import SharedStore
+from backend.utils.summarizer import MapReduceSummarizer
+
+def long_document(paragraphs=12):
+    return "\n\n".join(
+        " ".join(f"Paragraph {i} sentence {j} talks about topic {i}." for j in range(40))
+        for i in range(paragraphs)
+    )
+
+class FakeModel:
+    """Replies with the first sentence of each chunk, tracking concurrent calls"""
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt, profile=None, cancel=None):
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        if self.reply is not None:
+            return self.reply(prompt)
+        return prompt.split("Document part:\n", 1)[1].split(".", 1)[0] + "."
+
+class TestMapReduceSummarizer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = SharedStore(os.path.join(self.tmpdir.name, "store.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def make_summarizer(self, model, **kwargs):
+        summarizer = MapReduceSummarizer(model, self.store, max_workers=3, chunk_tokens=300, **kwargs)
+        self.addCleanup(summarizer.shutdown)
+        return summarizer
+
+    def test_short_text_is_unchanged(self):
+        """Test text within the budget skips the model"""
+        model = FakeModel()
+        result = self.make_summarizer(model).condense("A short note.", token_budget=100)
+        self.assertEqual(result, {"text": "A short note.", "chunks": 0, "rounds": 0})
+        self.assertEqual(model.calls, 0)
+
+    def test_long_text_is_mapped_in_parallel_and_cached(self):
+        """Test chunks are condensed concurrently within the worker limit and cached by hash"""
+        model = FakeModel()
+        summarizer = self.make_summarizer(model)
+        result = summarizer.condense(long_document(), token_budget=500)
+
+        self.assertGreater(result["chunks"], 3)
+        self.assertEqual(result["rounds"], 1)
+        self.assertEqual(model.calls, result["chunks"])
+        self.assertTrue(result["text"].startswith("Paragraph 0 sentence 0"))
+        self.assertLessEqual(len(result["text"]) // 4, 500)
+        self.assertTrue(1 < model.peak <= 3)
+
+        again = summarizer.condense(long_document(), token_budget=500)
+        self.assertEqual(again["text"], result["text"])
+        self.assertEqual(model.calls, result["chunks"])
+
+    def test_question_is_applied_after_cached_summaries(self):
+        """Test the first pass ignores the question and later rounds drop irrelevant notes"""
+        summaries = []
+
+        def reply(prompt):
+            part = prompt.split("Document part:\n", 1)[1]
+            if "Question:" not in prompt:
+                summaries.append(part)
+                return part
+            return "Topic 3 is relevant." if "topic 3." in part else "NONE"
+
+        model = FakeModel(reply)
+        summarizer = self.make_summarizer(model)
+        result = summarizer.condense(long_document(), "What about topic 3?", token_budget=500)
+        self.assertEqual(result["rounds"], 2)
+        self.assertEqual(set(result["text"].split("\n\n")), {"Topic 3 is relevant."})
+
+        self.assertEqual(len(summaries), result["chunks"])
+
+        # A different question reuses the cached first-pass summaries
+        summarizer.condense(long_document(), "What about topic 5?", token_budget=500)
+        self.assertEqual(len(summaries), result["chunks"])
+
+    def test_notes_that_do_not_shrink_are_cut(self):
+        """Test the reduce loop stops after max_rounds when the model will not condense"""
+        model = FakeModel(lambda prompt: prompt.split("Document part:\n", 1)[1])
+        result = self.make_summarizer(model, max_rounds=2).condense(long_document(4), token_budget=200)
+        self.assertEqual(result["rounds"], 2)
+        self.assertLessEqual(len(result["text"]), 800)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import signal
+import tempfile
+import time
+import unittest
+from concurrent.futures import Executor, Future
+from backend.utils import worksheet
+from backend.utils.worksheet import Checkpoint, read_problems, run_worksheet, solve_batch, solve_stream
+
+class SlowSolver:
+    """Solver stub that takes longer than any test timeout"""
+    def parse_problem(self, text):
+        time.sleep(5)
+
+class NeverFinishes(Executor):
+    """Executor whose batches never complete, like a worker stuck without an alarm"""
+    def submit(self, fn, *args, **kwargs):
+        return Future()
+
+class TestWorksheet(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.tmpdir.name, "problems.jsonl")
+        self.output = os.path.join(self.tmpdir.name, "results.jsonl")
+        with open(self.input, "w") as f:
+            for i in range(1, 6):
+                f.write(json.dumps({"id": f"q{i}", "problem": f"Solve for x: x + {i} = 10"}) + "\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def results(self):
+        with open(self.output) as f:
+            return [json.loads(line) for line in f]
+
+    def test_read_csv_with_field(self):
+        """Test CSV rows are streamed with the chosen column and ids"""
+        path = os.path.join(self.tmpdir.name, "problems.csv")
+        with open(path, "w") as f:
+            f.write("id,task\n7,Solve for x: x + 1 = 2\n8,Solve for x: x + 2 = 4\n")
+        self.assertEqual(list(read_problems(path, field="task", skip=1)),
+                         [(1, "8", "Solve for x: x + 2 = 4")])
+
+    def test_solves_in_input_order(self):
+        """Test every problem is solved and written in input order"""
+        summary = run_worksheet(self.input, self.output, workers=0, batch_size=2)
+        results = self.results()
+        self.assertEqual(summary["solved"], 5)
+        self.assertEqual([result["id"] for result in results], ["q1", "q2", "q3", "q4", "q5"])
+        self.assertEqual(results[2]["solution"], {"x": 7.0})
+        self.assertFalse(os.path.exists(f"{self.output}.checkpoint"))
+
+    def test_resume_from_checkpoint(self):
+        """Test an interrupted run continues after the last checkpoint"""
+        run_worksheet(self.input, self.output, workers=0)
+        with open(self.output, "rb") as f:
+            first_two = b"".join(f.readlines()[:2])
+        # Simulate a crash: two rows checkpointed, then a half-written line
+        with open(self.output, "wb") as f:
+            f.write(first_two + b'{"row": 2, "sol')
+        Checkpoint(f"{self.output}.checkpoint").save(2, len(first_two))
+
+        summary = run_worksheet(self.input, self.output, workers=0)
+        self.assertEqual(summary["resumed_from"], 2)
+        self.assertEqual([result["row"] for result in self.results()], [0, 1, 2, 3, 4])
+
+    @unittest.skipUnless(hasattr(signal, "setitimer"), "needs SIGALRM")
+    def test_batch_timeout_records_error_rows(self):
+        """Test a batch that runs too long returns error rows instead of hanging"""
+        worksheet._solver = SlowSolver()
+        self.addCleanup(setattr, worksheet, "_solver", None)
+        started = time.monotonic()
+        results = solve_batch([(0, "q1", "slow"), (1, "q2", "slow")], timeout=0.1)
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual([result["id"] for result in results], ["q1", "q2"])
+        self.assertTrue(all("Timed out" in result["error"] for result in results))
+
+    def test_stuck_batch_is_not_waited_on_forever(self):
+        """Test solve_stream gives up on a batch whose worker never answers"""
+        rows = [(0, None, "x = 1"), (1, None, "x = 2")]
+        results = list(solve_stream(rows, NeverFinishes(), batch_size=1, timeout=0.05))
+        self.assertEqual([result["row"] for result in results], [0, 1])
+        self.assertTrue(all("Timed out" in result["error"] for result in results))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import unittest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from backend.utils.ws_gateway import WebSocketGateway
+from backend.utils.rate_limit import RateLimiter
+
+def make_app(limiter=None):
+    app = FastAPI()
+    gateway = WebSocketGateway(limiter, max_in_flight=2)
+
+    @gateway.handler("echo")
+    async def echo(message, request):
+        for word in message["text"].split():
+            request.emit("token", token=word)
+        return {"text": message["text"]}
+
+    @gateway.handler("wait")
+    async def wait(message, request):
+        while not request.cancel.cancelled:
+            await asyncio.sleep(0.01)
+        return {"text": "too late"}
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        await gateway.serve(websocket)
+
+    return app
+
+def receive(ws):
+    return json.loads(ws.receive_text())
+
+class TestWebSocketGateway(unittest.TestCase):
+    def test_multiplexed_requests_and_cancel(self):
+        """Test concurrent requests are answered by id and can be cancelled"""
+        with TestClient(make_app()).websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"id": "a", "type": "wait"}))
+            ws.send_text(json.dumps({"id": "b", "type": "echo", "text": "hello world"}))
+
+            frames = [receive(ws) for _ in range(3)]
+            self.assertEqual([frame["id"] for frame in frames], ["b", "b", "b"])
+            self.assertEqual([frame.get("token") for frame in frames[:2]], ["hello", "world"])
+            self.assertEqual(frames[2]["event"], "result")
+            self.assertEqual(frames[2]["text"], "hello world")
+
+            ws.send_text(json.dumps({"id": "a", "type": "cancel"}))
+            self.assertEqual(receive(ws), {"id": "a", "event": "cancelled"})
+
+    def test_rejected_requests(self):
+        """Test bad frames, unknown types and overload get error events"""
+        with TestClient(make_app()).websocket_connect("/ws") as ws:
+            ws.send_text("not json")
+            self.assertEqual(receive(ws)["error"], "Invalid JSON")
+
+            ws.send_bytes(b'{"id": 0, "type": "echo"}')
+            self.assertEqual(receive(ws)["error"], "Expected a text frame")
+
+            ws.send_text(json.dumps({"id": 1, "type": "missing"}))
+            self.assertEqual(receive(ws)["event"], "error")
+
+            ws.send_text(json.dumps({"id": 2, "type": "wait"}))
+            ws.send_text(json.dumps({"id": 3, "type": "wait"}))
+            ws.send_text(json.dumps({"id": 4, "type": "wait"}))
+            frame = receive(ws)
+            self.assertEqual(frame["id"], 4)
+            self.assertIn("Too many requests", frame["error"])
+
+    def test_rate_limited_messages(self):
+        """Test each message spends the client's rate limit tokens"""
+        limiter = RateLimiter(rate=0.001, burst=2, costs={"POST /api/echo": 1})
+        with TestClient(make_app(limiter)).websocket_connect("/ws") as ws:
+            for request_id in range(3):
+                ws.send_text(json.dumps({"id": request_id, "type": "echo", "text": "hi"}))
+            frames = [receive(ws) for _ in range(5)]
+            limited = [frame for frame in frames if frame["event"] == "error"]
+            self.assertEqual(len(limited), 1)
+            self.assertIn("retry_after", limited[0])
+
+if __name__ == '__main__':
+    unittest.main()